@@ -0,0 +1,62 @@
+import os
+import sys
+import tempfile
+import time
+from wikimedia_connection import wikimedia_connection
+from wikibrain import cache_store
+from wikibrain import prefetch
+
+# compares read throughput of cache of wikimedia_connection
+# in file-per-entry layout and in cache_store.CacheStore
+#
+# python3 benchmark_cache_store.py
+# python3 benchmark_cache_store.py 200000
+#
+# synthetic entries are written into temporary folder, real cache is not touched
+# note that both layouts are read after being written, so mostly from page cache of
+# operating system - on a cold cache difference is larger
+
+DEFAULT_COUNT = 20000
+
+
+def synthetic_entity(number):
+    wikidata_id = "Q" + str(900000000 + number)
+    claims = {"P31": [{"mainsnak": {"snaktype": "value", "property": "P31", "datavalue": {"value": {"entity-type": "item", "id": "Q5"}, "type": "wikibase-entityid"}}, "rank": "normal"}]}
+    return {"type": "item", "id": wikidata_id, "labels": {"en": {"language": "en", "value": "entry " + str(number)}}, "claims": claims, "sitelinks": {}}
+
+
+def read_all(wikidata_ids):
+    start = time.perf_counter()
+    for wikidata_id in wikidata_ids:
+        wikimedia_connection.get_data_from_wikidata_by_id(wikidata_id)
+    return time.perf_counter() - start
+
+
+def main():
+    count = DEFAULT_COUNT
+    if len(sys.argv) > 1:
+        count = int(sys.argv[1])
+    with tempfile.TemporaryDirectory() as folder:
+        wikimedia_connection.set_cache_location(os.path.join(folder, "files"))
+        wikidata_ids = []
+        for number in range(count):
+            data = synthetic_entity(number)
+            prefetch.write_entity_to_cache(data["id"], data)
+            wikidata_ids.append(data["id"])
+        files_time = read_all(wikidata_ids)
+
+        store_filepath = os.path.join(folder, "cache.sqlite")
+        store = cache_store.CacheStore(store_filepath)
+        cache_store.migrate_file_cache(store, remove_files=True)
+        cache_store.install_backend(cache_store.CacheStoreBackend(store))
+        try:
+            store_time = read_all(wikidata_ids)
+        finally:
+            cache_store.uninstall_backend()
+            store.close()
+        print("entries:", count)
+        print("file-per-entry".ljust(16), "{:.0f} reads/s".format(count / files_time), "({} files)".format(2 * count))
+        print("cache_store".ljust(16), "{:.0f} reads/s".format(count / store_time), "({:.1f} MB in a single file)".format(os.path.getsize(store_filepath) / 1000000))
+
+
+main()
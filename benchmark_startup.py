@@ -0,0 +1,54 @@
+import json
+import subprocess
+import sys
+
+# measures startup costs of wikibrain, each in a fresh process
+# - import time
+# - loading knowledge tables (from knowledge pack if present and up to date)
+# - first get_the_most_important_problem_generic call
+#
+# python3 benchmark_startup.py
+# python3 benchmark_startup.py '{"wikidata": "Q31487", "wikipedia": "pl:Kraków"}'
+#
+# note that tags requiring data not present in wikimedia_connection cache
+# will measure network speed rather than wikibrain
+
+DEFAULT_TAGS = {"wikipedia:fixme": "Kraków", "name": "Kraków"}
+RUNS = 5
+
+MEASUREMENT = """
+import json
+import time
+start = time.perf_counter()
+import wikibrain
+import wikibrain.knowledge_pack
+imported = time.perf_counter()
+from wikibrain import knowledge_snapshot
+knowledge_snapshot.get_snapshot()
+knowledge_loaded = time.perf_counter()
+detector = wikibrain.wikimedia_link_issue_reporter.WikimediaLinkIssueDetector()
+detector.get_the_most_important_problem_generic(json.loads(TAGS), (50, 20), 'node', 'benchmark object')
+first_call = time.perf_counter()
+used_pack = wikibrain.knowledge_pack.read_pack() != None
+print(json.dumps({"import": imported - start, "knowledge": knowledge_loaded - imported, "first_call": first_call - knowledge_loaded, "total": first_call - start, "used_pack": used_pack}))
+"""
+
+
+def measure_once(tags):
+    code = MEASUREMENT.replace("TAGS", repr(json.dumps(tags)))
+    output = subprocess.run([sys.executable, "-c", code], check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().split("\n")[-1])
+
+
+def main():
+    tags = DEFAULT_TAGS
+    if len(sys.argv) > 1:
+        tags = json.loads(sys.argv[1])
+    results = [measure_once(tags) for _ in range(RUNS)]
+    print("runs:", RUNS, "knowledge pack used:", results[0]["used_pack"])
+    for key in ["import", "knowledge", "first_call", "total"]:
+        values = sorted(result[key] for result in results)
+        print(key.ljust(12), "median {:.1f} ms".format(values[len(values) // 2] * 1000), "min {:.1f} ms".format(values[0] * 1000))
+
+
+main()
@@ -0,0 +1,13 @@
+from wikibrain import knowledge_pack
+
+
+def main():
+    # compiles knowledge tables into wikibrain/knowledge_pack.bin
+    # should be run before building package, see reinstall.sh
+    # pack is used only while it matches source code, so forgetting to rebuild it
+    # makes startup slower but will not cause outdated data to be used
+    filepath = knowledge_pack.build_pack()
+    print("knowledge pack written to", filepath)
+
+
+main()
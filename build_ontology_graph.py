@@ -0,0 +1,25 @@
+import sys
+from wikibrain import ontology_graph
+from wikibrain import wikidata_dump
+
+"""
+python3 build_ontology_graph.py wikidata_dump.sqlite ontology_graph
+
+builds graph used by ontology_graph.load_graph from store created by import_wikidata_dump.py
+"""
+
+
+def main():
+    if len(sys.argv) != 3:
+        print("usage: python3 build_ontology_graph.py store_filepath graph_folder")
+        sys.exit(1)
+    store = wikidata_dump.DumpStore(sys.argv[1])
+    try:
+        graph = ontology_graph.build_graph(store.all_entities())
+    finally:
+        store.close()
+    graph.save(sys.argv[2])
+    print(len(graph.ids), "entries,", graph.memory_usage(), "bytes written to", sys.argv[2])
+
+
+main()
@@ -0,0 +1,26 @@
+import sys
+import wikimedia_connection.wikimedia_connection as wikimedia_connection
+import osm_handling_config.global_config as osm_handling_config
+from wikibrain import cache_only
+
+"""
+python3 fetch_missing_cache_entries.py missing.txt
+
+fetches entries listed by cache_only.write_missing into cache of wikimedia_connection
+used to prepare cache for validation in cache-only mode, see cache_only.py
+"""
+
+
+def main():
+    if len(sys.argv) != 2:
+        print("usage: python3 fetch_missing_cache_entries.py missing_entries_filepath")
+        sys.exit(1)
+    wikimedia_connection.set_cache_location(osm_handling_config.get_wikimedia_connection_cache_location())
+    keys = cache_only.read_missing(sys.argv[1])
+    statistics = cache_only.fetch_missing(keys)
+    print(len(keys), "missing entries processed")
+    print(statistics)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,25 +1,76 @@
+import argparse
+import os
+import sys
 import wikimedia_connection.wikimedia_connection as wikimedia_connection
 import osm_handling_config.global_config as osm_handling_config
-import os
+from wikibrain import cache_invalidation
+from wikibrain import cache_store
+from wikibrain import ontology_cache
+from wikibrain import ontology_store
 
-wikimedia_connection.set_cache_location(osm_handling_config.get_wikimedia_connection_cache_location())
+"""
+removes entries from cache of wikimedia_connection, so they will be downloaded again
 
-forced_refresh = True
-#forced_refresh = False
-article = "en:Geraldine Lead Mine".split(":")
-wikimedia_connection.get_data_from_wikidata(article[0], article[1], forced_refresh)
+python3 flush.py Q49833 en:Kraków
+python3 flush.py --file ids.txt
+cat ids.txt | python3 flush.py --file -
+python3 flush.py --older-than 30d --kind entity --dry-run
+python3 flush.py --older-than 30d --store wikimedia_cache.sqlite
 
-kill = "Q126092684".split()  # NOT FLUSHED YET!
-"""
-# use like this:
-kill = ["Q45621"]
+files list one Wikidata id or article link per line, lines starting with # are skipped
+see wikibrain/cache_invalidation.py
 """
-for id in kill:
-    os.remove(wikimedia_connection.get_filename_with_wikidata_entity_by_id(id))
-    os.remove(wikimedia_connection.get_filename_with_wikidata_by_id_response_code(id))
 
-"""
-flush.py Q49833
 
-flushes cache of Q49833
-"""
+def arguments():
+    parser = argparse.ArgumentParser(description="removes entries from cache of wikimedia_connection")
+    parser.add_argument("entries", nargs="*", help="Wikidata ids (Q42) and article links (en:Kraków)")
+    parser.add_argument("--file", action="append", default=[], help="file with one id or link per line, - for stdin, may be repeated")
+    parser.add_argument("--older-than", help="select also entries older than that, for example 30d, 12h")
+    parser.add_argument("--kind", action="append", choices=cache_invalidation.KINDS, help="invalidate only entries of this kind, may be repeated")
+    parser.add_argument("--store", help="cache_store file, if cache was migrated to it")
+    parser.add_argument("--batch-size", type=int, default=cache_invalidation.DEFAULT_BATCH_SIZE)
+    parser.add_argument("--dry-run", action="store_true", help="only show what would be invalidated")
+    return parser.parse_args()
+
+
+def read_lines(source):
+    if source == "-":
+        return sys.stdin.readlines()
+    with open(source) as infile:
+        return infile.readlines()
+
+
+def main():
+    args = arguments()
+    wikimedia_connection.set_cache_location(osm_handling_config.get_wikimedia_connection_cache_location())
+    store = None
+    cache = cache_invalidation.FileCache()
+    if args.store != None:
+        store = cache_store.CacheStore(args.store)
+        cache = cache_invalidation.StoreCache(store)
+    try:
+        lines = list(args.entries)
+        for source in args.file:
+            lines += read_lines(source)
+        targets = cache_invalidation.targets_of_lines(lines)
+        if args.older_than != None:
+            targets += cache_invalidation.targets_older_than(cache, cache_invalidation.parse_age(args.older_than))
+        if args.kind != None:
+            targets = cache_invalidation.limited_to_kinds(targets, args.kind)
+        targets = cache_invalidation.deduplicated(targets)
+
+        for kind, count in cache_invalidation.summary(cache, targets).items():
+            print(kind.ljust(14), count, "cached entries selected")
+        if args.dry_run:
+            print("dry run, nothing was removed")
+            return
+        if os.path.isfile(ontology_store.default_location()):
+            ontology_cache.set_persistent_store(ontology_store.ClosureStore(ontology_store.default_location()))
+        cache_invalidation.invalidate(cache, targets, args.batch_size, show_progress=True)
+    finally:
+        if store != None:
+            store.close()
+
+
+main()
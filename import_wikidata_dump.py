@@ -0,0 +1,20 @@
+import sys
+from wikibrain import wikidata_dump
+
+"""
+python3 import_wikidata_dump.py latest-all.json.gz wikidata_dump.sqlite
+
+builds store used by wikidata_dump.DumpBackend from Wikidata JSON dump
+see https://www.wikidata.org/wiki/Wikidata:Database_download
+"""
+
+
+def main():
+    if len(sys.argv) != 3:
+        print("usage: python3 import_wikidata_dump.py dump_filepath store_filepath")
+        sys.exit(1)
+    imported = wikidata_dump.import_dump(sys.argv[1], sys.argv[2], show_progress=True)
+    print(imported, "entities written to", sys.argv[2])
+
+
+main()
@@ -0,0 +1,28 @@
+import sys
+import wikimedia_connection.wikimedia_connection as wikimedia_connection
+import osm_handling_config.global_config as osm_handling_config
+from wikibrain import cache_store
+
+"""
+python3 migrate_cache_to_sqlite.py wikimedia_cache.sqlite
+python3 migrate_cache_to_sqlite.py wikimedia_cache.sqlite --remove-files
+
+moves cache of wikimedia_connection from file-per-entry layout into store used by cache_store.CacheStoreBackend
+with --remove-files migrated files are deleted
+"""
+
+
+def main():
+    if len(sys.argv) not in [2, 3] or (len(sys.argv) == 3 and sys.argv[2] != "--remove-files"):
+        print("usage: python3 migrate_cache_to_sqlite.py store_filepath [--remove-files]")
+        sys.exit(1)
+    wikimedia_connection.set_cache_location(osm_handling_config.get_wikimedia_connection_cache_location())
+    store = cache_store.CacheStore(sys.argv[1])
+    try:
+        migrated = cache_store.migrate_file_cache(store, remove_files=len(sys.argv) == 3, show_progress=True)
+    finally:
+        store.close()
+    print(migrated, "files migrated to", sys.argv[1])
+
+
+main()
@@ -7,6 +7,7 @@ err_report() {
 trap 'err_report $LINENO' ERR
 
 rm dist -rf
+/home/mateusz/Documents/install_moje/shared_python_virtual_environment/bin/python3 build_knowledge_pack.py
 /home/mateusz/Documents/install_moje/shared_python_virtual_environment/bin/python3 -m build
 
 # better as library?
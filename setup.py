@@ -13,11 +13,18 @@ setuptools.setup(
     long_description_content_type="text/markdown",
     url="https://github.com/matkoniecz/wikibrain",
     packages=setuptools.find_packages(),
+    package_data={
+        'wikibrain': ['official_languages_from_wikidata.csv', 'knowledge_pack.bin'],
+    },
     install_requires=[
         'geopy>=1.11.0',
         'nose>=1.3.7',
         'wikimedia-connection>=0.0.2',
     ],
+    extras_require={
+        # wikibrain.ontology_graph
+        'graph': ['numpy'],
+    },
     classifiers=[
         "Programming Language :: Python :: 3",
         "Operating System :: OS Independent",
@@ -0,0 +1,64 @@
+import os
+import tempfile
+import unittest
+import wikidata_cache_fixture
+from wikimedia_connection import wikimedia_connection
+from wikibrain import cache_invalidation
+from wikibrain import cache_only
+from wikibrain import cache_store
+from wikibrain import ontology_cache
+from wikibrain import prefetch
+
+
+class Tests(unittest.TestCase):
+    def setUp(self):
+        self.cache_folder = wikidata_cache_fixture.use_temporary_cache()
+        wikidata_cache_fixture.seed_entity(wikidata_cache_fixture.entity("Q900001801"))
+        wikidata_cache_fixture.seed_entity(wikidata_cache_fixture.entity("Q900001802"))
+        prefetch.write_article_to_cache("en", "Kraków", "Q900001801", {"id": "Q900001801"})
+        self.refreshed = []
+        ontology_cache.register_class_refresh_listener(self.refreshed.append)
+
+    def tearDown(self):
+        ontology_cache.class_refresh_listeners.remove(self.refreshed.append)
+        self.cache_folder.cleanup()
+
+    def test_age_parsing(self):
+        self.assertEqual(30 * 24 * 60 * 60, cache_invalidation.parse_age("30d"))
+        self.assertEqual(90 * 60, cache_invalidation.parse_age("90m"))
+        with self.assertRaises(ValueError):
+            cache_invalidation.parse_age("30 days")
+
+    def test_listed_entries_are_invalidated(self):
+        cache = cache_invalidation.FileCache()
+        targets = cache_invalidation.targets_of_lines(["# comment", "Q900001801", "", "en:Kraków", "Q900001803"])
+        self.assertEqual({cache_only.ENTITY: 2, cache_only.ARTICLE_ITEM: 1, cache_only.ARTICLE: 1, cache_only.URL: 0}, {kind: len(cache_invalidation.limited_to_kinds(targets, [kind])) for kind in cache_invalidation.KINDS})
+        self.assertEqual({cache_only.ENTITY: 1, cache_only.ARTICLE_ITEM: 1, cache_only.ARTICLE: 0, cache_only.URL: 0}, cache_invalidation.summary(cache, targets))
+        self.assertEqual(4, cache_invalidation.invalidate(cache, targets, batch_size=3))
+        self.assertEqual(False, prefetch.is_entity_cached("Q900001801"))
+        self.assertEqual(False, prefetch.is_article_cached("en", "Kraków"))
+        self.assertEqual(True, prefetch.is_entity_cached("Q900001802"))
+        self.assertEqual(["Q900001801", "Q900001803"], self.refreshed)
+        with self.assertRaises(ValueError):
+            cache_invalidation.targets_of_line("Kraków")
+
+    def test_old_entries_of_selected_kind_are_invalidated_in_store(self):
+        old = 1000000
+        for filename in [wikimedia_connection.get_filename_with_wikidata_entity_by_id("Q900001801"), wikimedia_connection.get_filename_with_wikidata_entity("en", "Kraków")]:
+            os.utime(filename, (old, old))
+        with tempfile.TemporaryDirectory() as folder:
+            store = cache_store.CacheStore(os.path.join(folder, "cache.sqlite"))
+            cache_store.migrate_file_cache(store, remove_files=True)
+            cache = cache_invalidation.StoreCache(store)
+            targets = cache_invalidation.targets_older_than(cache, 30 * 24 * 60 * 60)
+            self.assertEqual([cache_only.ARTICLE_ITEM, cache_only.ENTITY], sorted(entry[0] for entry in targets))
+            targets = cache_invalidation.limited_to_kinds(targets, [cache_only.ENTITY])
+            cache_invalidation.invalidate(cache, targets)
+            self.assertEqual(4, store.count())
+            self.assertEqual(set(), store.present(["wikidata_by_id/Q900001801.wikidata_entity.txt", "wikidata_by_id/Q900001801.wikidata_entity.code.txt"]))
+            self.assertEqual(["Q900001801"], self.refreshed)
+            store.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
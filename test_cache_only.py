@@ -0,0 +1,94 @@
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import unittest
+import osm_handling_config.global_config as osm_handling_config
+import wikidata_cache_fixture
+import fetch_missing_cache_entries
+from wikimedia_connection import wikimedia_connection
+import wikibrain.wikimedia_link_issue_reporter
+from wikibrain import cache_only
+from wikibrain import prefetch
+
+entity = wikidata_cache_fixture.entity
+
+
+class Tests(unittest.TestCase):
+    def setUp(self):
+        self.cache_folder = wikidata_cache_fixture.use_temporary_cache()
+        cache_only.clear_missing()
+
+    def tearDown(self):
+        cache_only.disable()
+        cache_only.clear_missing()
+        self.cache_folder.cleanup()
+
+    def test_missing_data_makes_check_undetermined_until_it_is_fetched(self):
+        entities = [
+            entity("Q900001601", instance_of=["Q900001602"], sitelinks={"enwiki": "Crash"}),
+            entity("Q900001602", subclass_of=["Q3002150"]),
+            entity("Q3002150"),  # aircraft crash
+        ]
+        transport = prefetch.InMemoryTransport(entities)
+        missing_in_runs = []
+        for _ in range(len(entities) + 1):
+            cache_only.enable()
+            detector = wikibrain.wikimedia_link_issue_reporter.WikimediaLinkIssueDetector()
+            report = detector.get_the_most_important_problem_generic({"wikidata": "Q900001601"}, (50, 20), "node", "node")
+            cache_only.disable()
+            if report.error_id != wikibrain.wikimedia_link_issue_reporter.UNDETERMINED_ERROR_ID:
+                break
+            with tempfile.TemporaryDirectory() as folder:
+                filepath = os.path.join(folder, "missing.txt")
+                cache_only.write_missing(filepath)
+                missing = cache_only.read_missing(filepath)
+            self.assertEqual(cache_only.missing(), missing)
+            missing_in_runs += missing
+            cache_only.fetch_missing(missing, transport)
+            cache_only.clear_missing()
+        self.assertEqual("should use a secondary wikipedia tag - linking from wikidata tag to an aircraft crash", report.error_id)
+        # ontology of missing entry was fetched with it, so one fetch was enough
+        self.assertEqual([(cache_only.ENTITY, "Q900001601")], missing_in_runs)
+
+    def test_nothing_is_downloaded_in_cache_only_mode(self):
+        cache_only.enable()
+        cache_only.enable()
+        with self.assertRaises(cache_only.NotInCache):
+            prefetch.WikidataApiTransport().get_entities(["Q900001603"])
+        with self.assertRaises(Exception):
+            cache_only.fetch_missing(cache_only.missing())
+        cache_only.disable()
+        self.assertEqual(False, cache_only.is_enabled())
+        self.assertEqual(cache_only.URL, cache_only.missing()[0][0])
+
+    def test_script_fetches_into_configured_cache(self):
+        entities = [entity("Q900001604", instance_of=["Q900001605"]), entity("Q900001605")]
+        transport = prefetch.InMemoryTransport(entities)
+        original_location = osm_handling_config.get_wikimedia_connection_cache_location
+        original_argv = sys.argv
+        original_transport = prefetch.WikidataApiTransport
+        with tempfile.TemporaryDirectory() as folder:
+            filepath = os.path.join(folder, "missing.txt")
+            with open(filepath, 'w') as outfile:
+                outfile.write(cache_only.ENTITY + "\tQ900001604\n")
+            wikimedia_connection.set_cache_location(folder)  # main() should switch to configured location
+            osm_handling_config.get_wikimedia_connection_cache_location = lambda: self.cache_folder.name
+            sys.argv = ["fetch_missing_cache_entries.py", filepath]
+            prefetch.WikidataApiTransport = lambda: transport
+            try:
+                with contextlib.redirect_stdout(io.StringIO()) as output:
+                    fetch_missing_cache_entries.main()
+            finally:
+                osm_handling_config.get_wikimedia_connection_cache_location = original_location
+                sys.argv = original_argv
+                prefetch.WikidataApiTransport = original_transport
+        self.assertEqual(os.path.normpath(self.cache_folder.name), os.path.normpath(wikimedia_connection.cache_location()))
+        self.assertEqual(True, prefetch.is_entity_cached("Q900001604"))
+        self.assertEqual(True, prefetch.is_entity_cached("Q900001605"))
+        self.assertIn("1 missing entries processed", output.getvalue())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+import wikidata_cache_fixture
+from wikimedia_connection import wikimedia_connection
+import wikibrain.wikimedia_link_issue_reporter
+from wikibrain import cache_store
+from wikibrain import prefetch
+
+
+def files_in(folder):
+    returned = []
+    for _, _, filenames in os.walk(folder):
+        returned += filenames
+    return returned
+
+
+class Tests(unittest.TestCase):
+    def setUp(self):
+        self.cache_folder = wikidata_cache_fixture.use_temporary_cache()
+        self.store_folder = tempfile.TemporaryDirectory()
+        self.store_filepath = os.path.join(self.store_folder.name, "cache.sqlite")
+        self.original_download = wikimedia_connection.download
+        self.downloaded = []
+
+    def tearDown(self):
+        cache_store.uninstall_backend()
+        wikimedia_connection.download = self.original_download
+        self.cache_folder.cleanup()
+        self.store_folder.cleanup()
+
+    def fake_download(self, url, timeout=None):
+        self.downloaded.append(url)
+        return wikimedia_connection.UrlResponse(b'{"error": {"code": "no-such-entity"}}', 200)
+
+    def test_writes_are_batched(self):
+        store = cache_store.CacheStore(self.store_filepath, batch_size=3)
+        store.put("wikidata_by_id/Q1.wikidata_entity.txt", "a")
+        store.put("wikidata_by_id/Q1.wikidata_entity.code.txt", "200")
+        other_connection = sqlite3.connect(self.store_filepath)
+        self.assertEqual(0, other_connection.execute("SELECT COUNT(*) FROM files").fetchone()[0])
+        self.assertEqual("a", store.get("wikidata_by_id/Q1.wikidata_entity.txt"))
+        store.put("wikidata_by_id/Q2.wikidata_entity.txt", "b")
+        self.assertEqual(3, other_connection.execute("SELECT COUNT(*) FROM files").fetchone()[0])
+        other_connection.close()
+        store.remove(["wikidata_by_id/Q1.wikidata_entity.txt"])
+        self.assertEqual(None, store.get("wikidata_by_id/Q1.wikidata_entity.txt"))
+        self.assertEqual(2, store.count())
+        store.close()
+
+    def test_migrated_cache_is_used_without_files(self):
+        wikidata_cache_fixture.seed_entity(wikidata_cache_fixture.entity("Q900001701", instance_of=["Q5"], labels={"en": "Person"}))
+        prefetch.write_article_to_cache("en", "Person", "Q900001701", {"id": "Q900001701"})
+        store = cache_store.CacheStore(self.store_filepath)
+        self.assertEqual(4, cache_store.migrate_file_cache(store, remove_files=True))
+        self.assertEqual([], files_in(self.cache_folder.name))
+        cache_store.install_backend(cache_store.CacheStoreBackend(store))
+        wikimedia_connection.download = self.fake_download
+        self.assertEqual("Person", wikimedia_connection.get_data_from_wikidata_by_id("Q900001701")["entities"]["Q900001701"]["labels"]["en"]["value"])
+        self.assertEqual("Q900001701", wikimedia_connection.get_wikidata_object_id_from_article("en", "Person"))
+        detector = wikibrain.wikimedia_link_issue_reporter.WikimediaLinkIssueDetector()
+        self.assertEqual(None, detector.check_is_wikidata_page_existing("wikidata", "Q900001701"))
+        self.assertEqual([], self.downloaded)
+
+    def test_downloaded_data_is_written_into_store(self):
+        store = cache_store.CacheStore(self.store_filepath)
+        cache_store.install_backend(cache_store.CacheStoreBackend(store))
+        wikimedia_connection.download = self.fake_download
+        self.assertEqual(None, wikimedia_connection.get_data_from_wikidata_by_id("Q900001702"))
+        self.assertEqual(None, wikimedia_connection.get_data_from_wikidata_by_id("Q900001702"))
+        self.assertEqual(1, len(self.downloaded))
+        self.assertEqual(None, wikimedia_connection.get_data_from_wikidata_by_id("Q900001702", forced_refresh=True))
+        self.assertEqual(2, len(self.downloaded))
+        prefetch.write_entity_to_cache("Q900001703", {"id": "Q900001703"})
+        self.assertEqual(True, prefetch.is_entity_cached("Q900001703"))
+        cache_store.uninstall_backend()
+        self.assertEqual(False, prefetch.is_entity_cached("Q900001703"))
+        self.assertEqual([], files_in(self.cache_folder.name))
+        self.assertEqual(4, store.count())
+        store.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+import os
+import tempfile
+import unittest
+import wikidata_cache_fixture
+from wikimedia_connection import wikimedia_connection
+from wikibrain import cache_only
+from wikibrain import cache_store
+from wikibrain import connection_patches
+from wikibrain import wikidata_dump
+
+
+class Tests(unittest.TestCase):
+    def setUp(self):
+        self.cache_folder = wikidata_cache_fixture.use_temporary_cache()
+        self.originals = {name: getattr(wikimedia_connection, name) for name in cache_store.REPLACED_FUNCTIONS + wikidata_dump.REPLACED_FUNCTIONS + ["download"]}
+
+    def tearDown(self):
+        cache_only.disable()
+        cache_store.uninstall_backend()
+        wikidata_dump.uninstall_backend()
+        self.cache_folder.cleanup()
+
+    def assert_original_functions(self):
+        for name, function in self.originals.items():
+            self.assertIs(function, getattr(wikimedia_connection, name))
+
+    def test_layers_are_removed_in_any_order(self):
+        connection_patches.install("lower", {"download": "lower download", "get_wikipedia_page": "lower page"})
+        connection_patches.install("upper", {"download": "upper download"})
+        self.assertEqual("upper download", wikimedia_connection.download)
+        self.assertEqual("lower download", connection_patches.replaced("upper", "download"))
+        self.assertIs(self.originals["download"], connection_patches.replaced("lower", "download"))
+        connection_patches.uninstall("lower")
+        self.assertEqual("upper download", wikimedia_connection.download)
+        self.assertIs(self.originals["get_wikipedia_page"], wikimedia_connection.get_wikipedia_page)
+        connection_patches.install("upper", {"download": "upper download again"})
+        self.assertEqual("upper download again", wikimedia_connection.download)
+        connection_patches.uninstall("upper")
+        self.assert_original_functions()
+
+    def test_backends_and_cache_only_mode_can_be_combined(self):
+        with tempfile.TemporaryDirectory() as folder:
+            store = cache_store.CacheStore(os.path.join(folder, "cache.sqlite"))
+            dump_store = wikidata_dump.DumpStore(os.path.join(folder, "dump.sqlite"))
+            dump_store.put_entities([wikidata_dump.compact_entity(wikidata_cache_fixture.entity("Q900001901"))])
+            cache_store.install_backend(cache_store.CacheStoreBackend(store))
+            wikidata_dump.install_backend(wikidata_dump.DumpBackend(dump_store))
+            cache_only.enable()
+            self.assertEqual("Q900001901", wikimedia_connection.get_data_from_wikidata_by_id("Q900001901")["entities"]["Q900001901"]["id"])
+            with self.assertRaises(cache_only.NotInCache):
+                wikimedia_connection.get_wikipedia_page("en", "Missing", False)
+            cache_store.uninstall_backend()
+            self.assertEqual("Q900001901", wikimedia_connection.get_data_from_wikidata_by_id("Q900001901")["entities"]["Q900001901"]["id"])
+            self.assertIs(self.originals["write_to_text_file"], wikimedia_connection.write_to_text_file)
+            wikidata_dump.uninstall_backend()
+            cache_only.disable()
+            self.assert_original_functions()
+            store.close()
+            dump_store.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
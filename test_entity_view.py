@@ -0,0 +1,90 @@
+import unittest
+import wikidata_cache_fixture
+from wikimedia_connection import wikimedia_connection
+from wikimedia_connection import wikidata_processing
+import wikibrain.wikimedia_link_issue_reporter
+from wikibrain import cache_invalidation
+from wikibrain import entity_view
+
+entity = wikidata_cache_fixture.entity
+claim = wikidata_cache_fixture.claim
+
+
+def with_qualifier(statement, qualifier_id):
+    statement["qualifiers"] = {qualifier_id: [{"snaktype": "somevalue", "property": qualifier_id}]}
+    return statement
+
+
+def coordinates(latitude, longitude):
+    return {"mainsnak": {"snaktype": "value", "property": "P625", "datavalue": {"value": {"latitude": latitude, "longitude": longitude}, "type": "globecoordinate"}}, "type": "statement", "rank": "normal"}
+
+
+class Tests(unittest.TestCase):
+    def setUp(self):
+        self.cache_folder = wikidata_cache_fixture.use_temporary_cache()
+        entity_view.clear()
+        entity_view.view_cache.reset_statistics()
+        wikidata_cache_fixture.seed_entities([
+            entity("Q900001301", claims={
+                "P17": [with_qualifier(claim("P17", "Q900001302"), "P582"), claim("P17", "Q900001303")],
+                "P576": [with_qualifier(claim("P576", "Q900001304"), "P1011")],
+                "P625": [coordinates(52.2, 21.0)],
+            }, sitelinks={"enwiki": "Some place"}, labels={"en": "Some place", "pl": "Jakieś miejsce"}),
+            entity("Q900001302", labels={"en": "Old country"}),
+            entity("Q900001303"),
+            entity("Q900001305", claims={"P576": [claim("P576", "Q900001304")]}),
+        ])
+
+    def tearDown(self):
+        entity_view.clear()
+        self.cache_folder.cleanup()
+
+    def test_accessors_match_wikimedia_connection(self):
+        for wikidata_id in ["Q900001301", "Q900001302", "Q900001303", "Q900001305"]:
+            view = entity_view.view_of(wikidata_id)
+            for property_id in ["P17", "P576", "P625", "P31"]:
+                self.assertEqual(wikimedia_connection.get_property_from_wikidata(wikidata_id, property_id), view.property(property_id))
+            self.assertEqual(wikidata_processing.get_wikidata_label(wikidata_id, 'en'), view.label('en'))
+        self.assertEqual(wikimedia_connection.get_location_from_wikidata("Q900001301"), entity_view.view_of("Q900001301").location())
+        self.assertEqual((None, None), entity_view.view_of("Q900001303").location())
+        self.assertEqual("Jakieś miejsce", entity_view.view_of("Q900001301").label('pl'))
+        self.assertEqual("Some place", entity_view.view_of("Q900001301").sitelink('en'))
+        self.assertEqual(None, entity_view.view_of("Q900001301").sitelink('de'))
+        self.assertEqual(["Q900001302", "Q900001303"], entity_view.view_of("Q900001301").target_ids("P17"))
+        self.assertEqual(False, entity_view.view_of(None).exists())
+
+    def test_checks_share_parsed_entity(self):
+        detector = wikibrain.wikimedia_link_issue_reporter.WikimediaLinkIssueDetector()
+        self.assertEqual(["Q900001303"], detector.get_country_location_from_wikidata_id("Q900001301"))
+        self.assertEqual(["Q900001305"], detector.get_dissolved_brands(["Q900001301", "Q900001305"]))
+        self.assertNotEqual(None, detector.check_is_object_is_existing("Q900001301"))
+        self.assertEqual(None, detector.check_is_object_is_existing("Q900001303"))
+        self.assertEqual(3, entity_view.statistics()["misses"])
+        self.assertEqual(2, entity_view.statistics()["hits"])
+
+    def test_malformed_location_raises_like_wikimedia_connection(self):
+        without_value = {"mainsnak": {"snaktype": "novalue", "property": "P625"}, "type": "statement", "rank": "normal"}
+        wikidata_cache_fixture.seed_entity(entity("Q900001306", claims={"P625": [without_value]}))
+        with self.assertRaises(KeyError):
+            wikimedia_connection.get_location_from_wikidata("Q900001306")
+        with self.assertRaises(KeyError):
+            entity_view.view_of("Q900001306").location()
+
+    def test_views_of_refreshed_entries_are_dropped(self):
+        self.assertEqual((52.2, 21.0), entity_view.view_of("Q900001301").location())
+        self.assertEqual(None, entity_view.view_of("Q900001303").label('en'))
+        original = wikimedia_connection.download_data_from_wikidata_by_id
+        wikimedia_connection.download_data_from_wikidata_by_id = lambda wikidata_id: wikidata_cache_fixture.seed_entity(entity("Q900001301", claims={"P625": [coordinates(50.0, 19.9)]}))
+        try:
+            entity_view.wikidata_response("Q900001301", forced_refresh=True)
+        finally:
+            wikimedia_connection.download_data_from_wikidata_by_id = original
+        self.assertEqual((50.0, 19.9), entity_view.view_of("Q900001301").location())
+
+        cache_invalidation.invalidate(cache_invalidation.FileCache(), cache_invalidation.targets_of_lines(["Q900001303"]))
+        wikidata_cache_fixture.seed_entity(entity("Q900001303", labels={"en": "Some country"}))
+        self.assertEqual("Some country", entity_view.view_of("Q900001303").label('en'))
+
+
+if __name__ == '__main__':
+    unittest.main()
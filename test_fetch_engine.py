@@ -0,0 +1,91 @@
+import unittest
+import wikidata_cache_fixture
+from wikimedia_connection import wikimedia_connection
+import wikibrain.wikimedia_link_issue_reporter
+from wikibrain import fetch_engine
+
+entity = wikidata_cache_fixture.entity
+
+
+class Tests(unittest.TestCase):
+    def setUp(self):
+        self.cache_folder = wikidata_cache_fixture.use_temporary_cache()
+
+    def tearDown(self):
+        self.cache_folder.cleanup()
+
+    def test_lookups(self):
+        entities = [entity("Q900001001", sitelinks={"enwiki": "Some article", "dewiki": "Irgendein Artikel"})]
+        server = wikidata_cache_fixture.FakeApiServer(entities, redirects={"Old name": "Some article"}, links={"Some article": ["A", "B", "C", "D", "E"]})
+        facade = fetch_engine.SyncFetchEngine(server.engine())
+        try:
+            self.assertEqual({"enwiki": "Some article", "dewiki": "Irgendein Artikel"}, facade.get_sitelinks("Q900001001"))
+            self.assertEqual(None, facade.get_entity("Q900001002"))
+            self.assertEqual("Q900001001", facade.get_wikidata_id_of_article("en", "Some_article"))
+            self.assertEqual(None, facade.get_wikidata_id_of_article("en", "Missing article"))
+            self.assertEqual("Some article", facade.get_article_name_after_redirect("en", "Old name"))
+            self.assertEqual("Some article", facade.get_article_name_after_redirect("en", "Some article"))
+            self.assertEqual(["A", "B", "C", "D", "E"], facade.get_page_links("en", "Some article"))
+        finally:
+            facade.close()
+            server.close()
+
+    def test_detector_finds_fetched_data_in_cache(self):
+        entities = [entity("Q900001001", sitelinks={"enwiki": "Some article"})]
+        server = wikidata_cache_fixture.FakeApiServer(entities, redirects={"Old name": "Some article", "Old entry": "Some article"}, links={"Some article": ["A", "B"]})
+        facade = fetch_engine.SyncFetchEngine(server.engine())
+        try:
+            results = facade.gather([
+                facade.engine.get_article_name_after_redirect("en", "Old name"),
+                facade.engine.get_page_links("en", "Old name"),
+                facade.engine.get_wikidata_id_of_article("en", "Old entry"),
+            ])
+        finally:
+            facade.close()
+            server.close()
+        self.assertEqual(["Some article", ["A", "B"], "Q900001001"], results)
+        original = wikimedia_connection.download
+        wikimedia_connection.download = None
+        try:
+            detector = wikibrain.wikimedia_link_issue_reporter.WikimediaLinkIssueDetector()
+            self.assertEqual("Some article", detector.get_article_name_after_redirect("en", "Old name"))
+            self.assertEqual([{"ns": 0, "title": "A"}, {"ns": 0, "title": "B"}], wikimedia_connection.get_from_wikipedia_api("en", "&prop=links", "Old name")['links'])
+            self.assertEqual("Q900001001", wikimedia_connection.get_wikidata_object_id_from_article("en", "Old entry"))
+        finally:
+            wikimedia_connection.download = original
+
+    def test_limits_and_deduplication(self):
+        server = wikidata_cache_fixture.FakeApiServer([], delay=0.1)
+        engine = server.engine(concurrency=3, per_host_limit=2)
+        facade = fetch_engine.SyncFetchEngine(engine)
+        try:
+            titles = ["Title " + str(index) for index in range(6)]
+            results = facade.gather([engine.get_article_name_after_redirect("en", title) for title in titles + titles])
+            self.assertEqual(titles + titles, results)
+            # Wikidata entry of article and Wikipedia API response for each title
+            self.assertEqual(12, len(server.paths))
+            self.assertEqual(12, engine.statistics["deduplicated"])
+            self.assertEqual(2, server.max_running)
+        finally:
+            facade.close()
+            server.close()
+
+    def test_prefetch_fills_cache_concurrently(self):
+        entities = [entity("Q" + str(900001100 + index), instance_of=["Q900001099"]) for index in range(20)]
+        entities.append(entity("Q900001099", sitelinks={"enwiki": "Type"}))
+        server = wikidata_cache_fixture.FakeApiServer(entities)
+        facade = fetch_engine.SyncFetchEngine(server.engine(batch_size=5))
+        try:
+            statistics = facade.prefetch_for_elements([{"wikidata": data["id"]} for data in entities[:20]] + [{"wikipedia": "en:Type"}])
+            # one request for article, four groups of ids, one for their type is not needed - it was linked by article
+            self.assertEqual(5, statistics["requests"])
+            self.assertEqual(True, server.max_running > 1)
+            self.assertEqual("Q900001099", wikimedia_connection.get_wikidata_object_id_from_article("en", "Type"))
+            self.assertEqual(["Q900001099"], [claim["mainsnak"]["datavalue"]["value"]["id"] for claim in wikimedia_connection.get_property_from_wikidata("Q900001110", "P31")])
+        finally:
+            facade.close()
+            server.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+import unittest
+import wikidata_cache_fixture
+from wikimedia_connection import wikimedia_connection
+import wikibrain.wikimedia_link_issue_reporter
+from wikibrain import cache_invalidation
+from wikibrain import entity_view
+from wikibrain import interwiki_links
+
+entity = wikidata_cache_fixture.entity
+
+
+class Tests(unittest.TestCase):
+    def setUp(self):
+        self.cache_folder = wikidata_cache_fixture.use_temporary_cache()
+        interwiki_links.clear()
+        interwiki_links.link_cache.reset_statistics()
+        wikidata_cache_fixture.seed_entities([
+            entity("Q900001201", sitelinks={"dewiki": "Berlin", "plwiki": "Berlin (miasto)", "commonswiki": "Category:Berlin", "enwiki": "Berlin"}),
+            entity("Q900001202", sitelinks={"tawiki": "Article", "cswiki": "Článek", "be_x_oldwiki": "Артыкул"}),
+            entity("Q900001203", sitelinks={"commonswiki": "Category:Something"}),
+            entity("Q900001204"),
+        ])
+
+    def tearDown(self):
+        interwiki_links.clear()
+        self.cache_folder.cleanup()
+
+    def test_the_same_as_asking_for_each_language(self):
+        for preferred in [[], ["pl", "de"], ["ta"], ["be-tarask"]]:
+            detector = wikibrain.wikimedia_link_issue_reporter.WikimediaLinkIssueDetector(languages_ordered_by_preference=preferred)
+            for wikidata_id in ["Q900001201", "Q900001202", "Q900001203", "Q900001204"]:
+                expected = None
+                for language_code in detector.interwiki_lookup_order:
+                    article_name = wikimedia_connection.get_interwiki_article_name_by_id(wikidata_id, language_code)
+                    if article_name != None:
+                        expected = language_code + ':' + article_name
+                        break
+                self.assertEqual(expected, detector.get_best_interwiki_link_by_id(wikidata_id))
+        self.assertEqual(None, wikibrain.wikimedia_link_issue_reporter.WikimediaLinkIssueDetector().get_best_interwiki_link_by_id(None))
+
+    def test_links_are_cached_per_preferred_languages(self):
+        english = wikibrain.wikimedia_link_issue_reporter.WikimediaLinkIssueDetector()
+        polish = wikibrain.wikimedia_link_issue_reporter.WikimediaLinkIssueDetector(languages_ordered_by_preference=["pl"])
+        self.assertEqual("en:Berlin", english.get_best_interwiki_link_by_id("Q900001201"))
+        self.assertEqual("pl:Berlin (miasto)", polish.get_best_interwiki_link_by_id("Q900001201"))
+        self.assertEqual(None, english.get_best_interwiki_link_by_id("Q900001203"))
+        self.assertEqual(0, interwiki_links.statistics()["hits"])
+        self.assertEqual("en:Berlin", wikibrain.wikimedia_link_issue_reporter.WikimediaLinkIssueDetector().get_best_interwiki_link_by_id("Q900001201"))
+        self.assertEqual(None, english.get_best_interwiki_link_by_id("Q900001203"))
+        self.assertEqual(2, interwiki_links.statistics()["hits"])
+
+    def test_links_of_refreshed_entry_are_dropped(self):
+        detector = wikibrain.wikimedia_link_issue_reporter.WikimediaLinkIssueDetector()
+        self.assertEqual("en:Berlin", detector.get_best_interwiki_link_by_id("Q900001201"))
+        self.assertEqual(None, detector.get_best_interwiki_link_by_id("Q900001204"))
+        original = wikimedia_connection.download_data_from_wikidata_by_id
+        wikimedia_connection.download_data_from_wikidata_by_id = lambda wikidata_id: wikidata_cache_fixture.seed_entity(entity("Q900001201", sitelinks={"dewiki": "Berlin"}))
+        try:
+            entity_view.wikidata_response("Q900001201", forced_refresh=True)
+        finally:
+            wikimedia_connection.download_data_from_wikidata_by_id = original
+        self.assertEqual("de:Berlin", detector.get_best_interwiki_link_by_id("Q900001201"))
+
+        cache_invalidation.invalidate(cache_invalidation.FileCache(), cache_invalidation.targets_of_lines(["Q900001204"]))
+        wikidata_cache_fixture.seed_entity(entity("Q900001204", sitelinks={"plwiki": "Artykuł"}))
+        self.assertEqual("pl:Artykuł", detector.get_best_interwiki_link_by_id("Q900001204"))
+
+
+if __name__ == '__main__':
+    unittest.main()
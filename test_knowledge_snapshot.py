@@ -0,0 +1,128 @@
+import os
+import tempfile
+import unittest
+import wikibrain.wikidata_knowledge
+import wikibrain.wikimedia_link_issue_reporter
+from wikibrain import knowledge_snapshot
+from wikibrain import knowledge_pack
+
+
+class Tests(unittest.TestCase):
+    def test_snapshot_is_built_once(self):
+        self.assertIs(knowledge_snapshot.get_snapshot(), knowledge_snapshot.get_snapshot())
+
+    def test_snapshot_matches_source_tables(self):
+        snapshot = knowledge_snapshot.get_snapshot()
+        self.assertEqual(frozenset(wikibrain.wikidata_knowledge.skipped_cases()), snapshot.skipped_cases)
+        blacklist = wikibrain.wikidata_knowledge.blacklist_of_unlinkable_entries()
+        self.assertEqual(len(blacklist), len(snapshot.blacklist_of_unlinkable_entries))
+        for wikidata_id, entry in blacklist.items():
+            self.assertEqual(entry['prefix'], snapshot.blacklist_of_unlinkable_entries[wikidata_id]['prefix'])
+        detector_class = wikibrain.wikimedia_link_issue_reporter.WikimediaLinkIssueDetector
+        for type_id, entry in detector_class.hardcoded_invalid_types().items():
+            self.assertEqual(entry['what'], snapshot.invalid_types[type_id]['what'])
+
+    def test_ignored_entries_keep_order_without_duplicates(self):
+        detector_class = wikibrain.wikimedia_link_issue_reporter.WikimediaLinkIssueDetector
+        expected = []
+        for wikidata_id in (detector_class.ignored_entries_in_wikidata_ontology_without_skipping_known_bugs() + detector_class.workarounds_for_wikidata_bugs_breakage_and_mistakes()):
+            if wikidata_id not in expected:
+                expected.append(wikidata_id)
+        self.assertEqual(expected, detector_class.ignored_entries_in_wikidata_ontology())
+        for wikidata_id in expected:
+            self.assertEqual(True, detector_class.is_ignored_in_wikidata_ontology(wikidata_id))
+
+    def test_snapshot_tables_are_read_only(self):
+        snapshot = knowledge_snapshot.get_snapshot()
+        with self.assertRaises(TypeError):
+            snapshot.invalid_types['Q42'] = {'what': 'a writer', 'replacement': None}
+        with self.assertRaises(TypeError):
+            snapshot.blacklist_of_unlinkable_entries['Q42'] = {'prefix': 'author:'}
+
+    def test_fingerprint_depends_on_content(self):
+        tables = knowledge_snapshot.tables_from_source_code()
+        first = knowledge_snapshot.KnowledgeSnapshot(tables)
+        self.assertEqual(first.fingerprint, knowledge_snapshot.get_snapshot().fingerprint)
+        tables["skipped_cases"] = tables["skipped_cases"] + ["Q42"]
+        second = knowledge_snapshot.KnowledgeSnapshot(tables)
+        self.assertNotEqual(first.fingerprint, second.fingerprint)
+        self.assertNotEqual(first.fingerprints["skipped_cases"], second.fingerprints["skipped_cases"])
+        self.assertEqual(first.fingerprints["invalid_types"], second.fingerprints["invalid_types"])
+
+    def test_knowledge_pack_gives_the_same_snapshot(self):
+        with tempfile.TemporaryDirectory() as folder:
+            filepath = os.path.join(folder, "knowledge_pack.bin")
+            knowledge_pack.build_pack(filepath)
+            self.assertNotEqual(None, knowledge_pack.read_pack(filepath))
+            from_pack = knowledge_pack.load_snapshot(filepath)
+            from_source = knowledge_snapshot.KnowledgeSnapshot(knowledge_snapshot.tables_from_source_code())
+            self.assertEqual(from_source.fingerprint, from_pack.fingerprint)
+            self.assertEqual(from_source.ignored_entries_in_wikidata_ontology_in_order, from_pack.ignored_entries_in_wikidata_ontology_in_order)
+            self.assertEqual(dict(from_source.invalid_types).keys(), dict(from_pack.invalid_types).keys())
+
+    def test_knowledge_pack_is_ignored_when_missing_or_corrupted(self):
+        with tempfile.TemporaryDirectory() as folder:
+            filepath = os.path.join(folder, "knowledge_pack.bin")
+            self.assertEqual(None, knowledge_pack.read_pack(filepath))
+            knowledge_pack.build_pack(filepath)
+            with open(filepath, 'rb') as infile:
+                content = infile.read()
+            with open(filepath, 'wb') as outfile:
+                outfile.write(content[:-10] + b"0123456789")
+            self.assertEqual(None, knowledge_pack.read_pack(filepath))
+            self.assertEqual(knowledge_snapshot.get_snapshot().fingerprint, knowledge_pack.load_snapshot(filepath).fingerprint)
+
+    def test_knowledge_pack_is_ignored_when_source_was_modified(self):
+        with tempfile.TemporaryDirectory() as folder:
+            filepath = os.path.join(folder, "knowledge_pack.bin")
+            source = os.path.join(folder, "wikidata_knowledge.py")
+            with open(source, 'w') as outfile:
+                outfile.write("# tables\n")
+            original = knowledge_pack.source_files_defining_tables
+            knowledge_pack.source_files_defining_tables = lambda: [source]
+            try:
+                knowledge_pack.build_pack(filepath)
+                self.assertNotEqual(None, knowledge_pack.read_pack(filepath))
+                # installing or copying package changes modification time, but not content
+                os.utime(source, ns=(0, os.stat(source).st_mtime_ns + 1000000000))
+                self.assertNotEqual(None, knowledge_pack.read_pack(filepath))
+                with open(source, 'w') as outfile:
+                    outfile.write("# TABLES\n")
+                self.assertEqual(None, knowledge_pack.read_pack(filepath))
+            finally:
+                knowledge_pack.source_files_defining_tables = original
+
+    def test_overlay_is_swapped_in_and_reports_changed_tables(self):
+        base_fingerprint = knowledge_snapshot.get_snapshot().fingerprint
+        changes = []
+
+        def listener(changed_table_names, snapshot):
+            changes.append(changed_table_names)
+        knowledge_snapshot.register_snapshot_change_listener(listener)
+        detector_class = wikibrain.wikimedia_link_issue_reporter.WikimediaLinkIssueDetector
+        try:
+            with tempfile.TemporaryDirectory() as folder:
+                with open(os.path.join(folder, "skipped_cases.yaml"), 'w') as outfile:
+                    outfile.write("Q42: test entry\n")
+                knowledge_snapshot.set_overlay_location(folder, check_interval_in_seconds=0)
+                self.assertEqual(True, "Q42" in knowledge_snapshot.get_snapshot().skipped_cases)
+                self.assertEqual([frozenset(["skipped_cases"])], changes)
+
+                with open(os.path.join(folder, "workarounds_for_wikidata_bugs_breakage_and_mistakes.json"), 'w') as outfile:
+                    outfile.write('["Q4115189"]')
+                self.assertEqual(True, detector_class.is_ignored_in_wikidata_ontology("Q4115189"))
+                self.assertEqual(frozenset(["workarounds_for_wikidata_bugs_breakage_and_mistakes", "ignored_entries_in_wikidata_ontology"]), changes[-1])
+
+                with open(os.path.join(folder, "blacklist_of_unlinkable_entries.json"), 'w') as outfile:
+                    outfile.write('{"Q4115189": {"prefix": "subject:"')  # partially written
+                self.assertEqual(True, detector_class.is_ignored_in_wikidata_ontology("Q4115189"))
+                self.assertEqual(2, len(changes))
+        finally:
+            knowledge_snapshot.set_overlay_location(None)
+            knowledge_snapshot.unregister_snapshot_change_listener(listener)
+        self.assertEqual(base_fingerprint, knowledge_snapshot.get_snapshot().fingerprint)
+        self.assertEqual(False, "Q42" in knowledge_snapshot.get_snapshot().skipped_cases)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+import os
+import tempfile
+import unittest
+import wikidata_cache_fixture
+from wikimedia_connection import wikimedia_connection
+import wikibrain.wikimedia_link_issue_reporter
+from wikibrain import entity_view
+from wikibrain import negative_cache
+from wikibrain import prefetch
+
+
+class Tests(unittest.TestCase):
+    def setUp(self):
+        self.cache_folder = wikidata_cache_fixture.use_temporary_cache()
+        self.now = 1000000
+        negative_cache.set_clock(lambda: self.now)
+        negative_cache.set_ttl(negative_cache.DEFAULT_TTL)
+        negative_cache.reset_statistics()
+        entity_view.clear()
+
+    def tearDown(self):
+        negative_cache.set_clock(negative_cache.time.time)
+        negative_cache.set_max_size(negative_cache.DEFAULT_MAX_SIZE)
+        negative_cache.clear()
+        entity_view.clear()
+        self.cache_folder.cleanup()
+
+    def test_answers_expire(self):
+        negative_cache.set_ttl(60)
+        negative_cache.record_missing(negative_cache.ENTITY, "Q900001501")
+        self.assertEqual(True, negative_cache.is_known_missing(negative_cache.ENTITY, "Q900001501"))
+        self.assertEqual(False, negative_cache.is_known_missing(negative_cache.ARTICLE, "Q900001501"))
+        self.now += 61
+        self.assertEqual(False, negative_cache.is_known_missing(negative_cache.ENTITY, "Q900001501"))
+        self.assertEqual({"saved_lookups": 1, "recorded": 1, "expired": 1, "size": 0}, negative_cache.statistics())
+
+    def test_count_of_answers_is_limited(self):
+        negative_cache.set_max_size(2)
+        for wikidata_id in ["Q900001511", "Q900001512", "Q900001513"]:
+            negative_cache.record_missing(negative_cache.ENTITY, wikidata_id)
+        self.assertEqual(2, negative_cache.statistics()["size"])
+        self.assertEqual(False, negative_cache.is_known_missing(negative_cache.ENTITY, "Q900001511"))
+        self.assertEqual(True, negative_cache.is_known_missing(negative_cache.ENTITY, "Q900001513"))
+
+    def test_answers_are_saved_and_loaded(self):
+        negative_cache.set_ttl(60)
+        negative_cache.record_missing(negative_cache.ARTICLE, negative_cache.article_key("en", "Missing"))
+        self.now += 30
+        negative_cache.record_missing(negative_cache.ENTITY, "Q900001501")
+        with tempfile.TemporaryDirectory() as folder:
+            filepath = os.path.join(folder, "negative.json")
+            negative_cache.save(filepath)
+            negative_cache.clear()
+            self.now += 40
+            negative_cache.load(filepath)
+            negative_cache.load(os.path.join(folder, "not_existing.json"))
+        self.assertEqual(False, negative_cache.is_known_missing(negative_cache.ARTICLE, "en:Missing"))
+        self.assertEqual(True, negative_cache.is_known_missing(negative_cache.ENTITY, "Q900001501"))
+
+    def test_expired_and_forced_lookups_are_refreshed(self):
+        negative_cache.set_ttl(60)
+        requested = []
+        created = []
+
+        def fetch(wikidata_id, forced_refresh=False):
+            requested.append(forced_refresh)
+            if created == []:
+                return None
+            return {"entities": {wikidata_id: {"id": wikidata_id}}}
+        original = wikimedia_connection.get_data_from_wikidata_by_id
+        wikimedia_connection.get_data_from_wikidata_by_id = fetch
+        try:
+            self.assertEqual(None, entity_view.wikidata_response("Q900001503"))
+            self.assertEqual(None, entity_view.wikidata_response("Q900001503"))
+            self.assertEqual(None, entity_view.wikidata_response("Q900001503", forced_refresh=True))
+            self.assertEqual([False, True], requested)
+            created.append(True)
+            self.now += 61
+            self.assertEqual("Q900001503", entity_view.wikidata_response("Q900001503")["entities"]["Q900001503"]["id"])
+            self.assertEqual([False, True, True], requested)
+            self.assertEqual(negative_cache.UNKNOWN, negative_cache.state(negative_cache.ENTITY, "Q900001503"))
+        finally:
+            wikimedia_connection.get_data_from_wikidata_by_id = original
+
+    def test_detector_does_not_ask_again_about_missing_entries(self):
+        prefetch.write_entity_to_cache("Q900001502", {"id": "Q900001502", "missing": ""})
+        prefetch.write_article_to_cache("en", "Missing article", "-1", {"site": "enwiki", "title": "Missing article", "missing": ""})
+        wikimedia_connection.write_to_text_file(wikimedia_connection.get_filename_with_article("en", "Missing article"), "")
+        wikimedia_connection.write_to_text_file(wikimedia_connection.get_filename_with_wikipedia_response_code("en", "Missing article"), "404")
+        detector = wikibrain.wikimedia_link_issue_reporter.WikimediaLinkIssueDetector()
+        self.assertEqual("wikidata tag links to 404", detector.check_is_wikidata_page_existing("wikidata", "Q900001502").error_id)
+        # with empty response code file it would be downloaded again
+        wikimedia_connection.write_to_text_file(wikimedia_connection.get_filename_with_wikidata_by_id_response_code("Q900001502"), "")
+        self.assertEqual("wikidata tag links to 404", detector.check_is_wikidata_page_existing("wikidata", "Q900001502").error_id)
+        self.assertEqual(1, negative_cache.statistics()["saved_lookups"])
+
+        self.assertEqual("wikipedia tag links to 404", detector.check_is_wikipedia_page_existing("en", "Missing article").error_id)
+        wikimedia_connection.write_to_text_file(wikimedia_connection.get_filename_with_wikipedia_response_code("en", "Missing article"), "")
+        self.assertEqual("wikipedia tag links to 404", detector.check_is_wikipedia_page_existing("en", "Missing article").error_id)
+        self.assertEqual(3, negative_cache.statistics()["saved_lookups"])
+
+
+if __name__ == '__main__':
+    unittest.main()
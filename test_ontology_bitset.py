@@ -0,0 +1,110 @@
+import unittest
+import wikidata_cache_fixture
+import wikibrain.wikimedia_link_issue_reporter
+from wikibrain import ontology_bitset
+from wikibrain import ontology_cache
+
+entity = wikidata_cache_fixture.entity
+
+
+class Tests(unittest.TestCase):
+    def setUp(self):
+        self.cache_folder = wikidata_cache_fixture.use_temporary_cache()
+        ontology_cache.clear()
+        ontology_bitset.clear()
+        wikidata_cache_fixture.seed_entities([
+            # banned types
+            entity("Q3002150"),  # aircraft crash
+            entity("Q5"),  # human
+            entity("Q1656682"),  # event, extremely broad
+            entity("Q98374631"),  # transport by country or region, extremely broad
+            entity("Q122754124"),  # ambiguous Wikidata item
+            # plain class without banned ancestors
+            entity("Q900000001", subclass_of=["Q900000002"]),
+            entity("Q900000002"),
+            # cycle leading to aircraft crash
+            entity("Q900000011", subclass_of=["Q900000012"]),
+            entity("Q900000012", subclass_of=["Q900000013"]),
+            entity("Q900000013", subclass_of=["Q900000011", "Q3002150"]),
+            # two specific reasons
+            entity("Q900000021", subclass_of=["Q5", "Q900000011"]),
+            # specific and broad reasons
+            entity("Q900000031", subclass_of=["Q1656682", "Q900000011"]),
+            # two broad reasons
+            entity("Q900000041", subclass_of=["Q1656682", "Q98374631"]),
+            # ambiguous item
+            entity("Q900000051", subclass_of=["Q900000011", "Q122754124"]),
+            # instances
+            entity("Q900000101", instance_of=["Q900000001"]),
+            entity("Q900000102", instance_of=["Q900000012"]),
+            entity("Q900000103", instance_of=["Q900000021"]),
+            entity("Q900000104", instance_of=["Q900000031"]),
+            entity("Q900000105", instance_of=["Q900000041"]),
+            entity("Q900000106", instance_of=["Q900000051"]),
+            entity("Q900000107", instance_of=["Q5"]),
+            entity("Q900000108", instance_of=["Q900000001", "Q1656682"]),
+        ])
+
+    def tearDown(self):
+        ontology_cache.clear()
+        ontology_bitset.clear()
+        self.cache_folder.cleanup()
+
+    def detector(self):
+        return wikibrain.wikimedia_link_issue_reporter.WikimediaLinkIssueDetector()
+
+    def test_masks_cover_closure(self):
+        index = ontology_bitset.get_index()
+        self.assertEqual(0, index.mask("Q900000001"))
+        self.assertEqual(["Q3002150"], index.type_ids_in_mask(index.mask("Q900000011")))
+        self.assertEqual(index.mask("Q900000011"), index.mask("Q900000012"))
+        self.assertEqual(index.mask("Q900000011"), index.mask("Q900000013"))
+        self.assertEqual(["Q3002150", "Q5"], index.type_ids_in_mask(index.mask("Q900000021")))
+        self.assertEqual(True, index.has_marker(index.mask("Q900000051")))
+        self.assertEqual(False, index.has_marker(index.mask("Q900000021")))
+
+    def test_masks_are_reused(self):
+        index = ontology_bitset.get_index()
+        index.mask("Q900000021")
+        misses = index.masks.statistics()["misses"]
+        self.assertEqual(index.mask("Q900000011"), index.mask("Q900000013"))
+        self.assertEqual(misses, index.masks.statistics()["misses"])
+
+    def test_bitset_gives_the_same_result_as_walking_ontology(self):
+        for wikidata_id in ["Q900000101", "Q900000102", "Q900000103", "Q900000104", "Q900000105", "Q900000106", "Q900000107", "Q900000108"]:
+            for tags in [{"wikidata": wikidata_id}, {"wikidata": wikidata_id, "boundary": "aboriginal_lands"}]:
+                expected = self.detector().get_error_report_if_type_unlinkable_as_primary_by_walking_ontology(wikidata_id, tags)
+                reported = self.detector().get_error_report_if_type_unlinkable_as_primary(wikidata_id, tags)
+                if expected == None:
+                    self.assertEqual(None, reported, wikidata_id)
+                else:
+                    self.assertEqual(expected.data(), reported.data(), wikidata_id)
+
+    def test_batch_gives_the_same_results_as_single_checks(self):
+        entries = []
+        for wikidata_id in ["Q900000101", "Q900000102", "Q900000103", "Q900000104", "Q900000105", "Q900000106", "Q900000107", "Q900000108", "Q5338613"]:
+            entries.append((wikidata_id, {"wikidata": wikidata_id}))
+        entries.append(("Q900000107", {"wikidata": "Q900000107", "boundary": "aboriginal_lands"}))
+        reports = self.detector().get_error_reports_if_type_unlinkable_as_primary(entries)
+        self.assertEqual(len(entries), len(reports))
+        for (wikidata_id, tags), reported in zip(entries, reports):
+            expected = self.detector().get_error_report_if_type_unlinkable_as_primary(wikidata_id, tags)
+            if expected == None:
+                self.assertEqual(None, reported, wikidata_id)
+            else:
+                self.assertEqual(expected.data(), reported.data(), wikidata_id)
+
+    def test_reasons_independent_of_walk_order_are_selected_without_walking(self):
+        detector = self.detector()
+        self.assertEqual((True, None), detector.select_reason_from_banned_types([], {}))
+        determined, reason = detector.select_reason_from_banned_types(["Q1656682", "Q3002150"], {})
+        self.assertEqual(True, determined)
+        self.assertEqual('an aircraft crash', reason['what'])
+        self.assertEqual((False, None), detector.select_reason_from_banned_types(["Q3002150", "Q5"], {}))
+        self.assertEqual((False, None), detector.select_reason_from_banned_types(["Q1656682", "Q98374631"], {}))
+        determined, reason = detector.select_reason_from_banned_types(["Q3002150", "Q5"], {"boundary": "aboriginal_lands"})
+        self.assertEqual('an aircraft crash', reason['what'])
+
+
+if __name__ == '__main__':
+    unittest.main()
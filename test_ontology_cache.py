@@ -0,0 +1,201 @@
+import os
+import unittest
+import wikidata_cache_fixture
+from wikimedia_connection import wikidata_processing
+import wikibrain.wikimedia_link_issue_reporter
+from wikibrain import entity_view
+from wikibrain import knowledge_snapshot
+from wikibrain import lru_cache
+from wikibrain import ontology_cache
+from wikibrain import ontology_bitset
+from wikibrain import ontology_store
+
+
+class Tests(unittest.TestCase):
+    def setUp(self):
+        self.cache_folder = wikidata_cache_fixture.use_temporary_cache()
+        ontology_cache.clear()
+        ontology_bitset.clear()
+        ontology_cache.closure_cache.reset_statistics()
+        ontology_cache.merged_cache.reset_statistics()
+        wikidata_cache_fixture.seed_entities([
+            wikidata_cache_fixture.entity("Q900000001", subclass_of=["Q900000002", "Q900000003"]),
+            wikidata_cache_fixture.entity("Q900000002", subclass_of=["Q900000004"]),
+            wikidata_cache_fixture.entity("Q900000003", subclass_of=["Q900000004"]),
+            wikidata_cache_fixture.entity("Q900000004", subclass_of=["Q3002150"]),
+            wikidata_cache_fixture.entity("Q3002150"),  # aircraft crash
+            wikidata_cache_fixture.entity("Q900000010", instance_of=["Q900000001"]),
+        ])
+
+    def tearDown(self):
+        ontology_cache.clear()
+        self.cache_folder.cleanup()
+
+    def test_lru_cache_evicts_least_recently_used(self):
+        cache = lru_cache.LruCache(2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        self.assertEqual(1, cache.get("a"))
+        cache.put("c", 3)
+        self.assertEqual(None, cache.get("b"))
+        self.assertEqual(1, cache.get("a"))
+        self.assertEqual(3, cache.get("c"))
+        self.assertEqual({"hits": 3, "misses": 1, "evictions": 1, "size": 2, "max_size": 2}, cache.statistics())
+
+    def test_module_functions_cover_all_caches(self):
+        first = lru_cache.LruCache(3)
+        second = lru_cache.LruCache(3)
+        statistics, clear, set_max_size = lru_cache.module_functions(first, second)
+        for cache in [first, second]:
+            cache.put("a", 1)
+            cache.put("b", 2)
+        set_max_size(1)
+        self.assertEqual({"hits": 0, "misses": 0, "evictions": 1, "size": 1, "max_size": 1}, statistics())
+        self.assertEqual(1, second.max_size)
+        clear()
+        self.assertEqual(0, len(second))
+
+    def test_closure_matches_wikidata_processing(self):
+        ignored = knowledge_snapshot.get_snapshot().ignored_entries_in_wikidata_ontology_in_order
+        expected = wikidata_processing.get_recursive_all_subclass_of_with_depth_data("Q900000001", list(ignored), False, callback=None)
+        self.assertEqual(expected, ontology_cache.get_recursive_all_subclass_of_with_depth_data("Q900000001"))
+        expected = wikidata_processing.get_recursive_all_subclass_of("Q900000001", list(ignored), False, callback=None)
+        self.assertEqual(expected, ontology_cache.get_recursive_all_subclass_of("Q900000001"))
+
+    def test_closure_is_computed_once(self):
+        ontology_cache.get_recursive_all_subclass_of("Q900000001")
+        ontology_cache.get_recursive_all_subclass_of("Q900000001")
+        ontology_cache.get_recursive_all_subclass_of_with_depth_data("Q900000001")
+        statistics = ontology_cache.statistics()
+        self.assertEqual(1, statistics["misses"])
+        self.assertEqual(2, statistics["hits"])
+
+    def test_returned_data_may_be_modified_by_caller(self):
+        ontology_cache.get_recursive_all_subclass_of_with_depth_data("Q900000001")[0]["depth"] = 100
+        self.assertEqual(0, ontology_cache.get_recursive_all_subclass_of_with_depth_data("Q900000001")[0]["depth"])
+
+    def test_unlinkable_check_reuses_closures(self):
+        detector = wikibrain.wikimedia_link_issue_reporter.WikimediaLinkIssueDetector()
+        for _ in range(3):
+            report = detector.get_error_report_if_type_unlinkable_as_primary_by_walking_ontology("Q900000010", {"wikidata": "Q900000010"})
+            self.assertNotEqual(None, report)
+            self.assertIn("an aircraft crash", report.error_message)
+        self.assertEqual(1, ontology_cache.merged_cache.statistics()["misses"])
+        self.assertEqual(2, ontology_cache.merged_cache.statistics()["hits"])
+
+    def test_persistent_store_survives_clearing_memory_cache(self):
+        store = ontology_store.ClosureStore(os.path.join(self.cache_folder.name, "closures.sqlite"))
+        ontology_cache.set_persistent_store(store)
+        try:
+            expected = ontology_cache.get_recursive_all_subclass_of_with_depth_data("Q900000001")
+            ontology_cache.clear()
+            os.remove(wikidata_cache_fixture.wikimedia_connection.get_filename_with_wikidata_entity_by_id("Q900000002"))
+            # served from store, without reading removed cache file
+            self.assertEqual(expected, ontology_cache.get_recursive_all_subclass_of_with_depth_data("Q900000001"))
+            self.assertEqual(1, store.hits)
+        finally:
+            ontology_cache.set_persistent_store(None)
+            store.close()
+
+    def test_refreshed_class_drops_closures_passing_through_it(self):
+        store = ontology_store.ClosureStore(os.path.join(self.cache_folder.name, "closures.sqlite"))
+        ontology_cache.set_persistent_store(store)
+        try:
+            ontology_cache.get_recursive_all_subclass_of("Q900000001")
+            ontology_cache.get_recursive_all_subclass_of("Q900000003")
+            ontology_cache.get_recursive_all_subclass_of("Q3002150")
+            self.assertEqual(3, store.count())
+            wikidata_cache_fixture.seed_entity(wikidata_cache_fixture.entity("Q900000003", subclass_of=[]))
+            ontology_cache.class_refreshed("Q900000003")
+            self.assertEqual(1, store.count())
+            self.assertEqual(["Q3002150", "Q900000001", "Q900000002", "Q900000003", "Q900000004"], sorted(ontology_cache.get_recursive_all_subclass_of("Q900000001")))
+            self.assertEqual(["Q900000003"], ontology_cache.get_recursive_all_subclass_of("Q900000003"))
+        finally:
+            ontology_cache.set_persistent_store(None)
+            store.close()
+
+    def test_forced_refresh_of_entity_updates_stored_closures(self):
+        store = ontology_store.ClosureStore(os.path.join(self.cache_folder.name, "closures.sqlite"))
+        ontology_cache.set_persistent_store(store)
+        original = wikidata_cache_fixture.wikimedia_connection.download_data_from_wikidata_by_id
+        # Q900000003 is no longer a subclass of Q900000004 on Wikidata
+        refreshed = wikidata_cache_fixture.entity("Q900000003", subclass_of=["Q900000005"])
+        wikidata_cache_fixture.wikimedia_connection.download_data_from_wikidata_by_id = lambda wikidata_id: wikidata_cache_fixture.seed_entity(refreshed)
+        try:
+            wikidata_cache_fixture.seed_entity(wikidata_cache_fixture.entity("Q900000005"))
+            self.assertEqual(["Q900000003", "Q900000004", "Q3002150"], ontology_cache.get_recursive_all_subclass_of("Q900000003"))
+            ontology_cache.get_recursive_all_subclass_of("Q900000001")
+            ontology_cache.get_recursive_all_subclass_of("Q900000002")
+            self.assertEqual(3, store.count())
+            entity_view.wikidata_response("Q900000003", forced_refresh=True)
+            self.assertEqual(1, store.count())  # closure of Q900000002 does not pass through Q900000003
+            self.assertEqual(["Q900000003", "Q900000005"], ontology_cache.get_recursive_all_subclass_of("Q900000003"))
+            self.assertIn("Q900000005", ontology_cache.get_recursive_all_subclass_of("Q900000001"))
+        finally:
+            wikidata_cache_fixture.wikimedia_connection.download_data_from_wikidata_by_id = original
+            ontology_cache.set_persistent_store(None)
+            store.close()
+
+    def test_merged_closures_list_shared_ancestors_once(self):
+        merged = ontology_cache.merged_closures(["Q900000002", "Q900000001"])
+        self.assertEqual(["Q900000002", "Q900000004", "Q3002150", "Q900000001", "Q900000003"], merged.ids)
+        self.assertEqual(2, merged.skipped)  # Q900000002 and Q900000004 reached again from Q900000001 and Q900000003
+        # closure of Q900000001 is Q900000001, Q900000003, Q900000004, Q3002150, Q900000002
+        # and it is the last closure where each of these entries appears
+        self.assertEqual(["Q900000001", "Q900000003", "Q900000004", "Q3002150", "Q900000002"], sorted(merged.ids, key=lambda wikidata_id: merged.last_position[wikidata_id]))
+        self.assertIs(merged, ontology_cache.merged_closures(["Q900000002", "Q900000001"]))
+
+    def test_merged_closures_walk_shared_ancestors_once(self):
+        walked = []
+        original = ontology_cache.ontology_data.useful_direct_parents
+
+        def recording(class_id, forbidden):
+            walked.append(class_id)
+            return original(class_id, forbidden)
+        ontology_cache.ontology_data.useful_direct_parents = recording
+        try:
+            merged = ontology_cache.merged_closures(["Q900000002", "Q900000003", "Q900000001"])
+        finally:
+            ontology_cache.ontology_data.useful_direct_parents = original
+        self.assertEqual(sorted(merged.ids), sorted(walked))
+        self.assertEqual(len(set(walked)), len(walked))
+
+    def test_merged_closures_match_joined_closures(self):
+        class_ids = ["Q900000003", "Q900000010", "Q900000002", "Q900000001"]
+        joined = []
+        for class_id in class_ids:
+            joined += ontology_cache.get_recursive_all_subclass_of(class_id)
+        merged = ontology_cache.merged_closures(class_ids)
+        first_appearance = []
+        for wikidata_id in joined:
+            if wikidata_id not in first_appearance:
+                first_appearance.append(wikidata_id)
+        self.assertEqual(first_appearance, merged.ids)
+        last_appearance = sorted(set(joined), key=lambda wikidata_id: len(joined) - 1 - joined[::-1].index(wikidata_id))
+        self.assertEqual(last_appearance, sorted(merged.ids, key=lambda wikidata_id: merged.last_position[wikidata_id]))
+
+    def test_classifying_entries_are_not_repeated(self):
+        detector = wikibrain.wikimedia_link_issue_reporter.WikimediaLinkIssueDetector()
+        wikidata_cache_fixture.seed_entity(wikidata_cache_fixture.entity("Q900000020", instance_of=["Q900000002", "Q900000003"]))
+        self.assertEqual(["Q900000020", "Q900000002", "Q900000004", "Q3002150", "Q900000003"], detector.wikidata_entries_classifying_entry("Q900000020"))
+
+    def test_classifying_entries_with_depth_data_list_each_closure(self):
+        # used in debug reports, each closure is listed in full
+        detector = wikibrain.wikimedia_link_issue_reporter.WikimediaLinkIssueDetector()
+        wikidata_cache_fixture.seed_entity(wikidata_cache_fixture.entity("Q900000020", instance_of=["Q900000002", "Q900000003"]))
+        self.assertEqual([
+            {"id": "Q900000020", "depth": 0},
+            {"id": "Q900000002", "depth": 1},  # types are listed below entry
+            {"id": "Q900000003", "depth": 1},
+            {"id": "Q900000002", "depth": 0},  # closure of each type follows
+            {"id": "Q900000004", "depth": 1},
+            {"id": "Q3002150", "depth": 2},
+            {"id": "Q900000002", "depth": 0},  # and type itself
+            {"id": "Q900000003", "depth": 0},
+            {"id": "Q900000004", "depth": 1},
+            {"id": "Q3002150", "depth": 2},
+            {"id": "Q900000003", "depth": 0},
+        ], detector.wikidata_entries_classifying_entry_with_depth_data("Q900000020"))
+
+if __name__ == '__main__':
+    unittest.main()
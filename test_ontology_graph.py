@@ -0,0 +1,126 @@
+import random
+import tempfile
+import unittest
+import wikidata_cache_fixture
+from wikimedia_connection import wikidata_processing
+import wikibrain.wikimedia_link_issue_reporter
+from wikibrain import knowledge_snapshot
+from wikibrain import ontology_bitset
+from wikibrain import ontology_cache
+from wikibrain import ontology_data
+
+try:
+    from wikibrain import ontology_graph
+except ImportError:
+    # numpy is optional
+    ontology_graph = None
+
+entity = wikidata_cache_fixture.entity
+
+
+def random_entities(generator, count):
+    returned = []
+    for index in range(count):
+        parents = ["Q" + str(900000400 + generator.randrange(count)) for _ in range(generator.randrange(4))]
+        returned.append(entity("Q" + str(900000400 + index), subclass_of=parents))
+    return returned
+
+
+@unittest.skipIf(ontology_graph == None, "numpy is not installed")
+class Tests(unittest.TestCase):
+    def setUp(self):
+        self.cache_folder = wikidata_cache_fixture.use_temporary_cache()
+        ontology_data.set_active_graph(None)
+
+    def tearDown(self):
+        ontology_data.set_active_graph(None)
+        self.cache_folder.cleanup()
+
+    def test_traversal_matches_wikidata_processing(self):
+        generator = random.Random(13)
+        ignored = ["Q900000405"]
+        for _ in range(20):
+            entities = random_entities(generator, 15)
+            deprecated = wikidata_cache_fixture.claim("P279", "Q900000401", rank="deprecated")
+            entities[0]["claims"].setdefault("P279", []).append(deprecated)
+            wikidata_cache_fixture.seed_entities(entities)
+            graph = ontology_graph.build_graph(entities)
+            for data in entities:
+                expected = wikidata_processing.get_recursive_all_subclass_of_with_depth_data(data["id"], ignored, False, callback=None)
+                self.assertEqual(expected, graph.get_recursive_all_subclass_of_with_depth_data(data["id"], ignored))
+                expected = wikidata_processing.get_recursive_all_subclass_of(data["id"], ignored, False, callback=None)
+                self.assertEqual(expected, graph.get_recursive_all_subclass_of(data["id"], ignored))
+
+    def test_entries_without_data_are_read_from_wikidata(self):
+        wikidata_cache_fixture.seed_entities([entity("Q900000502", subclass_of=["Q900000503"]), entity("Q900000503")])
+        graph = ontology_graph.build_graph([entity("Q900000501", instance_of=["Q900000502"], subclass_of=["Q900000502"])])
+        self.assertEqual(["Q900000502"], graph.type_ids_of_entry("Q900000501"))
+        self.assertEqual(None, graph.index_of("Q900000502"))
+        self.assertEqual(["Q900000501", "Q900000502", "Q900000503"], graph.get_recursive_all_subclass_of("Q900000501", []))
+
+    def test_saved_graph_is_loaded_memory_mapped(self):
+        entities = random_entities(random.Random(3), 30)
+        graph = ontology_graph.build_graph(entities)
+        with tempfile.TemporaryDirectory() as folder:
+            graph.save(folder)
+            loaded = ontology_graph.load_graph(folder)
+            self.assertEqual(graph.memory_usage(), loaded.memory_usage())
+            for data in entities:
+                self.assertEqual(graph.get_recursive_all_subclass_of(data["id"], []), loaded.get_recursive_all_subclass_of(data["id"], []))
+            with self.assertRaises(ValueError):
+                loaded.ids[0] = 1
+            del loaded
+
+    def test_batch_masks_match_masks_of_single_classes(self):
+        generator = random.Random(7)
+        banned = [entity("Q3002150"), entity("Q5"), entity("Q1656682"), entity("Q122754124")]
+        banned_ids = [data["id"] for data in banned]
+        for _ in range(20):
+            entities = random_entities(generator, 15)
+            for data in entities:
+                if generator.randrange(4) == 0:
+                    data["claims"].setdefault("P279", []).append(wikidata_cache_fixture.claim("P279", generator.choice(banned_ids)))
+            without_data = entities.pop()
+            wikidata_cache_fixture.seed_entities(entities + banned + [without_data])
+            index = ontology_bitset.BannedAncestorIndex(knowledge_snapshot.get_snapshot().invalid_types, frozenset(["Q900000405"]))
+            expected = [index.mask(data["id"]) for data in entities + [without_data]]
+            ontology_data.set_active_graph(ontology_graph.build_graph(entities + banned))
+            index = ontology_bitset.BannedAncestorIndex(knowledge_snapshot.get_snapshot().invalid_types, frozenset(["Q900000405"]))
+            self.assertEqual(expected, index.masks_of([data["id"] for data in entities + [without_data]]))
+            ontology_data.set_active_graph(None)
+
+    def test_ignored_entry_without_data_blocks_its_ancestors(self):
+        # Q900000702 appears in graph only as target of P279 edge
+        entries = [entity("Q900000701", subclass_of=["Q900000702"]), entity("Q900000702", subclass_of=["Q3002150"]), entity("Q3002150")]
+        wikidata_cache_fixture.seed_entities(entries)
+        ignored = frozenset(["Q900000702"])
+        index = ontology_bitset.BannedAncestorIndex(knowledge_snapshot.get_snapshot().invalid_types, ignored)
+        self.assertEqual(0, index.mask("Q900000701"))
+        graph = ontology_graph.build_graph([entries[0]])
+        self.assertEqual(None, graph.index_of("Q900000702"))
+        ontology_data.set_active_graph(graph)
+        index = ontology_bitset.BannedAncestorIndex(knowledge_snapshot.get_snapshot().invalid_types, ignored)
+        self.assertEqual([0], index.masks_of(["Q900000701"]))
+
+    def test_detector_runs_on_graph(self):
+        # only the item itself is in cache of wikimedia_connection (report mentions its sitelinks)
+        # ontology data must come from graph
+        item = entity("Q900000601", instance_of=["Q900000602"])
+        wikidata_cache_fixture.seed_entity(item)
+        graph = ontology_graph.build_graph([
+            item,
+            entity("Q900000602", subclass_of=["Q3002150"]),
+            entity("Q3002150"),  # aircraft crash
+        ])
+        ontology_data.set_active_graph(graph)
+        self.assertEqual(0, ontology_cache.statistics()["size"])
+        ignored = knowledge_snapshot.get_snapshot().ignored_entries_in_wikidata_ontology_in_order
+        self.assertEqual(["Q900000602", "Q3002150"], ontology_cache.get_recursive_all_subclass_of("Q900000602"))
+        self.assertEqual(graph.get_recursive_all_subclass_of("Q900000602", ignored), ontology_cache.get_recursive_all_subclass_of("Q900000602"))
+        detector = wikibrain.wikimedia_link_issue_reporter.WikimediaLinkIssueDetector()
+        report = detector.get_error_report_if_type_unlinkable_as_primary("Q900000601", {"wikidata": "Q900000601"})
+        self.assertEqual("should use a secondary wikipedia tag - linking from wikidata tag to an aircraft crash", report.error_id)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+import unittest
+from unittest import mock
+import wikidata_cache_fixture
+from wikimedia_connection import wikidata_processing
+import wikibrain.wikimedia_link_issue_reporter
+from wikibrain import ontology_bitset
+from wikibrain import ontology_cache
+from wikibrain import ontology_traversal
+
+entity = wikidata_cache_fixture.entity
+
+
+class Tests(unittest.TestCase):
+    def setUp(self):
+        self.cache_folder = wikidata_cache_fixture.use_temporary_cache()
+        ontology_cache.clear()
+        ontology_bitset.clear()
+        wikidata_cache_fixture.seed_entities([
+            entity("Q3002150"),  # aircraft crash
+            entity("Q5"),  # human
+            entity("Q1656682"),  # event, extremely broad
+            entity("Q122754124"),  # ambiguous Wikidata item
+            entity("Q16521"),  # taxon
+            # long chain ending in human
+            entity("Q900000001", subclass_of=["Q900000002"]),
+            entity("Q900000002", subclass_of=["Q900000003"]),
+            entity("Q900000003", subclass_of=["Q900000004"]),
+            entity("Q900000004", subclass_of=["Q900000005"]),
+            entity("Q900000005", subclass_of=["Q5"]),
+            # close reason and a deep one
+            entity("Q900000011", subclass_of=["Q900000001", "Q3002150"]),
+            # broad reason only
+            entity("Q900000021", subclass_of=["Q1656682"]),
+            entity("Q900000101", instance_of=["Q900000011"]),
+            entity("Q900000102", instance_of=["Q900000021", "Q122754124"]),
+            entity("Q900000103", instance_of=["Q900000021"]),
+            entity("Q900000104", instance_of=["Q900000002"], subclass_of=["Q16521"]),
+        ])
+
+    def tearDown(self):
+        ontology_cache.clear()
+        ontology_bitset.clear()
+        self.cache_folder.cleanup()
+
+    def test_traversal_is_breadth_first(self):
+        walked = list(ontology_traversal.classifying_entries_breadth_first("Q900000101"))
+        self.assertEqual(("Q900000101", 0), walked[0])
+        self.assertEqual(("Q900000011", 0), walked[1])
+        self.assertEqual(("Q900000001", 1), walked[2])
+        self.assertEqual(("Q3002150", 1), walked[3])
+        self.assertEqual(("Q5", 6), walked[-1])
+
+    def test_traversal_covers_the_same_entries_as_full_walk(self):
+        detector = wikibrain.wikimedia_link_issue_reporter.WikimediaLinkIssueDetector()
+        for wikidata_id in ["Q900000101", "Q900000102", "Q900000103", "Q900000104"]:
+            walked = [entry[0] for entry in ontology_traversal.classifying_entries_breadth_first(wikidata_id)]
+            self.assertEqual(len(set(walked)), len(walked))
+            self.assertEqual(set(detector.wikidata_entries_classifying_entry(wikidata_id)), set(walked))
+
+    def test_traversal_is_lazy(self):
+        with mock.patch.object(wikidata_processing, "get_useful_direct_parents", wraps=wikidata_processing.get_useful_direct_parents) as parents:
+            for type_id, depth in ontology_traversal.classifying_entries_breadth_first("Q900000101"):
+                if type_id == "Q3002150":
+                    break
+            self.assertEqual(3, parents.call_count)
+
+    def test_early_stop_reports_the_closest_specific_reason(self):
+        detector = wikibrain.wikimedia_link_issue_reporter.WikimediaLinkIssueDetector(stop_ontology_walk_early=True)
+        report = detector.get_error_report_if_type_unlinkable_as_primary("Q900000101", {"wikidata": "Q900000101"})
+        self.assertIn("an aircraft crash", report.error_message)
+        # full walk reports the last specific reason
+        report = wikibrain.wikimedia_link_issue_reporter.WikimediaLinkIssueDetector().get_error_report_if_type_unlinkable_as_primary("Q900000101", {"wikidata": "Q900000101"})
+        self.assertIn("a human", report.error_message)
+
+    def test_early_stop_handles_broad_reasons_and_ambiguity_markers(self):
+        detector = wikibrain.wikimedia_link_issue_reporter.WikimediaLinkIssueDetector(stop_ontology_walk_early=True)
+        self.assertEqual(None, detector.get_error_report_if_type_unlinkable_as_primary("Q900000102", {"wikidata": "Q900000102"}))
+        report = detector.get_error_report_if_type_unlinkable_as_primary("Q900000103", {"wikidata": "Q900000103"})
+        self.assertIn("an event", report.error_message)
+
+    def test_taxon_check_uses_ontology(self):
+        detector = wikibrain.wikimedia_link_issue_reporter.WikimediaLinkIssueDetector()
+        self.assertEqual(None, detector.get_problem_based_on_taxon_tagging_with_regular_ontology({"taxon:wikidata": "Q900000104"}, "test", None, "taxon:", "Q16521"))
+        self.assertNotEqual(None, detector.get_problem_based_on_taxon_tagging_with_regular_ontology({"taxon:wikidata": "Q900000101"}, "test", None, "taxon:", "Q16521"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+import unittest
+import wikidata_cache_fixture
+from wikimedia_connection import wikidata_processing
+import wikibrain.wikimedia_link_issue_reporter
+from wikibrain import knowledge_snapshot
+from wikibrain import ontology_cache
+from wikibrain import page_kind
+
+
+class Tests(unittest.TestCase):
+    def setUp(self):
+        self.cache_folder = wikidata_cache_fixture.use_temporary_cache()
+        ontology_cache.clear()
+        page_kind.clear()
+        page_kind.kind_cache.reset_statistics()
+        wikidata_cache_fixture.seed_entities([
+            wikidata_cache_fixture.entity("Q4167410", subclass_of=["Q900000201"]),  # disambiguation page
+            wikidata_cache_fixture.entity("Q13406463", subclass_of=["Q900000201"]),  # list
+            wikidata_cache_fixture.entity("Q900000201"),
+            wikidata_cache_fixture.entity("Q900000202", subclass_of=["Q4167410"]),
+            wikidata_cache_fixture.entity("Q900000203"),
+            wikidata_cache_fixture.entity("Q900000210", instance_of=["Q900000202"]),
+            wikidata_cache_fixture.entity("Q900000211", instance_of=["Q13406463"]),
+            wikidata_cache_fixture.entity("Q900000212", instance_of=["Q900000203"]),
+            wikidata_cache_fixture.entity("Q900000213"),
+            wikidata_cache_fixture.entity("Q900000214", instance_of=["Q13406463", "Q4167410"]),
+        ])
+
+    def tearDown(self):
+        ontology_cache.clear()
+        page_kind.clear()
+        self.cache_folder.cleanup()
+
+    def test_kinds(self):
+        self.assertEqual(page_kind.DISAMBIGUATION, page_kind.classify("Q900000210").kind)
+        self.assertEqual(page_kind.LIST, page_kind.classify("Q900000211").kind)
+        self.assertEqual(page_kind.ARTICLE, page_kind.classify("Q900000212").kind)
+        self.assertEqual(page_kind.UNKNOWN, page_kind.classify("Q900000213").kind)
+
+    def test_first_reached_type_decides_kind(self):
+        kind = page_kind.classify("Q900000214")
+        self.assertEqual(page_kind.LIST, kind.kind)
+        self.assertEqual(True, kind.is_disambiguation)
+        self.assertEqual(True, kind.is_list)
+
+    def test_matches_walking_all_types(self):
+        ignored = list(knowledge_snapshot.get_snapshot().ignored_entries_in_wikidata_ontology_in_order)
+        for wikidata_id in ["Q900000210", "Q900000211", "Q900000212", "Q900000213", "Q900000214"]:
+            types = wikidata_processing.get_all_types_describing_wikidata_object(wikidata_id, ignored)
+            self.assertEqual("Q4167410" in types, page_kind.is_disambiguation(wikidata_id))
+            self.assertEqual("Q13406463" in types, page_kind.classify(wikidata_id).is_list)
+
+    def test_kind_is_computed_once(self):
+        page_kind.classify("Q900000210")
+        page_kind.classify("Q900000210")
+        self.assertEqual(1, page_kind.statistics()["misses"])
+        self.assertEqual(1, page_kind.statistics()["hits"])
+
+    def test_refreshing_class_drops_kinds(self):
+        page_kind.classify("Q900000210")
+        ontology_cache.class_refreshed("Q4167410")
+        self.assertEqual(0, page_kind.statistics()["size"])
+
+    def test_detector_reports_disambig_and_list(self):
+        detector = wikibrain.wikimedia_link_issue_reporter.WikimediaLinkIssueDetector()
+        self.assertEqual(True, detector.is_first_wikidata_disambig_while_second_points_to_something_not_disambig("Q900000210", "Q900000212"))
+        self.assertEqual(False, detector.is_first_wikidata_disambig_while_second_points_to_something_not_disambig("Q900000210", "Q900000214"))
+        self.assertEqual(False, detector.is_first_wikidata_disambig_while_second_points_to_something_not_disambig("Q900000212", "Q900000213"))
+        report = detector.get_error_report_if_wikipedia_target_is_of_unusable_type((50, 20), "Q900000211")
+        self.assertEqual("link to a list", report.error_id)
+        self.assertEqual(None, detector.get_error_report_if_wikipedia_target_is_of_unusable_type((50, 20), "Q900000212"))
+
+
+if __name__ == '__main__':
+    unittest.main()
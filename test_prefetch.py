@@ -0,0 +1,64 @@
+import unittest
+import wikidata_cache_fixture
+from wikimedia_connection import wikimedia_connection
+from wikibrain import prefetch
+
+entity = wikidata_cache_fixture.entity
+
+
+class Tests(unittest.TestCase):
+    def setUp(self):
+        self.cache_folder = wikidata_cache_fixture.use_temporary_cache()
+
+    def tearDown(self):
+        self.cache_folder.cleanup()
+
+    def test_ids_are_collected_from_tags(self):
+        tags = {"wikidata": "Q900000701", "brand:wikidata": "Q900000702;Q900000703", "species:wikidata": "Q900000704", "name": "Q1", "not:wikidata": "no"}
+        self.assertEqual(["Q900000701", "Q900000702", "Q900000703", "Q900000704"], sorted(prefetch.wikidata_ids_in_tags(tags)))
+        tags = {"wikipedia": "en:Some_article", "brand:wikipedia": "de:Marke", "wikipedia:pl": "Artykuł", "wikipedia:unknown": "Title", "subject:wikipedia": "no language code"}
+        self.assertEqual([("de", "Marke"), ("en", "Some_article"), ("pl", "Artykuł")], sorted(prefetch.wikipedia_links_in_tags(tags)))
+
+    def test_entities_are_fetched_in_groups_and_cached(self):
+        entities = [entity("Q" + str(900000800 + index), instance_of=["Q900000799"]) for index in range(120)]
+        entities.append(entity("Q900000799"))
+        transport = prefetch.InMemoryTransport(entities)
+        list_of_tags = [{"wikidata": data["id"]} for data in entities[:120]] + [{"wikidata": "Q900000999"}]
+        statistics = prefetch.prefetch_for_elements(list_of_tags, transport)
+        # 121 ids from tags, then one for their type
+        self.assertEqual([50, 50, 21, 1], [len(request) for request in transport.requests])
+        self.assertEqual(4, statistics["requests"])
+        self.assertEqual(122, statistics["fetched"])
+        self.assertEqual(["Q900000799"], [claim["mainsnak"]["datavalue"]["value"]["id"] for claim in wikimedia_connection.get_property_from_wikidata("Q900000850", "P31")])
+        self.assertEqual(None, wikimedia_connection.get_data_from_wikidata_by_id("Q900000999"))
+
+        statistics = prefetch.prefetch_for_elements(list_of_tags, transport)
+        self.assertEqual(0, statistics["requests"])
+        self.assertEqual(4, len(transport.requests))
+
+    def test_failing_group_is_split(self):
+        entities = [entity("Q" + str(900000800 + index)) for index in range(8)]
+        transport = prefetch.InMemoryTransport(entities, broken_ids=["Q900000805"])
+        statistics = prefetch.prefetch_for_elements([{"wikidata": data["id"]} for data in entities], transport)
+        self.assertEqual(7, statistics["fetched"])
+        self.assertEqual(1, statistics["not_fetched"])
+        self.assertEqual(False, prefetch.is_entity_cached("Q900000805"))
+        self.assertEqual(True, prefetch.is_entity_cached("Q900000806"))
+        self.assertEqual(7, statistics["requests"])  # 8 -> 4 -> 2 -> 1
+
+    def test_articles_are_resolved_with_their_ancestors(self):
+        entities = [
+            entity("Q900000901", instance_of=["Q900000902"], sitelinks={"enwiki": "Some article"}),
+            entity("Q900000902", subclass_of=["Q900000903"]),
+            entity("Q900000903"),
+        ]
+        transport = prefetch.InMemoryTransport(entities)
+        prefetch.prefetch_for_elements([{"wikipedia": "en:Some_article"}, {"wikipedia": "en:Missing article"}], transport)
+        self.assertEqual([["enwiki", "Some_article", "Missing article"], ["Q900000902"], ["Q900000903"]], transport.requests)
+        self.assertEqual("Q900000901", wikimedia_connection.get_wikidata_object_id_from_article("en", "Some_article"))
+        self.assertEqual(None, wikimedia_connection.get_wikidata_object_id_from_article("en", "Missing article"))
+        self.assertEqual(True, prefetch.is_entity_cached("Q900000903"))
+
+
+if __name__ == '__main__':
+    unittest.main()
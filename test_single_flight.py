@@ -0,0 +1,150 @@
+import threading
+import unittest
+import wikidata_cache_fixture
+from wikimedia_connection import wikimedia_connection
+import wikibrain.wikimedia_link_issue_reporter
+from wikibrain import entity_view
+from wikibrain import negative_cache
+from wikibrain import ontology_cache
+from wikibrain import single_flight
+
+
+def run_in_threads(count, function):
+    results = [None] * count
+
+    def run(position):
+        try:
+            results[position] = function()
+        except ValueError as e:
+            results[position] = e
+    threads = [threading.Thread(target=run, args=(position,)) for position in range(count)]
+    for thread in threads:
+        thread.start()
+    return threads, results
+
+
+def wait_for_waiting_calls(flight, count):
+    while flight.statistics()["coalesced"] < count:
+        threading.Event().wait(0.001)
+
+
+class Tests(unittest.TestCase):
+    def test_concurrent_calls_are_coalesced(self):
+        flight = single_flight.SingleFlight()
+        release = threading.Event()
+        calls = []
+
+        def slow():
+            calls.append(1)
+            release.wait()
+            return "result"
+        threads, results = run_in_threads(8, lambda: flight.do("Q1", slow))
+        wait_for_waiting_calls(flight, 7)
+        release.set()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(["result"] * 8, results)
+        self.assertEqual(1, len(calls))
+        self.assertEqual({"executed": 1, "coalesced": 7, "in_flight": 0}, flight.statistics())
+        # nothing is remembered after call finished
+        self.assertEqual("other", flight.do("Q1", lambda: "other"))
+        self.assertEqual(2, flight.statistics()["executed"])
+
+    def test_exception_is_passed_to_waiting_calls(self):
+        flight = single_flight.SingleFlight()
+        release = threading.Event()
+
+        def failing():
+            release.wait()
+            raise ValueError("failed")
+        threads, results = run_in_threads(3, lambda: flight.do("Q1", failing))
+        wait_for_waiting_calls(flight, 2)
+        release.set()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(["failed"] * 3, [str(result) for result in results])
+        self.assertEqual(0, flight.statistics()["in_flight"])
+
+    def test_entity_fetches_are_coalesced(self):
+        cache_folder = wikidata_cache_fixture.use_temporary_cache()
+        wikidata_cache_fixture.seed_entity(wikidata_cache_fixture.entity("Q900001401", labels={"en": "Brand"}))
+        entity_view.clear()
+        negative_cache.lookups.reset_statistics()
+        original = wikimedia_connection.get_data_from_wikidata_by_id
+        release = threading.Event()
+
+        def slow_fetch(wikidata_id, forced_refresh=False):
+            release.wait()
+            return original(wikidata_id, forced_refresh)
+        wikimedia_connection.get_data_from_wikidata_by_id = slow_fetch
+        try:
+            threads, results = run_in_threads(5, lambda: entity_view.wikidata_response("Q900001401"))
+            wait_for_waiting_calls(negative_cache.lookups, 4)
+            release.set()
+            for thread in threads:
+                thread.join()
+        finally:
+            wikimedia_connection.get_data_from_wikidata_by_id = original
+            cache_folder.cleanup()
+        self.assertEqual(["Brand"] * 5, [result["entities"]["Q900001401"]["labels"]["en"]["value"] for result in results])
+        self.assertEqual(1, entity_view.fetch_statistics()["executed"])
+        self.assertEqual(4, entity_view.fetch_statistics()["coalesced"])
+
+    def test_article_lookups_are_coalesced(self):
+        cache_folder = wikidata_cache_fixture.use_temporary_cache()
+        negative_cache.lookups.reset_statistics()
+        original = wikimedia_connection.get_wikidata_object_id_from_article
+        release = threading.Event()
+        calls = []
+
+        def slow_lookup(language_code, article_name, forced_refresh=False):
+            calls.append(article_name)
+            release.wait()
+            return "Q900001402"
+        wikimedia_connection.get_wikidata_object_id_from_article = slow_lookup
+        detector = wikibrain.wikimedia_link_issue_reporter.WikimediaLinkIssueDetector()
+        try:
+            threads, results = run_in_threads(4, lambda: detector.get_wikidata_id_of_article("en", "Brand"))
+            wait_for_waiting_calls(negative_cache.lookups, 3)
+            release.set()
+            for thread in threads:
+                thread.join()
+        finally:
+            wikimedia_connection.get_wikidata_object_id_from_article = original
+            cache_folder.cleanup()
+        self.assertEqual(["Q900001402"] * 4, results)
+        self.assertEqual(["Brand"], calls)
+
+    def test_closure_computations_are_coalesced(self):
+        cache_folder = wikidata_cache_fixture.use_temporary_cache()
+        wikidata_cache_fixture.seed_entities([
+            wikidata_cache_fixture.entity("Q900001403", subclass_of=["Q900001404"]),
+            wikidata_cache_fixture.entity("Q900001404"),
+        ])
+        ontology_cache.clear()
+        ontology_cache.computations.reset_statistics()
+        original = ontology_cache.ontology_data.get_recursive_all_subclass_of_with_depth_data
+        release = threading.Event()
+        calls = []
+
+        def slow_walk(class_id, ignored_entries_in_wikidata_ontology):
+            calls.append(class_id)
+            release.wait()
+            return original(class_id, ignored_entries_in_wikidata_ontology)
+        ontology_cache.ontology_data.get_recursive_all_subclass_of_with_depth_data = slow_walk
+        try:
+            threads, results = run_in_threads(6, lambda: ontology_cache.get_recursive_all_subclass_of("Q900001403"))
+            wait_for_waiting_calls(ontology_cache.computations, 5)
+            release.set()
+            for thread in threads:
+                thread.join()
+        finally:
+            ontology_cache.ontology_data.get_recursive_all_subclass_of_with_depth_data = original
+            ontology_cache.clear()
+            cache_folder.cleanup()
+        self.assertEqual([["Q900001403", "Q900001404"]] * 6, results)
+        self.assertEqual(["Q900001403"], calls)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,114 @@
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import unittest
+import osm_handling_config.global_config as osm_handling_config
+import wikidata_cache_fixture
+import warm_up_cache
+from wikimedia_connection import wikimedia_connection
+from wikibrain import prefetch
+from wikibrain import warm_up
+
+entity = wikidata_cache_fixture.entity
+
+OSM_FILE = """<?xml version='1.0' encoding='UTF-8'?>
+<osm version="0.6">
+  <node id="1" lat="50.0" lon="20.0">
+    <tag k="shop" v="supermarket"/>
+    <tag k="brand:wikidata" v="Q900001701"/>
+  </node>
+  <node id="2" lat="50.1" lon="20.1">
+    <tag k="brand:wikidata" v="Q900001701"/>
+  </node>
+  <node id="3" lat="50.2" lon="20.2">
+    <tag k="wikipedia" v="en:Some place"/>
+  </node>
+  <node id="4" lat="50.3" lon="20.3">
+    <tag k="wikipedia" v="en:Missing article"/>
+    <tag k="name" v="Missing"/>
+  </node>
+  <way id="5">
+    <nd ref="1"/>
+    <nd ref="2"/>
+    <tag k="building" v="yes"/>
+  </way>
+</osm>
+"""
+
+OSM_FILE_WITH_CACHED_ENTRY = """<?xml version='1.0' encoding='UTF-8'?>
+<osm version="0.6">
+  <node id="1" lat="50.0" lon="20.0">
+    <tag k="brand:wikidata" v="Q900001701"/>
+  </node>
+</osm>
+"""
+
+
+class Tests(unittest.TestCase):
+    def setUp(self):
+        self.cache_folder = wikidata_cache_fixture.use_temporary_cache()
+
+    def tearDown(self):
+        self.cache_folder.cleanup()
+
+    def test_references_are_collected_from_osm_file(self):
+        with tempfile.TemporaryDirectory() as folder:
+            filepath = os.path.join(folder, "extract.osm")
+            with open(filepath, 'w') as outfile:
+                outfile.write(OSM_FILE)
+            tags = warm_up.tags_with_references_in_osm_file(filepath)
+        self.assertEqual([{"brand:wikidata": "Q900001701"}, {"wikipedia": "en:Some place"}, {"wikipedia": "en:Missing article"}], tags)
+        self.assertEqual(True, warm_up.is_reference_key("wikipedia:pl"))
+        self.assertEqual(False, warm_up.is_reference_key("wikipedia_link"))
+
+    def test_cache_is_filled(self):
+        entities = [
+            entity("Q900001701", instance_of=["Q900001702"]),
+            entity("Q900001702", subclass_of=["Q900001703"]),
+            entity("Q900001703"),
+            entity("Q900001704", instance_of=["Q900001703"], sitelinks={"enwiki": "Some place"}),
+        ]
+        server = wikidata_cache_fixture.FakeApiServer(entities)
+        original = wikimedia_connection.download_data_from_wikipedia
+        downloaded_pages = []
+        wikimedia_connection.download_data_from_wikipedia = lambda language_code, article_name: downloaded_pages.append((language_code, article_name))
+        try:
+            tags = [{"brand:wikidata": "Q900001701"}, {"wikipedia": "en:Some place"}, {"wikipedia": "en:Missing article"}]
+            statistics = warm_up.warm_up_for_tags(tags, server.engine(concurrency=4, per_host_limit=2))
+        finally:
+            wikimedia_connection.download_data_from_wikipedia = original
+            server.close()
+        self.assertEqual([("en", "Missing article")], downloaded_pages)
+        self.assertEqual(1, statistics["pages"])
+        for data in entities:
+            self.assertEqual(True, prefetch.is_entity_cached(data["id"]))
+        self.assertEqual("Q900001704", wikimedia_connection.get_wikidata_object_id_from_article("en", "Some place"))
+
+    def test_script_uses_configured_cache(self):
+        wikidata_cache_fixture.seed_entity(entity("Q900001701"))
+        original_location = osm_handling_config.get_wikimedia_connection_cache_location
+        original_argv = sys.argv
+        original_download = wikimedia_connection.download
+        with tempfile.TemporaryDirectory() as folder:
+            filepath = os.path.join(folder, "extract.osm")
+            with open(filepath, 'w') as outfile:
+                outfile.write(OSM_FILE_WITH_CACHED_ENTRY)
+            wikimedia_connection.set_cache_location(folder)  # main() should switch to configured location
+            osm_handling_config.get_wikimedia_connection_cache_location = lambda: self.cache_folder.name
+            sys.argv = ["warm_up_cache.py", filepath, "2"]
+            wikimedia_connection.download = None  # everything is in cache already
+            try:
+                with contextlib.redirect_stdout(io.StringIO()) as output:
+                    warm_up_cache.main()
+            finally:
+                osm_handling_config.get_wikimedia_connection_cache_location = original_location
+                sys.argv = original_argv
+                wikimedia_connection.download = original_download
+        self.assertEqual(os.path.normpath(self.cache_folder.name), os.path.normpath(wikimedia_connection.cache_location()))
+        self.assertIn("'requests': 0", output.getvalue())
+
+
+if __name__ == '__main__':
+    unittest.main()
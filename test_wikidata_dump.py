@@ -0,0 +1,91 @@
+import bz2
+import gzip
+import json
+import os
+import tempfile
+import unittest
+import wikidata_cache_fixture
+from wikimedia_connection import wikimedia_connection
+import wikibrain.wikimedia_link_issue_reporter
+from wikibrain import wikidata_dump
+
+
+def fixture_dump_entities():
+    crash = wikidata_cache_fixture.entity("Q900000310", instance_of=["Q900000311"], sitelinks={"enwiki": "Some crash"})
+    crash["claims"]["P31"][0]["references"] = [{"snaks": {}}]
+    crash["claims"]["P1082"] = [wikidata_cache_fixture.claim("P1082", "Q900000399")]  # not kept
+    crash["descriptions"] = {"en": {"language": "en", "value": "dropped while importing"}}
+    return [
+        crash,
+        wikidata_cache_fixture.entity("Q900000311", subclass_of=["Q3002150"]),
+        wikidata_cache_fixture.entity("Q3002150"),  # aircraft crash
+        wikidata_cache_fixture.entity("Q900000312", sitelinks={"plwiki": "Jakiś artykuł"}),
+    ]
+
+
+def write_dump(filepath, entities, opener):
+    with opener(filepath, 'wt', encoding='utf-8') as outfile:
+        outfile.write("[\n")
+        lines = [json.dumps(entity) for entity in entities]
+        outfile.write(",\n".join(lines))
+        outfile.write("\n]\n")
+
+
+class Tests(unittest.TestCase):
+    def setUp(self):
+        # empty cache - any data must come from dump
+        self.cache_folder = wikidata_cache_fixture.use_temporary_cache()
+        self.folder = tempfile.TemporaryDirectory()
+        self.store_filepath = os.path.join(self.folder.name, "dump.sqlite")
+
+    def tearDown(self):
+        wikidata_dump.uninstall_backend()
+        self.folder.cleanup()
+        self.cache_folder.cleanup()
+
+    def test_both_compressions_are_read(self):
+        for extension, opener in [("gz", gzip.open), ("bz2", bz2.open)]:
+            filepath = os.path.join(self.folder.name, "dump.json." + extension)
+            write_dump(filepath, fixture_dump_entities(), opener)
+            self.assertEqual(["Q900000310", "Q900000311", "Q3002150", "Q900000312"], [entity["id"] for entity in wikidata_dump.entities_in_dump(filepath)])
+
+    def test_import_keeps_only_used_data(self):
+        filepath = os.path.join(self.folder.name, "dump.json.gz")
+        write_dump(filepath, fixture_dump_entities(), gzip.open)
+        self.assertEqual(4, wikidata_dump.import_dump(filepath, self.store_filepath, batch_size=3))
+        store = wikidata_dump.DumpStore(self.store_filepath)
+        try:
+            self.assertEqual(4, store.count())
+            entity = store.get_entity("Q900000310")
+            self.assertEqual(["P31"], list(entity["claims"].keys()))
+            self.assertEqual(False, "references" in entity["claims"]["P31"][0])
+            self.assertEqual(False, "descriptions" in entity)
+            self.assertEqual("Q900000310", store.wikidata_id_of_article("en", "Some_crash"))
+            self.assertEqual("Q900000312", store.wikidata_id_of_article("pl", "Jakiś artykuł"))
+            self.assertEqual(None, store.wikidata_id_of_article("de", "Some crash"))
+            self.assertEqual(None, store.get_entity("Q1"))
+        finally:
+            store.close()
+
+    def test_detector_uses_backend(self):
+        filepath = os.path.join(self.folder.name, "dump.json.bz2")
+        write_dump(filepath, fixture_dump_entities(), bz2.open)
+        wikidata_dump.import_dump(filepath, self.store_filepath)
+        store = wikidata_dump.DumpStore(self.store_filepath)
+        try:
+            original = wikimedia_connection.get_data_from_wikidata_by_id
+            wikidata_dump.install_backend(wikidata_dump.DumpBackend(store))
+            self.assertEqual("Q900000310", wikimedia_connection.get_wikidata_object_id_from_article("en", "Some crash"))
+            self.assertEqual(None, wikimedia_connection.get_property_from_wikidata("Q900000310", "P1082"))
+            detector = wikibrain.wikimedia_link_issue_reporter.WikimediaLinkIssueDetector()
+            report = detector.get_error_report_if_type_unlinkable_as_primary("Q900000310", {"wikidata": "Q900000310"})
+            self.assertNotEqual(None, report)
+            self.assertEqual("should use a secondary wikipedia tag - linking from wikidata tag to an aircraft crash", report.error_id)
+            wikidata_dump.uninstall_backend()
+            self.assertIs(original, wikimedia_connection.get_data_from_wikidata_by_id)
+        finally:
+            store.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
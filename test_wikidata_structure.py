@@ -1,5 +1,6 @@
 import unittest
 from wikibrain import wikimedia_link_issue_reporter
+from wikibrain import ontology_cache
 import wikibrain
 from wikimedia_connection import wikimedia_connection, wikidata_processing
 import osm_handling_config.global_config as osm_handling_config
@@ -134,6 +135,7 @@ class WikidataTests(unittest.TestCase):
         show_only_banned = True
         listed = self.detector().get_list_describing_unexpected_wikidata_structure(type_id, show_only_banned)
         os.remove(wikimedia_connection.get_filename_with_wikidata_entity_by_id(type_id))
+        ontology_cache.class_refreshed(type_id)
         for entry in listed:
             print("should clear cache for", entry)
             filename = wikimedia_connection.get_filename_with_wikidata_entity_by_id(entry["category_id"])
@@ -141,6 +143,7 @@ class WikidataTests(unittest.TestCase):
                 os.remove(filename)
             except FileNotFoundError:
                 pass
+            ontology_cache.class_refreshed(entry["category_id"])
 
     def assert_unlinkability(self, type_id):
         is_unlinkable = self.is_unlinkable_check(type_id)
@@ -1,3 +1,4 @@
+import random
 import unittest
 import wikibrain.wikipedia_knowledge
 import wikibrain.wikidata_knowledge
@@ -189,9 +190,17 @@ class Tests(unittest.TestCase):
         self.assertEqual(type(""), type(self.detector().get_distance_description_between_location_and_wikidata_id((50, 20), example_artist_id)))
 
     def test_wikidata_ids_of_countries_with_language(self):
-        self.assertEqual(['Q36'], self.detector().wikidata_ids_of_countries_with_language("pl"))
+        self.assertEqual(frozenset(['Q36']), self.detector().wikidata_ids_of_countries_with_language("pl"))
         self.assertEqual(('Q408' in self.detector().wikidata_ids_of_countries_with_language("en")), True)
 
+    def test_wikidata_ids_of_countries_with_language_rejects_unknown_code(self):
+        self.assertRaises(AssertionError, self.detector().wikidata_ids_of_countries_with_language, "not-a-language-code")
+
+    def test_official_language_codes_of_country(self):
+        self.assertEqual(frozenset(['pl']), self.detector().official_language_codes_of_country("Q36"))
+        self.assertEqual(('en' in self.detector().official_language_codes_of_country("Q408")), True)
+        self.assertEqual(frozenset(), self.detector().official_language_codes_of_country("Q42"))
+
     def test_that_completely_broken_wikipedia_tags_are_detected(self):
         self.assertEqual(True, self.detector().is_wikipedia_tag_clearly_broken("pl"))
         self.assertEqual(True, self.detector().is_wikipedia_tag_clearly_broken("polski:Smok"))
@@ -238,6 +247,24 @@ class Tests(unittest.TestCase):
         tags = {key: 'Kościół Najświętszego Serca Pana Jezusa'}
         self.assertNotEqual(None, self.detector().check_is_invalid_old_style_wikipedia_tag_present(tags, tags))
 
+    def test_language_registry_matches_language_lists(self):
+        registry = wikibrain.wikipedia_knowledge.language_registry()
+        ordered = wikibrain.wikipedia_knowledge.WikipediaKnowledge.all_wikipedia_language_codes_order_by_importance()
+        self.assertEqual(tuple(ordered), registry.ordered)
+        self.assertEqual(0, registry.rank_of("en"))
+        self.assertEqual(ordered.index("pl"), registry.rank_of("pl"))
+        self.assertEqual(None, registry.rank_of("fixme"))
+        self.assertEqual(True, registry.is_old_style_wikipedia_key("wikipedia:be-tarask"))
+        self.assertEqual(False, registry.is_old_style_wikipedia_key("wikipedia:cz"))
+        self.assertEqual(True, registry.is_redirecting_language_code("cz"))
+        self.assertEqual(False, registry.is_known_language_code("cz"))
+
+    def test_interwiki_lookup_order_puts_preferred_languages_first_without_duplicates(self):
+        wikimedia_connection.set_cache_location(osm_handling_config.get_wikimedia_connection_cache_location())
+        detector = wikibrain.wikimedia_link_issue_reporter.WikimediaLinkIssueDetector(languages_ordered_by_preference=["pl", None, "de"])
+        self.assertEqual(["pl", "de", "en", "fr"], detector.interwiki_lookup_order[:4])
+        self.assertEqual(len(set(detector.interwiki_lookup_order)), len(detector.interwiki_lookup_order))
+
     def test_presence_of_fields_in_blacklist_of_unlinkable_entries(self):
         blacklist = wikibrain.wikidata_knowledge.blacklist_of_unlinkable_entries()
         for key in blacklist:
@@ -703,6 +730,20 @@ class Tests(unittest.TestCase):
         problem = self.detector().get_wikipedia_language_issues(object_description, tags, wikipedia, effective_wikidata_id)
         self.assertEqual(None, 1)
 
+    def test_single_pass_listing_of_banned_branches_matches_checking_each_entry(self):
+        detector = wikibrain.wikimedia_link_issue_reporter.WikimediaLinkIssueDetector()
+        generator = random.Random(5)
+        ids = ["Q3002150", "Q5", "Q1656682", "Q900000001", "Q900000002", "Q900000003", "Q900000004"]
+        for _ in range(300):
+            data = [{"id": generator.choice(ids), "depth": 0}]
+            for _ in range(generator.randrange(25)):
+                data.append({"id": generator.choice(ids), "depth": generator.randrange(data[-1]["depth"] + 2)})
+            expected = []
+            for index, entry in enumerate(data):
+                if detector.new_banned_entry_in_this_branch(data, index):
+                    expected.append({"depth": entry["depth"], "category_id": entry["id"], "ban_reason": detector.get_reason_why_type_makes_object_invalid_primary_link(entry["id"])})
+            self.assertEqual(expected, list(detector.new_banned_entries_in_branches(data)), data)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,29 @@
+import sys
+import wikimedia_connection.wikimedia_connection as wikimedia_connection
+import osm_handling_config.global_config as osm_handling_config
+from wikibrain import fetch_engine
+from wikibrain import warm_up
+
+"""
+python3 warm_up_cache.py extract.osm [concurrency]
+
+fetches into cache everything needed to validate wikipedia and wikidata tags of elements
+from given .osm file, so validation run afterwards does not wait for network
+"""
+
+
+def main():
+    if len(sys.argv) not in [2, 3]:
+        print("usage: python3 warm_up_cache.py osm_filepath [concurrency]")
+        sys.exit(1)
+    wikimedia_connection.set_cache_location(osm_handling_config.get_wikimedia_connection_cache_location())
+    concurrency = fetch_engine.DEFAULT_CONCURRENCY
+    if len(sys.argv) == 3:
+        concurrency = int(sys.argv[2])
+    engine = fetch_engine.FetchEngine(concurrency=concurrency, per_host_limit=min(concurrency, fetch_engine.DEFAULT_PER_HOST_LIMIT))
+    statistics = warm_up.warm_up_for_osm_file(sys.argv[1], engine, show_progress=True)
+    print(statistics)
+
+
+if __name__ == '__main__':
+    main()
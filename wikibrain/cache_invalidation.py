@@ -0,0 +1,177 @@
+import os
+import time
+from wikimedia_connection import wikimedia_connection
+from wikibrain import cache_only
+from wikibrain import cache_store
+from wikibrain import ontology_cache
+
+# removing entries from cache of wikimedia_connection, so they are downloaded again
+# used by flush.py in top level of repository
+#
+# works with file-per-entry layout (FileCache) and with cache_store.CacheStore (StoreCache)
+# in both entries are identified by keys of cache_store - paths relative to cache folder
+#
+# target is (kind, content key, response code key), kinds are the same as in cache_only.py
+# (URL entries are selected only by age, their urls are not known)
+#
+# selected are
+# - listed Wikidata ids (Q42) and article links (en:Kraków - Wikidata entry of article and its page)
+# - entries older than given age
+#
+# for removed Wikidata entries ontology_cache.class_refreshed is called
+# (set persistent store of ontology_cache to update also it)
+
+KINDS = [cache_only.ENTITY, cache_only.ARTICLE_ITEM, cache_only.ARTICLE, cache_only.URL]
+DEFAULT_BATCH_SIZE = 1000
+AGE_UNITS = {"s": 1, "m": 60, "h": 60 * 60, "d": 24 * 60 * 60}
+
+ENTITY_SUFFIX = ".wikidata_entity.txt"
+CODE_SUFFIX = ".code.txt"
+
+
+def parse_age(text):
+    # "30d", "12h", "90m", "45s" - returns seconds
+    text = text.strip()
+    if len(text) < 2 or text[-1] not in AGE_UNITS or text[:-1].isdigit() == False:
+        raise ValueError("expected age like 30d, 12h, 90m or 45s, got <" + text + ">")
+    return int(text[:-1]) * AGE_UNITS[text[-1]]
+
+
+def code_key_of(content_key):
+    return content_key[:-len(".txt")] + CODE_SUFFIX
+
+
+def kind_of_key(content_key):
+    folder = content_key.split("/")[0]
+    if folder == wikimedia_connection.wikidata_language_placeholder():
+        return cache_only.ENTITY
+    if folder == "url":
+        return cache_only.URL
+    if content_key.endswith(ENTITY_SUFFIX):
+        return cache_only.ARTICLE_ITEM
+    return cache_only.ARTICLE
+
+
+def wikidata_id_of_key(content_key):
+    # for keys of ENTITY kind
+    return content_key.split("/")[-1][:-len(ENTITY_SUFFIX)]
+
+
+def target(content_filename, code_filename):
+    content_key = cache_store.key_of_filename(content_filename)
+    return (kind_of_key(content_key), content_key, cache_store.key_of_filename(code_filename))
+
+
+def targets_of_line(line):
+    # line is Wikidata id or article link, returns [] for empty lines and comments
+    line = line.strip()
+    if line == "" or line.startswith("#"):
+        return []
+    if ":" not in line:
+        if line[0] != "Q" or line[1:].isdigit() == False:
+            raise ValueError("expected Wikidata id (Q42) or article link (en:Kraków), got <" + line + ">")
+        return [target(wikimedia_connection.get_filename_with_wikidata_entity_by_id(line), wikimedia_connection.get_filename_with_wikidata_by_id_response_code(line))]
+    language_code = wikimedia_connection.get_language_code_from_link(line)
+    article_name = wikimedia_connection.get_article_name_from_link(line)
+    return [
+        target(wikimedia_connection.get_filename_with_wikidata_entity(language_code, article_name), wikimedia_connection.get_filename_with_wikidata_response_code(language_code, article_name)),
+        target(wikimedia_connection.get_filename_with_article(language_code, article_name), wikimedia_connection.get_filename_with_wikipedia_response_code(language_code, article_name)),
+    ]
+
+
+def targets_of_lines(lines):
+    returned = []
+    for line in lines:
+        returned += targets_of_line(line)
+    return returned
+
+
+def targets_older_than(cache, seconds, now=None):
+    # age of entry is age of its content
+    # content keys ending like response code keys (article "X.code") are not recognised
+    if now == None:
+        now = time.time()
+    returned = []
+    for key, written_at in cache.keys_with_time():
+        if key.endswith(CODE_SUFFIX):
+            continue
+        if now - written_at > seconds:
+            returned.append((kind_of_key(key), key, code_key_of(key)))
+    return returned
+
+
+def limited_to_kinds(targets, kinds):
+    return [entry for entry in targets if entry[0] in kinds]
+
+
+def deduplicated(targets):
+    returned = []
+    listed = set()
+    for entry in targets:
+        if entry not in listed:
+            listed.add(entry)
+            returned.append(entry)
+    return returned
+
+
+def summary(cache, targets):
+    # count of present entries per kind
+    returned = {kind: 0 for kind in KINDS}
+    present = cache.present([entry[1] for entry in targets])
+    for kind, content_key, _ in targets:
+        if content_key in present:
+            returned[kind] += 1
+    return returned
+
+
+def invalidate(cache, targets, batch_size=DEFAULT_BATCH_SIZE, show_progress=False):
+    # returns count of processed targets
+    processed = 0
+    for start in range(0, len(targets), batch_size):
+        batch = targets[start:start + batch_size]
+        keys = []
+        for _, content_key, code_key in batch:
+            keys += [content_key, code_key]
+        cache.remove(keys)
+        for kind, content_key, _ in batch:
+            if kind == cache_only.ENTITY:
+                ontology_cache.class_refreshed(wikidata_id_of_key(content_key))
+        processed += len(batch)
+        if show_progress:
+            print(processed, "of", len(targets), "entries invalidated")
+    return processed
+
+
+class FileCache:
+    # file-per-entry layout of wikimedia_connection
+    def filename(self, key):
+        return os.path.join(cache_store.cache_root(), *key.split("/"))
+
+    def keys_with_time(self):
+        root = cache_store.cache_root()
+        for folder, _, filenames in os.walk(root):
+            for filename in filenames:
+                filepath = os.path.join(folder, filename)
+                yield cache_store.key_of_filename(filepath), os.path.getmtime(filepath)
+
+    def present(self, keys):
+        return set(key for key in keys if os.path.isfile(self.filename(key)))
+
+    def remove(self, keys):
+        for key in keys:
+            if os.path.isfile(self.filename(key)):
+                os.remove(self.filename(key))
+
+
+class StoreCache:
+    def __init__(self, store):
+        self.store = store
+
+    def keys_with_time(self):
+        return self.store.keys_with_time()
+
+    def present(self, keys):
+        return self.store.present(keys)
+
+    def remove(self, keys):
+        self.store.remove(keys)
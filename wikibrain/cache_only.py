@@ -0,0 +1,133 @@
+import threading
+from wikimedia_connection import wikimedia_connection
+from wikibrain import connection_patches
+from wikibrain import prefetch
+
+# cache-only mode - validation on machine without network access
+#
+# in this mode wikimedia_connection is not downloading anything
+# lookup of something missing in its cache raises NotInCache and is recorded
+# detector catches it and reports check as undetermined (see UNDETERMINED_ERROR_ID in detector)
+#
+# list of missing entries can be written to a file, then fetched on other machine
+# with fetch_missing_cache_entries.py and cache can be copied back
+#
+# recorded are
+# - (ENTITY, wikidata id)
+# - (ARTICLE_ITEM, language code, article name) - Wikidata entry of article
+# - (ARTICLE, language code, article name) - Wikipedia page itself
+# - (URL, url, identifier) - other API queries, identifier is as used by wikimedia_connection.get_from_generic_url
+
+ENTITY = "entity"
+ARTICLE_ITEM = "article item"
+ARTICLE = "article"
+URL = "url"
+
+
+class NotInCache(Exception):
+    def __init__(self, key):
+        super().__init__("not present in cache: " + " ".join(key))
+        self.key = key
+
+
+LAYER = "cache_only"
+
+lock = threading.Lock()
+missing_keys = []
+missing_key_set = set()
+
+
+def record_missing(key):
+    with lock:
+        if key not in missing_key_set:
+            missing_key_set.add(key)
+            missing_keys.append(key)
+    raise NotInCache(key)
+
+
+def refuse_entity(wikidata_id):
+    record_missing((ENTITY, wikidata_id))
+
+
+def refuse_article_item(language_code, article_name):
+    record_missing((ARTICLE_ITEM, language_code, article_name))
+
+
+def refuse_article(language_code, article_name):
+    record_missing((ARTICLE, language_code, article_name))
+
+
+def refuse_generic_url(url, identifier_hack=""):
+    record_missing((URL, url, identifier_hack))
+
+
+def refuse_download(url, timeout=None):
+    # all downloads should be stopped by functions above, this one is for anything else
+    record_missing((URL, url, ""))
+
+
+def enable():
+    # see connection_patches.py for combining with other replacements of wikimedia_connection functions
+    connection_patches.install(LAYER, {
+        "download_data_from_wikidata_by_id": refuse_entity,
+        "download_data_from_wikidata": refuse_article_item,
+        "download_data_from_wikipedia": refuse_article,
+        "download_data_from_generic_url": refuse_generic_url,
+        "download": refuse_download,
+    })
+
+
+def disable():
+    connection_patches.uninstall(LAYER)
+
+
+def is_enabled():
+    return connection_patches.is_installed(LAYER)
+
+
+def missing():
+    # keys in order of recording, each listed once
+    with lock:
+        return list(missing_keys)
+
+
+def clear_missing():
+    with lock:
+        missing_keys.clear()
+        missing_key_set.clear()
+
+
+def write_missing(filepath):
+    # one key per line, parts separated by tabs
+    with open(filepath, 'w') as outfile:
+        for key in missing():
+            outfile.write("\t".join(key) + "\n")
+
+
+def read_missing(filepath):
+    returned = []
+    with open(filepath) as infile:
+        for line in infile:
+            line = line.rstrip("\n")
+            if line != "":
+                returned.append(tuple(line.split("\t")))
+    return returned
+
+
+def fetch_missing(keys, transport=None):
+    # fills cache of wikimedia_connection, must not be called in cache-only mode
+    # entries and Wikidata entries of articles are fetched in batches (see prefetch.py)
+    # together with their types and P279 (subclass of) ancestors - check stops at the first
+    # missing entry, so otherwise each level of ontology would need another run
+    if is_enabled():
+        raise Exception("cache-only mode is enabled, fetching is not possible")
+    fetcher = prefetch.Prefetcher(transport)
+    links = [(key[1], key[2]) for key in keys if key[0] == ARTICLE_ITEM]
+    wikidata_ids = [key[1] for key in keys if key[0] == ENTITY]
+    fetcher.prefetch_for_references(links, wikidata_ids)
+    for key in keys:
+        if key[0] == ARTICLE:
+            wikimedia_connection.download_data_from_wikipedia(key[1], key[2])
+        elif key[0] == URL:
+            wikimedia_connection.download_data_from_generic_url(key[1], key[2])
+    return fetcher.statistics
@@ -0,0 +1,332 @@
+import atexit
+import json
+import os
+import sqlite3
+import threading
+import time
+from wikimedia_connection import wikimedia_connection
+from wikibrain import connection_patches
+from wikibrain import wikidata_dump
+
+# cache of wikimedia_connection kept in a single SQLite file,
+# rather than in two files per entry (content and response code)
+#
+# with millions of entries file-per-entry layout exhausts inodes and cold reads are slow
+#
+# rows are keyed by path of file that would be used otherwise, relative to cache folder
+# (for example "wikidata_by_id/Q42.wikidata_entity.txt" and "wikidata_by_id/Q42.wikidata_entity.code.txt")
+# so with backend installed (see install_backend) wikimedia_connection works as before,
+# including downloading what is missing - and everything filling its cache
+# (prefetch.py, fetch_engine.py, warm_up.py, cache_only.py) writes into store
+#
+# writes are buffered and written in batches, flush() or close() writes remaining ones
+# (installed backend is flushed also on exit)
+#
+# use migrate_cache_to_sqlite.py in top level of repository to move existing cache into store
+# and benchmark_cache_store.py to compare read throughput with file-per-entry layout
+
+DEFAULT_BATCH_SIZE = 1000
+MIGRATION_BATCH_SIZE = 10000
+MAXIMUM_QUERIED_KEYS = 500  # SQLite limits count of parameters in a query
+
+
+def cache_root():
+    return os.path.join(wikimedia_connection.cache_location(), wikimedia_connection.cache_folder_name())
+
+
+def key_of_filename(filename):
+    # returns None for files outside cache of wikimedia_connection
+    # filenames are made by wikimedia_connection, so there is no need to normalise them
+    prefix = cache_root() + os.sep
+    if filename.startswith(prefix) == False:
+        return None
+    return filename[len(prefix):].replace(os.sep, "/")
+
+
+class CacheStore:
+    def __init__(self, filepath, batch_size=DEFAULT_BATCH_SIZE):
+        self.filepath = filepath
+        self.batch_size = batch_size
+        self.lock = threading.Lock()
+        self.pending = {}
+        self.connection = sqlite3.connect(filepath, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("""CREATE TABLE IF NOT EXISTS files (
+            key TEXT PRIMARY KEY NOT NULL,
+            content TEXT NOT NULL,
+            written_at REAL NOT NULL
+        )""")
+        self.connection.commit()
+
+    def get(self, key):
+        # returns None if not present
+        with self.lock:
+            if key in self.pending:
+                return self.pending[key][0]
+            row = self.connection.execute("SELECT content FROM files WHERE key = ?", (key,)).fetchone()
+        if row == None:
+            return None
+        return row[0]
+
+    def get_many(self, keys):
+        # returns dictionary with present keys
+        returned = {}
+        with self.lock:
+            for key in keys:
+                if key in self.pending:
+                    returned[key] = self.pending[key][0]
+            queried = [key for key in keys if key not in returned]
+            rows = self.connection.execute("SELECT key, content FROM files WHERE key IN (" + ", ".join("?" * len(queried)) + ")", queried).fetchall()
+        for key, content in rows:
+            returned[key] = content
+        return returned
+
+    def put(self, key, content):
+        with self.lock:
+            self.pending[key] = (content, time.time())
+            if len(self.pending) >= self.batch_size:
+                self.write_pending()
+
+    def put_many(self, rows):
+        # rows are (key, content, written_at), written at once
+        with self.lock:
+            self.write_pending()
+            with self.connection:
+                self.connection.executemany("INSERT OR REPLACE INTO files VALUES (?, ?, ?)", rows)
+
+    def write_pending(self):
+        # lock must be held by caller
+        if self.pending == {}:
+            return
+        rows = [(key, content, written_at) for key, (content, written_at) in self.pending.items()]
+        with self.connection:
+            self.connection.executemany("INSERT OR REPLACE INTO files VALUES (?, ?, ?)", rows)
+        self.pending = {}
+
+    def flush(self):
+        with self.lock:
+            self.write_pending()
+
+    def remove(self, keys):
+        with self.lock:
+            for key in keys:
+                self.pending.pop(key, None)
+            with self.connection:
+                self.connection.executemany("DELETE FROM files WHERE key = ?", [(key,) for key in keys])
+
+    def present(self, keys):
+        # returns set of keys present in store, checked in batches
+        returned = set()
+        keys = list(keys)
+        with self.lock:
+            self.write_pending()
+            for start in range(0, len(keys), MAXIMUM_QUERIED_KEYS):
+                queried = keys[start:start + MAXIMUM_QUERIED_KEYS]
+                rows = self.connection.execute("SELECT key FROM files WHERE key IN (" + ", ".join("?" * len(queried)) + ")", queried).fetchall()
+                returned.update(row[0] for row in rows)
+        return returned
+
+    def keys_with_time(self, batch_size=10000):
+        # yields (key, written_at), read in batches, so entire store is not loaded into memory
+        last_key = ""
+        while True:
+            with self.lock:
+                self.write_pending()
+                rows = self.connection.execute("SELECT key, written_at FROM files WHERE key > ? ORDER BY key LIMIT ?", (last_key, batch_size)).fetchall()
+            if rows == []:
+                return
+            for row in rows:
+                yield row[0], row[1]
+            last_key = rows[-1][0]
+
+    def count(self):
+        with self.lock:
+            self.write_pending()
+            return self.connection.execute("SELECT COUNT(*) FROM files").fetchone()[0]
+
+    def close(self):
+        with self.lock:
+            self.write_pending()
+            self.connection.close()
+
+
+class CacheStoreBackend:
+    # replaces file access of wikimedia_connection, see REPLACED_FUNCTIONS
+    # files outside of its cache folder are handled by original functions
+    def __init__(self, store):
+        self.store = store
+
+    def write_to_text_file(self, filename, content):
+        key = key_of_filename(filename)
+        if key == None:
+            return connection_patches.replaced(LAYER, "write_to_text_file")(filename, content)
+        self.store.put(key, content)
+
+    def get_entire_file_content(self, filename):
+        key = key_of_filename(filename)
+        if key == None:
+            return connection_patches.replaced(LAYER, "get_entire_file_content")(filename)
+        content = self.store.get(key)
+        if content == None:
+            raise FileNotFoundError("not present in cache store: " + key)
+        return content
+
+    def is_it_necessary_to_reload_files(self, content_filename, response_code_filename):
+        content_key = key_of_filename(content_filename)
+        code_key = key_of_filename(response_code_filename)
+        if content_key == None or code_key == None:
+            return connection_patches.replaced(LAYER, "is_it_necessary_to_reload_files")(content_filename, response_code_filename)
+        if self.store.get(content_key) == None:
+            return True
+        code = self.store.get(code_key)
+        return code == None or code == ""
+
+    def ensure_that_cache_folder_exists(self, language_code):
+        # there are no folders to create
+        pass
+
+    def cached_response(self, content_key, code_key):
+        # returns (response code, content), response code is None if download is needed
+        entry = self.store.get_many([content_key, code_key])
+        if content_key not in entry or entry.get(code_key, "") == "":
+            return None, None
+        return int(entry[code_key]), entry[content_key]
+
+    def response(self, content_filename, code_filename, download, forced_refresh, download_again_on_error):
+        # wikimedia_connection functions below are checking whether file exists, so they are replaced
+        # like originals it downloads what is missing and returns None for response code other than 200
+        # content and response code are read at once, so it is a single query
+        content_key = key_of_filename(content_filename)
+        code_key = key_of_filename(code_filename)
+        code, content = None, None
+        if forced_refresh == False:
+            code, content = self.cached_response(content_key, code_key)
+        if code == None:
+            download()
+            code, content = self.cached_response(content_key, code_key)
+        if code != 200 and download_again_on_error:
+            # wikimedia_connection is retrying until it succeeds, here it is retried once
+            download()
+            code, content = self.cached_response(content_key, code_key)
+            if code != 200:
+                raise Exception("failed to download data for " + content_key)
+        if code != 200:
+            return None
+        return content
+
+    def get_data_from_wikidata_by_id(self, wikidata_id, forced_refresh=False):
+        if wikidata_id == None:
+            raise Exception("null pointer")
+        response = self.response(
+            wikimedia_connection.get_filename_with_wikidata_entity_by_id(wikidata_id),
+            wikimedia_connection.get_filename_with_wikidata_by_id_response_code(wikidata_id),
+            lambda: wikimedia_connection.download_data_from_wikidata_by_id(wikidata_id),
+            forced_refresh, True)
+        response = json.loads(response)
+        if 'error' not in response:
+            return response
+        if response['error']['code'] == 'no-such-entity':
+            return None
+        raise NotImplementedError("unhandled error" + str(response))
+
+    def get_data_from_wikidata(self, language_code, article_name, forced_refresh):
+        response = self.response(
+            wikimedia_connection.get_filename_with_wikidata_entity(language_code, article_name),
+            wikimedia_connection.get_filename_with_wikidata_response_code(language_code, article_name),
+            lambda: wikimedia_connection.download_data_from_wikidata(language_code, article_name),
+            forced_refresh, True)
+        return json.loads(response)
+
+    def get_wikipedia_page(self, language_code, article_name, forced_refresh):
+        return self.response(
+            wikimedia_connection.get_filename_with_article(language_code, article_name),
+            wikimedia_connection.get_filename_with_wikipedia_response_code(language_code, article_name),
+            lambda: wikimedia_connection.download_data_from_wikipedia(language_code, article_name),
+            forced_refresh, False)
+
+    def get_from_generic_url(self, url, forced_refresh=False, identifier_hack=""):
+        return self.response(
+            wikimedia_connection.get_filename_cache_for_url(url, identifier_hack),
+            wikimedia_connection.get_filename_cache_for_url_response_code(url, identifier_hack),
+            lambda: wikimedia_connection.download_data_from_generic_url(url, identifier_hack),
+            forced_refresh, True)
+
+
+REPLACED_FUNCTIONS = [
+    "write_to_text_file",
+    "get_entire_file_content",
+    "is_it_necessary_to_reload_files",
+    "ensure_that_cache_folder_exists",
+    "get_data_from_wikidata_by_id",
+    "get_data_from_wikidata",
+    "get_wikipedia_page",
+    "get_from_generic_url",
+]
+LAYER = "cache_store"
+installed_backend = None
+
+
+def install_backend(backend):
+    # makes cache of wikimedia_connection kept in backend.store
+    # caches derived from Wikidata data are dropped, as they may be based on other data
+    # see connection_patches.py for combining with other replacements of wikimedia_connection functions
+    # (with wikidata_dump backend installed later Wikidata entries are read from dump)
+    global installed_backend
+    if installed_backend != None:
+        installed_backend.store.flush()
+    connection_patches.install(LAYER, {name: getattr(backend, name) for name in REPLACED_FUNCTIONS})
+    installed_backend = backend
+    wikidata_dump.drop_derived_caches()
+
+
+def uninstall_backend():
+    global installed_backend
+    if connection_patches.is_installed(LAYER) == False:
+        return
+    installed_backend.store.flush()
+    connection_patches.uninstall(LAYER)
+    installed_backend = None
+    wikidata_dump.drop_derived_caches()
+
+
+def flush_installed_backend():
+    if installed_backend != None:
+        installed_backend.store.flush()
+
+
+atexit.register(flush_installed_backend)
+
+
+def read_file(filepath):
+    with open(filepath, 'r') as infile:
+        return infile.read()
+
+
+def migrate_files(store, filepaths, remove_files):
+    rows = [(key_of_filename(filepath), read_file(filepath), os.path.getmtime(filepath)) for filepath in filepaths]
+    store.put_many(rows)
+    if remove_files:
+        for filepath in filepaths:
+            os.remove(filepath)
+
+
+def migrate_file_cache(store, remove_files=False, batch_size=MIGRATION_BATCH_SIZE, show_progress=False):
+    # moves files from cache of wikimedia_connection (at its current location) into store
+    # files are removed only after they were written to store
+    # returns count of migrated files (there are two per entry)
+    if connection_patches.is_installed(LAYER):
+        raise Exception("backend is installed, uninstall it before migration")
+    migrated = 0
+    batch = []
+    for folder, _, filenames in os.walk(cache_root()):
+        for filename in filenames:
+            batch.append(os.path.join(folder, filename))
+            if len(batch) >= batch_size:
+                migrate_files(store, batch, remove_files)
+                migrated += len(batch)
+                batch = []
+                if show_progress:
+                    print(migrated, "files migrated")
+    migrate_files(store, batch, remove_files)
+    migrated += len(batch)
+    return migrated
@@ -0,0 +1,68 @@
+import threading
+from wikimedia_connection import wikimedia_connection
+
+# registry of functions of wikimedia_connection replaced by wikibrain
+# (wikidata_dump backend, cache_store backend, cache-only mode)
+#
+# replacements are kept as layers, in order of installing
+# function of wikimedia_connection is the one from the most recently installed layer replacing it
+# so layers can be installed and uninstalled in any order without overwriting each other
+#
+# layer may call function that it replaced (from layer below or original one) via replaced()
+
+lock = threading.RLock()
+originals = {}
+layers = []
+
+
+def install(layer_name, functions):
+    # functions is {name of function in wikimedia_connection: replacement}
+    # installing layer again replaces it, keeping its position
+    with lock:
+        for name in functions:
+            if name not in originals:
+                originals[name] = getattr(wikimedia_connection, name)
+        for position, (installed_name, _) in enumerate(layers):
+            if installed_name == layer_name:
+                layers[position] = (layer_name, dict(functions))
+                break
+        else:
+            layers.append((layer_name, dict(functions)))
+        apply()
+
+
+def uninstall(layer_name):
+    with lock:
+        layers[:] = [layer for layer in layers if layer[0] != layer_name]
+        apply()
+
+
+def is_installed(layer_name):
+    with lock:
+        return any(installed_name == layer_name for installed_name, _ in layers)
+
+
+def replaced(layer_name, name):
+    # function that layer replaced - from the closest layer below replacing it, or original
+    with lock:
+        returned = originals[name]
+        for installed_name, functions in layers:
+            if installed_name == layer_name:
+                return returned
+            if name in functions:
+                returned = functions[name]
+        raise Exception(layer_name + " is not installed")
+
+
+def apply():
+    # lock must be held by caller
+    for name in list(originals):
+        function = originals[name]
+        replaced_by_layer = False
+        for _, functions in layers:
+            if name in functions:
+                function = functions[name]
+                replaced_by_layer = True
+        setattr(wikimedia_connection, name, function)
+        if replaced_by_layer == False:
+            del originals[name]
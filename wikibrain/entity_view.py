@@ -0,0 +1,140 @@
+from wikimedia_connection import wikimedia_connection
+from wikibrain import lru_cache
+from wikibrain import negative_cache
+from wikibrain import ontology_cache
+
+# Wikidata entity parsed once, with accessors used by checks
+#
+# checks of a single element ask for many properties of the same entry
+# (P576, P17, P159, P2046, P4046, P247, P279, P105, location, labels)
+# wikimedia_connection.get_property_from_wikidata reads and parses entry again for each of them
+#
+# views are cached, so all checks of an element (and of other elements linking the same entry) share them
+# accessors return the same values as wikimedia_connection functions they replace
+#
+# concurrent requests for the same entry (from threads validating different elements)
+# wait for a single fetch, see negative_cache.lookup
+#
+# when entry is downloaded again (forced refresh) results derived from its old data are dropped
+# see ontology_cache.class_refreshed - view of entry is dropped also when it is removed from cache
+
+DEFAULT_MAX_SIZE = 5000
+
+view_cache = lru_cache.LruCache(DEFAULT_MAX_SIZE)
+statistics, clear, set_max_size = lru_cache.module_functions(view_cache)
+
+
+def has_qualifier(statement, qualifier_id):
+    # for example P582 (end time) or P1011 (excluding)
+    return qualifier_id in statement.get('qualifiers', {})
+
+
+class EntityView:
+    def __init__(self, wikidata_id, wikidata_response):
+        # wikidata_response is as returned by wikimedia_connection.get_data_from_wikidata_by_id
+        # entry is looked up under requested id, like in wikimedia_connection.get_property_from_wikidata
+        self.wikidata_id = wikidata_id
+        self.data = None
+        if wikidata_response != None and wikidata_id in wikidata_response.get('entities', {}):
+            self.data = wikidata_response['entities'][wikidata_id]
+        self.claims = {}
+        if self.data != None:
+            self.claims = self.data.get('claims', {})
+
+    def __repr__(self):
+        return "EntityView(" + str(self.wikidata_id) + ")"
+
+    def exists(self):
+        return self.data != None
+
+    def property(self, property_id):
+        # list of statements, None if there are none
+        # equivalent to wikimedia_connection.get_property_from_wikidata
+        return self.claims.get(property_id)
+
+    def has_property(self, property_id):
+        return property_id in self.claims
+
+    def target_ids(self, property_id):
+        # ids of entries linked by statements, statements without value are skipped
+        returned = []
+        for statement in self.claims.get(property_id, []):
+            try:
+                returned.append(statement['mainsnak']['datavalue']['value']['id'])
+            except (KeyError, TypeError):
+                continue
+        return returned
+
+    def statements_without_qualifier(self, property_id, qualifier_id):
+        return [statement for statement in self.claims.get(property_id, []) if has_qualifier(statement, qualifier_id) == False]
+
+    def sitelinks(self):
+        # {site: title}, for example {"enwiki": "Berlin"}
+        returned = {}
+        if self.data != None:
+            for site, sitelink in self.data.get('sitelinks', {}).items():
+                returned[site] = sitelink['title']
+        return returned
+
+    def sitelink(self, language_code):
+        # article title in given Wikipedia or None
+        return self.sitelinks().get(language_code + 'wiki')
+
+    def label(self, language_code):
+        if self.data == None:
+            return None
+        try:
+            return self.data['labels'][language_code]['value']
+        except KeyError:
+            return None
+
+    def location(self):
+        # (latitude, longitude) or (None, None)
+        # equivalent to wikimedia_connection.get_location_from_wikidata
+        # like there, malformed location (for example without value) raises KeyError
+        statements = self.property('P625')
+        if statements == None:
+            return (None, None)
+        data = statements[0]['mainsnak']
+        if data == None:
+            return (None, None)
+        data = data['datavalue']['value']
+        return data['latitude'], data['longitude']
+
+
+def fetch_entity(wikidata_id, forced_refresh):
+    returned = wikimedia_connection.get_data_from_wikidata_by_id(wikidata_id, forced_refresh)
+    if forced_refresh:
+        ontology_cache.class_refreshed(wikidata_id)
+    return returned
+
+
+def wikidata_response(wikidata_id, forced_refresh=False):
+    # wikimedia_connection.get_data_from_wikidata_by_id, with concurrent calls coalesced by negative_cache.lookup
+    # entries recently found to be missing are not requested again, see negative_cache.py
+    return negative_cache.lookup(negative_cache.ENTITY, wikidata_id, forced_refresh, lambda forced_refresh: fetch_entity(wikidata_id, forced_refresh))
+
+
+def view_of(wikidata_id, forced_refresh=False):
+    if wikidata_id == None:
+        return EntityView(None, None)
+    if forced_refresh == False:
+        cached = view_cache.get(wikidata_id)
+        if cached != None:
+            return cached
+    returned = EntityView(wikidata_id, wikidata_response(wikidata_id, forced_refresh))
+    view_cache.put(wikidata_id, returned)
+    return returned
+
+
+def fetch_statistics():
+    # how many lookups were made and how many requests waited for a lookup made by another thread
+    # (of all kinds, see negative_cache.lookup)
+    return negative_cache.lookups.statistics()
+
+
+def entry_refreshed(wikidata_id):
+    view_cache.remove(wikidata_id)
+
+
+ontology_cache.register_class_refresh_listener(entry_refreshed)
@@ -0,0 +1,293 @@
+import asyncio
+import json
+import urllib.parse
+from wikimedia_connection import wikimedia_connection
+from wikibrain import prefetch
+
+# fetches data from Wikidata and Wikipedia APIs with many requests running at once
+# so a single slow response does not stall everything else
+#
+# limits:
+# - concurrency - how many requests may run at once, in total
+# - per_host_limit - how many requests may run at once to the same server
+#   (www.wikidata.org, en.wikipedia.org...)
+# identical requests running at the same time are made once, all callers get the same response
+#
+# requests themselves are made by blocking fetch function (by default wikimedia_connection.download,
+# with its retries) running in executor threads, asyncio is used to schedule them and apply limits
+#
+# API urls are configurable, so tests may run against local fake server
+#
+# SyncFetchEngine is a synchronous facade, for code that is not using asyncio
+# detector itself reads data from cache of wikimedia_connection, SyncFetchEngine.prefetch_for_elements
+# fills this cache concurrently, so existing checks work unchanged (see prefetch.py)
+# also other lookups (Wikidata entries of articles, redirects, links on pages) write responses
+# into this cache, in the same format, so the detector finds them there
+
+WIKIDATA_API_URL = "https://www.wikidata.org/w/api.php"
+WIKIPEDIA_API_URL_FORMAT = "https://{language_code}.wikipedia.org/w/api.php"
+DEFAULT_CONCURRENCY = 8
+DEFAULT_PER_HOST_LIMIT = 4
+
+
+class FetchEngine:
+    def __init__(self, concurrency=DEFAULT_CONCURRENCY, per_host_limit=DEFAULT_PER_HOST_LIMIT, fetch=None,
+                 wikidata_api_url=WIKIDATA_API_URL, wikipedia_api_url_format=WIKIPEDIA_API_URL_FORMAT, batch_size=prefetch.BATCH_SIZE):
+        # fetch(url) must return object with content (bytes) and code (HTTP status), like wikimedia_connection.download
+        if fetch == None:
+            fetch = wikimedia_connection.download
+        self.fetch = fetch
+        self.concurrency = concurrency
+        self.per_host_limit = per_host_limit
+        self.wikidata_api_url = wikidata_api_url
+        self.wikipedia_api_url_format = wikipedia_api_url_format
+        self.batch_size = batch_size
+        self.statistics = {"requests": 0, "failed_requests": 0, "deduplicated": 0}
+        self.loop = None
+
+    def bind_to_running_loop(self):
+        # semaphores and running requests belong to event loop
+        # so they are recreated if engine is used from another one
+        loop = asyncio.get_running_loop()
+        if loop is self.loop:
+            return
+        self.loop = loop
+        self.limit = asyncio.Semaphore(self.concurrency)
+        self.host_limits = {}
+        self.in_flight = {}
+
+    def host_limit(self, url):
+        host = urllib.parse.urlsplit(url).netloc
+        if host not in self.host_limits:
+            self.host_limits[host] = asyncio.Semaphore(self.per_host_limit)
+        return self.host_limits[host]
+
+    async def get_json(self, url):
+        # returns parsed response or None on failure
+        self.bind_to_running_loop()
+        if url in self.in_flight:
+            self.statistics["deduplicated"] += 1
+            return await asyncio.shield(self.in_flight[url])
+        task = self.loop.create_task(self.download_json(url))
+        self.in_flight[url] = task
+        task.add_done_callback(lambda finished: self.request_finished(url, finished))
+        return await asyncio.shield(task)
+
+    def request_finished(self, url, task):
+        if self.in_flight.get(url) is task:
+            del self.in_flight[url]
+
+    async def call_with_limits(self, url, function, *args):
+        # runs blocking function making request to url in executor thread, within limits
+        self.bind_to_running_loop()
+        async with self.limit:
+            async with self.host_limit(url):
+                self.statistics["requests"] += 1
+                return await self.loop.run_in_executor(None, function, *args)
+
+    async def download_json(self, url):
+        result = await self.call_with_limits(url, self.fetch, url)
+        if result.code != 200:
+            self.statistics["failed_requests"] += 1
+            return None
+        try:
+            return json.loads(result.content.decode())
+        except ValueError:
+            self.statistics["failed_requests"] += 1
+            return None
+
+    def wikidata_query_url(self, query):
+        return self.wikidata_api_url + "?" + query
+
+    def wikipedia_query_url(self, language_code, query):
+        return self.wikipedia_api_url_format.format(language_code=language_code) + "?" + query
+
+    async def query_entities(self, wikidata_ids):
+        # parsed response of wbgetentities or None
+        return await self.get_json(self.wikidata_query_url("action=wbgetentities&ids=" + urllib.parse.quote("|".join(wikidata_ids)) + "&format=json"))
+
+    async def query_entities_by_titles(self, site, titles):
+        # parsed response of wbgetentities or None
+        return await self.get_json(self.wikidata_query_url("action=wbgetentities&sites=" + urllib.parse.quote(site) + "&titles=" + urllib.parse.quote("|".join(titles)) + "&format=json"))
+
+    async def get_entities(self, wikidata_ids):
+        # returns {id: entity data} for ids present in responses
+        # missing entities are included, with "missing" key - like in API responses
+        # groups of up to batch_size ids are requested at once
+        unique = []
+        for wikidata_id in wikidata_ids:
+            if wikidata_id not in unique:
+                unique.append(wikidata_id)
+        groups = [unique[start:start + self.batch_size] for start in range(0, len(unique), self.batch_size)]
+        responses = await asyncio.gather(*[self.query_entities(group) for group in groups])
+        returned = {}
+        for group, response in zip(groups, responses):
+            if prefetch.is_successful_response(response) == False:
+                continue
+            for wikidata_id in group:
+                data = prefetch.entity_in_response(wikidata_id, response)
+                if data != None:
+                    returned[wikidata_id] = data
+        return returned
+
+    async def get_entity(self, wikidata_id):
+        # returns entity data or None if it is missing or not fetched
+        data = (await self.get_entities([wikidata_id])).get(wikidata_id)
+        if data == None or "missing" in data:
+            return None
+        return data
+
+    async def get_sitelinks(self, wikidata_id):
+        # returns {site: title}, for example {"enwiki": "Berlin"}, or None
+        data = await self.get_entity(wikidata_id)
+        if data == None:
+            return None
+        returned = {}
+        for site, sitelink in data.get("sitelinks", {}).items():
+            returned[site] = sitelink["title"]
+        return returned
+
+    async def get_wikidata_id_of_article(self, language_code, article_name):
+        # like wikimedia_connection.get_wikidata_object_id_from_article (including following redirects by Wikidata API)
+        # response is written into its cache, so this lookup made later is answered from cache
+        # returns None if article is missing, has no Wikidata entry or request failed
+        if prefetch.is_article_cached(language_code, article_name) == False:
+            response = await self.query_entities_by_titles(prefetch.site_of_language_code(language_code), [article_name])
+            if response == None:
+                return None
+            prefetch.write_article_response_to_cache(language_code, article_name, response)
+        return wikimedia_connection.get_wikidata_object_id_from_article(language_code, article_name)
+
+    async def get_from_wikipedia_api(self, language_code, what, article_name):
+        # like wikimedia_connection.get_from_wikipedia_api, response is written into its cache
+        # under the same url and identifier, so detector finds it there
+        # returns data of page or None if request failed
+        quoted_language_code = urllib.parse.quote(language_code)
+        quoted_article_name = urllib.parse.quote(article_name)
+        # wikimedia_connection uses quoted language code and title also for looking up Wikidata entry
+        wikidata_id = await self.get_wikidata_id_of_article(quoted_language_code, quoted_article_name)
+        if wikidata_id == None:
+            wikidata_id = ""
+        query = "action=query&format=json" + what + "&redirects=&titles=" + quoted_article_name
+        url = "https://" + quoted_language_code + ".wikipedia.org/w/api.php?" + query
+        if wikimedia_connection.it_is_necessary_to_reload_generic_url(url, wikidata_id):
+            response = await self.get_json(self.wikipedia_query_url(language_code, query))
+            if response == None:
+                return None
+            wikimedia_connection.ensure_that_cache_folder_exists('url')
+            wikimedia_connection.write_to_text_file(wikimedia_connection.get_filename_cache_for_url(url, wikidata_id), json.dumps(response))
+            wikimedia_connection.write_to_text_file(wikimedia_connection.get_filename_cache_for_url_response_code(url, wikidata_id), "200")
+        else:
+            response = json.loads(wikimedia_connection.get_from_generic_url(url, False, wikidata_id))
+        pages = response.get("query", {}).get("pages")
+        if pages == None or pages == {}:
+            return None
+        return list(pages.values())[0]
+
+    async def get_article_name_after_redirect(self, language_code, article_name):
+        # like WikimediaLinkIssueDetector.get_article_name_after_redirect
+        # returns title of redirect target, article name itself if it is not a redirect, None if request failed
+        data = await self.get_from_wikipedia_api(language_code, "", article_name)
+        if data == None:
+            return None
+        return data.get("title")
+
+    async def get_page_links(self, language_code, article_name):
+        # returns list of titles linked from article, None if request failed
+        # like in detector (checking disambiguation pages) only the first part of list returned by API is used
+        data = await self.get_from_wikipedia_api(language_code, "&prop=links", article_name)
+        if data == None:
+            return None
+        return [link["title"] for link in data.get("links", [])]
+
+
+class EngineTransport:
+    # transport for prefetch.Prefetcher, requests return coroutines
+    # used by ConcurrentPrefetcher
+    def __init__(self, engine):
+        self.engine = engine
+
+    def get_entities(self, wikidata_ids):
+        return self.engine.query_entities(wikidata_ids)
+
+    def get_entities_by_titles(self, site, titles):
+        return self.engine.query_entities_by_titles(site, titles)
+
+
+class ConcurrentPrefetcher(prefetch.Prefetcher):
+    # like prefetch.Prefetcher, but groups are requested at once
+    def __init__(self, facade, batch_size=prefetch.BATCH_SIZE, show_progress=False):
+        super().__init__(EngineTransport(facade.engine), batch_size, show_progress)
+        self.facade = facade
+
+    def request_groups(self, groups, request):
+        return self.facade.run(self.request_groups_concurrently(groups, request))
+
+    async def request_groups_concurrently(self, groups, request):
+        results = await asyncio.gather(*[self.request_with_bisection_concurrently(group, request) for group in groups])
+        returned = []
+        for result in results:
+            returned += result
+        return returned
+
+    async def request_with_bisection_concurrently(self, entries, request):
+        # see prefetch.Prefetcher.request_with_bisection
+        self.statistics["requests"] += 1
+        response = await request(entries)
+        if prefetch.is_successful_response(response):
+            return [(entries, response)]
+        self.statistics["failed_requests"] += 1
+        if len(entries) == 1:
+            self.statistics["not_fetched"] += 1
+            return []
+        middle = len(entries) // 2
+        halves = await asyncio.gather(self.request_with_bisection_concurrently(entries[:middle], request), self.request_with_bisection_concurrently(entries[middle:], request))
+        return halves[0] + halves[1]
+
+
+class SyncFetchEngine:
+    # synchronous facade of FetchEngine, has its own event loop
+    # must not be used from code already running in event loop - await FetchEngine there
+    def __init__(self, engine=None):
+        if engine == None:
+            engine = FetchEngine()
+        self.engine = engine
+        self.event_loop = asyncio.new_event_loop()
+
+    def run(self, coroutine):
+        return self.event_loop.run_until_complete(coroutine)
+
+    def gather(self, coroutines):
+        # runs coroutines of engine (for example engine.get_article_name_after_redirect(...)) at once
+        # returns list of their results
+        return self.run(gather_coroutines(coroutines))
+
+    def get_entities(self, wikidata_ids):
+        return self.run(self.engine.get_entities(wikidata_ids))
+
+    def get_entity(self, wikidata_id):
+        return self.run(self.engine.get_entity(wikidata_id))
+
+    def get_sitelinks(self, wikidata_id):
+        return self.run(self.engine.get_sitelinks(wikidata_id))
+
+    def get_wikidata_id_of_article(self, language_code, article_name):
+        return self.run(self.engine.get_wikidata_id_of_article(language_code, article_name))
+
+    def get_article_name_after_redirect(self, language_code, article_name):
+        return self.run(self.engine.get_article_name_after_redirect(language_code, article_name))
+
+    def get_page_links(self, language_code, article_name):
+        return self.run(self.engine.get_page_links(language_code, article_name))
+
+    def prefetch_for_elements(self, list_of_tags, follow_ontology=True, max_ontology_levels=None, show_progress=False):
+        # fills cache of wikimedia_connection, see prefetch.prefetch_for_elements
+        # returns statistics
+        return ConcurrentPrefetcher(self, self.engine.batch_size, show_progress).prefetch_for_elements(list_of_tags, follow_ontology, max_ontology_levels)
+
+    def close(self):
+        self.event_loop.close()
+
+
+async def gather_coroutines(coroutines):
+    return await asyncio.gather(*coroutines)
@@ -0,0 +1,79 @@
+from wikibrain import entity_view
+from wikibrain import lru_cache
+from wikibrain import ontology_cache
+
+# the best Wikipedia article of Wikidata entry, given languages in order of preference
+#
+# entry is read once and its sitelinks are compared with rank of languages
+# rather than asking for article in each of about 300 languages one by one
+#
+# result is cached, key is (wikidata id, languages preferred by detector)
+# rest of the order (all languages by importance) is fixed, see wikipedia_knowledge.LanguageRegistry
+#
+# links of entry are dropped when it is refreshed or removed from cache, see ontology_cache.class_refreshed
+
+DEFAULT_MAX_SIZE = 50000
+NOT_CACHED = object()
+
+link_cache = lru_cache.LruCache(DEFAULT_MAX_SIZE)
+statistics, clear, set_max_size = lru_cache.module_functions(link_cache)
+
+
+def lookup_rank(lookup_order):
+    # {language code: position in lookup order}
+    returned = {}
+    for index, language_code in enumerate(lookup_order):
+        if language_code not in returned:
+            returned[language_code] = index
+    return returned
+
+
+def sitelinks(wikidata_id, forced_refresh):
+    wikidata_entry = entity_view.wikidata_response(wikidata_id, forced_refresh)
+    if wikidata_entry == None:
+        return {}
+    entities = wikidata_entry.get('entities', {})
+    if entities == {}:
+        return {}
+    return entities[list(entities)[0]].get('sitelinks', {})
+
+
+def best_link_uncached(wikidata_id, rank, forced_refresh):
+    # the same as taking the first language code in lookup order where
+    # wikimedia_connection.get_interwiki_article_name_by_id finds an article
+    best_rank = None
+    best_link = None
+    for site, sitelink in sitelinks(wikidata_id, forced_refresh).items():
+        if site.endswith("wiki") == False:
+            continue
+        language_code = site[:-len("wiki")]
+        language_rank = rank.get(language_code)
+        if language_rank == None:
+            continue
+        if best_rank == None or language_rank < best_rank:
+            best_rank = language_rank
+            best_link = language_code + ':' + sitelink['title']
+    return best_link
+
+
+def best_link(wikidata_id, rank, preference_key, forced_refresh=False):
+    # returns link like "en:Berlin" or None
+    # rank is from lookup_rank, preference_key identifies it (tuple of preferred language codes)
+    if wikidata_id == None:
+        return None
+    key = (wikidata_id, preference_key)
+    if forced_refresh == False:
+        cached = link_cache.get(key, NOT_CACHED)
+        if cached is not NOT_CACHED:
+            return cached
+    returned = best_link_uncached(wikidata_id, rank, forced_refresh)
+    link_cache.put(key, returned)
+    return returned
+
+
+def entry_refreshed(wikidata_id):
+    # sitelinks of entry may have changed
+    link_cache.remove_matching(lambda key, value: key[0] == wikidata_id)
+
+
+ontology_cache.register_class_refresh_listener(entry_refreshed)
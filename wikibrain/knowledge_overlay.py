@@ -0,0 +1,114 @@
+import json
+import os
+
+# additional entries for knowledge tables, loaded from files
+# so long-running processes can get them without restart
+# see knowledge_snapshot.set_overlay_location
+#
+# folder may contain files named after tables, with .yaml, .yml or .json extension
+#   skipped_cases.yaml
+#   blacklisted_and_unfixable_ids.yaml
+#   blacklist_of_unlinkable_entries.yaml
+#   workarounds_for_wikidata_bugs_breakage_and_mistakes.yaml
+#
+# list tables accept list of ids or mapping from id to comment, for example
+#   Q106617236: https://www.openstreetmap.org/node/10974264904 may actually qualify as a tourism attraction
+#   Q1456883: see https://www.wikidata.org/wiki/Q1456883
+#
+# blacklist_of_unlinkable_entries accepts mapping in the same format as in wikidata_knowledge.py
+#   Q37156: {'prefix': 'brand:', 'expected_tags': {'office': 'company'}, 'name': 'IBM'}
+#
+# entries are added to ones defined in source code
+
+LIST_TABLES = [
+    "skipped_cases",
+    "blacklisted_and_unfixable_ids",
+    "workarounds_for_wikidata_bugs_breakage_and_mistakes",
+]
+MAPPING_TABLES = [
+    "blacklist_of_unlinkable_entries",
+]
+EXTENSIONS = ["yaml", "yml", "json"]
+
+
+def overlay_files(folder):
+    # returns {filepath: (modification time, size)} for all present overlay files
+    returned = {}
+    if folder == None:
+        return returned
+    for table_name in LIST_TABLES + MAPPING_TABLES:
+        for extension in EXTENSIONS:
+            filepath = os.path.join(folder, table_name + "." + extension)
+            try:
+                status = os.stat(filepath)
+            except FileNotFoundError:
+                continue
+            returned[filepath] = (status.st_mtime_ns, status.st_size)
+    return returned
+
+
+def table_name_of_file(filepath):
+    return os.path.splitext(os.path.basename(filepath))[0]
+
+
+def read_file(filepath):
+    with open(filepath, encoding='utf-8') as infile:
+        if filepath.endswith(".json"):
+            return json.load(infile)
+        # imported here as yaml is slow to import
+        import yaml
+        return yaml.safe_load(infile)
+
+
+def read_overlay(filepaths):
+    # returns {table_name: entries}
+    # raises ValueError on malformed files
+    returned = {}
+    for filepath in sorted(filepaths):
+        table_name = table_name_of_file(filepath)
+        try:
+            data = read_file(filepath)
+        except Exception as e:
+            raise ValueError("failed to read " + filepath + ": " + str(e)) from e
+        if data == None:
+            continue
+        if table_name in LIST_TABLES:
+            if isinstance(data, dict):
+                data = list(data.keys())
+            if isinstance(data, list) == False:
+                raise ValueError(filepath + " should contain list of Wikidata ids or mapping from them to comments")
+            entries = returned.get(table_name, [])
+            for wikidata_id in data:
+                if isinstance(wikidata_id, str) == False:
+                    raise ValueError(filepath + " contains " + str(wikidata_id) + " that is not a Wikidata id")
+                entries.append(wikidata_id)
+            returned[table_name] = entries
+        else:
+            if isinstance(data, dict) == False:
+                raise ValueError(filepath + " should contain mapping from Wikidata ids to entries")
+            entries = returned.get(table_name, {})
+            for wikidata_id, entry in data.items():
+                if isinstance(entry, dict) == False or 'prefix' not in entry:
+                    raise ValueError(filepath + " has entry for " + str(wikidata_id) + " without prefix")
+                entries[wikidata_id] = entry
+            returned[table_name] = entries
+    return returned
+
+
+def apply_overlay(tables, overlay):
+    # returns new tables, passed ones are not modified
+    returned = dict(tables)
+    for table_name, entries in overlay.items():
+        if table_name in LIST_TABLES:
+            merged = list(tables[table_name])
+            present = set(merged)
+            for wikidata_id in entries:
+                if wikidata_id not in present:
+                    present.add(wikidata_id)
+                    merged.append(wikidata_id)
+            returned[table_name] = merged
+        else:
+            merged = dict(tables[table_name])
+            merged.update(entries)
+            returned[table_name] = merged
+    return returned
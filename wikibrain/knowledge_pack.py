@@ -0,0 +1,128 @@
+import hashlib
+import marshal
+import os
+import sys
+from wikimedia_connection import wikidata_processing
+from wikibrain import knowledge_snapshot
+
+# knowledge tables compiled into a single binary file
+# see build_knowledge_pack.py in top level of repository
+#
+# loading it is faster than building tables from source code
+# pack is ignored (and tables are built from source) if it is
+# - missing
+# - corrupted (checksum mismatch)
+# - stale (source files that define tables were changed since pack was built)
+#
+# staleness is judged by content of source files, as installing or copying package changes
+# modification times - but content is hashed only for files whose size or modification time
+# differs from ones recorded at build time, so usually os.stat is enough
+# - built with a different format or Python version (marshal format is Python-specific)
+
+PACK_FORMAT_VERSION = 2
+PACK_MAGIC = b"WIKIBRAIN-KNOWLEDGE-PACK\n"
+DEFAULT_PACK_LOCATION = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'knowledge_pack.bin')
+
+
+def source_files_defining_tables():
+    wikibrain_folder = os.path.dirname(os.path.abspath(__file__))
+    return [
+        os.path.join(wikibrain_folder, 'wikidata_knowledge.py'),
+        os.path.join(wikibrain_folder, 'wikimedia_link_issue_reporter.py'),
+        os.path.abspath(wikidata_processing.__file__),
+    ]
+
+
+def content_hash(filepath):
+    with open(filepath, 'rb') as source:
+        return hashlib.sha256(source.read()).hexdigest()
+
+
+def source_stamps():
+    # {filename: (size, modification time, hash of content)}, recorded at build time
+    returned = {}
+    for filepath in source_files_defining_tables():
+        status = os.stat(filepath)
+        returned[os.path.basename(filepath)] = (status.st_size, status.st_mtime_ns, content_hash(filepath))
+    return returned
+
+
+def are_sources_unchanged(recorded_stamps):
+    filepaths = source_files_defining_tables()
+    if recorded_stamps == None or sorted(recorded_stamps.keys()) != sorted(os.path.basename(filepath) for filepath in filepaths):
+        return False
+    for filepath in filepaths:
+        size, modification_time, recorded_hash = recorded_stamps[os.path.basename(filepath)]
+        status = os.stat(filepath)
+        if status.st_size != size:
+            return False
+        if status.st_mtime_ns != modification_time and content_hash(filepath) != recorded_hash:
+            return False
+    return True
+
+
+def python_version_tag():
+    # marshal format may change between Python versions
+    return "{}.{}".format(sys.version_info[0], sys.version_info[1])
+
+
+def build_pack(filepath=DEFAULT_PACK_LOCATION):
+    tables = knowledge_snapshot.tables_from_source_code()
+    payload = marshal.dumps({
+        "format": PACK_FORMAT_VERSION,
+        "python": python_version_tag(),
+        "sources": source_stamps(),
+        "tables": tables,
+        "fingerprints": knowledge_snapshot.fingerprints_of_tables(tables),
+    })
+    checksum = hashlib.sha256(payload).hexdigest().encode('ascii')
+    temporary_filepath = filepath + ".tmp"
+    with open(temporary_filepath, 'wb') as outfile:
+        outfile.write(PACK_MAGIC)
+        outfile.write(checksum + b"\n")
+        outfile.write(payload)
+    os.replace(temporary_filepath, filepath)
+    return filepath
+
+
+def read_pack(filepath=DEFAULT_PACK_LOCATION):
+    # returns data stored in pack
+    # None if pack is missing, corrupted or stale
+    try:
+        with open(filepath, 'rb') as infile:
+            content = infile.read()
+    except FileNotFoundError:
+        return None
+    if content.startswith(PACK_MAGIC) == False:
+        return None
+    content = content[len(PACK_MAGIC):]
+    checksum, separator, payload = content.partition(b"\n")
+    if separator != b"\n":
+        return None
+    if hashlib.sha256(payload).hexdigest().encode('ascii') != checksum:
+        return None
+    try:
+        data = marshal.loads(payload)
+    except (EOFError, ValueError, TypeError):
+        return None
+    if data.get("format") != PACK_FORMAT_VERSION:
+        return None
+    if data.get("python") != python_version_tag():
+        return None
+    if are_sources_unchanged(data.get("sources")) == False:
+        return None
+    return data
+
+
+def load_tables(filepath=DEFAULT_PACK_LOCATION):
+    # returns tables and their fingerprints
+    data = read_pack(filepath)
+    if data == None:
+        tables = knowledge_snapshot.tables_from_source_code()
+        return tables, knowledge_snapshot.fingerprints_of_tables(tables)
+    return data["tables"], data["fingerprints"]
+
+
+def load_snapshot(filepath=DEFAULT_PACK_LOCATION):
+    tables, fingerprints = load_tables(filepath)
+    return knowledge_snapshot.KnowledgeSnapshot(tables, fingerprints=fingerprints)
@@ -0,0 +1,180 @@
+import hashlib
+import json
+import threading
+import time
+import types
+from wikibrain import wikidata_knowledge
+from wikibrain import knowledge_overlay
+
+
+class KnowledgeSnapshot:
+    # read-only copy of hardcoded knowledge tables
+    #
+    # functions such as wikidata_knowledge.blacklist_of_unlinkable_entries()
+    # or WikimediaLinkIssueDetector.invalid_types() build their tables from scratch
+    # on every call - what is expensive when done for every ancestor of every checked object
+    #
+    # snapshot is built once and all tables are frozensets or read-only mappings
+    # so membership checks are O(1) and nothing may modify them
+    #
+    # fingerprint changes whenever any table changes, fingerprints[table_name]
+    # changes only when given table changes - caches depending on this data
+    # should include relevant fingerprint in their keys
+    #
+    # fingerprints may be passed if already known (see knowledge_pack.py)
+    def __init__(self, tables, fingerprints=None):
+        self.skipped_cases = frozenset(tables["skipped_cases"])
+        self.blacklisted_and_unfixable_ids = frozenset(tables["blacklisted_and_unfixable_ids"])
+        self.blacklist_of_unlinkable_entries = freeze(tables["blacklist_of_unlinkable_entries"])
+        self.invalid_types = freeze(tables["invalid_types"])
+
+        ignored = ignored_entries_in_order(tables)
+        # order is kept as wikidata_processing functions expect list
+        self.ignored_entries_in_wikidata_ontology_in_order = tuple(ignored)
+        self.ignored_entries_in_wikidata_ontology = frozenset(ignored)
+
+        if fingerprints == None:
+            fingerprints = fingerprints_of_tables(tables)
+        self.fingerprints = types.MappingProxyType(fingerprints)
+        self.fingerprint = fingerprint_of_data(fingerprints)
+
+
+def freeze(data):
+    if isinstance(data, dict):
+        return types.MappingProxyType({key: freeze(value) for key, value in data.items()})
+    if isinstance(data, list):
+        return tuple(freeze(value) for value in data)
+    if isinstance(data, set):
+        return frozenset(data)
+    return data
+
+
+def fingerprint_of_data(data):
+    serialized = json.dumps(data, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(serialized.encode('utf-8')).hexdigest()
+
+
+def fingerprints_of_tables(tables):
+    fingerprints = {}
+    for name in sorted(tables.keys()):
+        fingerprints[name] = fingerprint_of_data(tables[name])
+    fingerprints["ignored_entries_in_wikidata_ontology"] = fingerprint_of_data(ignored_entries_in_order(tables))
+    return fingerprints
+
+
+def ignored_entries_in_order(tables):
+    returned = []
+    seen = set()
+    for wikidata_id in (tables["ignored_entries_in_wikidata_ontology_without_skipping_known_bugs"] + tables["workarounds_for_wikidata_bugs_breakage_and_mistakes"]):
+        if wikidata_id not in seen:
+            seen.add(wikidata_id)
+            returned.append(wikidata_id)
+    return returned
+
+
+def tables_from_source_code():
+    # imported here as reporter itself is using snapshot
+    from wikibrain.wikimedia_link_issue_reporter import WikimediaLinkIssueDetector
+    return {
+        "skipped_cases": wikidata_knowledge.skipped_cases(),
+        "blacklisted_and_unfixable_ids": wikidata_knowledge.blacklisted_and_unfixable_ids(),
+        "blacklist_of_unlinkable_entries": wikidata_knowledge.blacklist_of_unlinkable_entries(),
+        "invalid_types": WikimediaLinkIssueDetector.hardcoded_invalid_types(),
+        "ignored_entries_in_wikidata_ontology_without_skipping_known_bugs": WikimediaLinkIssueDetector.ignored_entries_in_wikidata_ontology_without_skipping_known_bugs(),
+        "workarounds_for_wikidata_bugs_breakage_and_mistakes": WikimediaLinkIssueDetector.workarounds_for_wikidata_bugs_breakage_and_mistakes(),
+    }
+
+
+snapshot_store = None
+snapshot_lock = threading.Lock()
+
+# tables as defined in source code (or knowledge pack)
+base_tables_store = None
+base_fingerprints_store = None
+
+# see set_overlay_location
+overlay_location = None
+overlay_check_interval_in_seconds = 5
+overlay_last_check = None
+overlay_files_state = None
+
+snapshot_change_listeners = []
+
+
+def get_snapshot():
+    # snapshot may be replaced by a new one when overlay files change
+    # so it should not be stored for a long time by callers
+    # (using one snapshot during a single check is fine)
+    if snapshot_store != None and overlay_check_is_due() == False:
+        return snapshot_store
+    refresh_snapshot(force=False)
+    return snapshot_store
+
+
+def set_overlay_location(folder, check_interval_in_seconds=5):
+    # folder with additional entries for knowledge tables, see knowledge_overlay.py
+    # it will be checked for changes at most once every check_interval_in_seconds
+    # None disables overlay
+    global overlay_location, overlay_check_interval_in_seconds
+    with snapshot_lock:
+        overlay_location = folder
+        overlay_check_interval_in_seconds = check_interval_in_seconds
+    refresh_snapshot(force=True)
+
+
+def register_snapshot_change_listener(callback):
+    # callback(changed_table_names, new_snapshot) is called after snapshot was replaced
+    # changed_table_names are keys of KnowledgeSnapshot.fingerprints that differ
+    # so caches may drop only entries that depend on changed tables
+    snapshot_change_listeners.append(callback)
+
+
+def unregister_snapshot_change_listener(callback):
+    if callback in snapshot_change_listeners:
+        snapshot_change_listeners.remove(callback)
+
+
+def overlay_check_is_due():
+    if overlay_location == None:
+        return False
+    if overlay_last_check == None:
+        return True
+    return time.monotonic() - overlay_last_check >= overlay_check_interval_in_seconds
+
+
+def refresh_snapshot(force):
+    global snapshot_store, base_tables_store, base_fingerprints_store, overlay_last_check, overlay_files_state
+    with snapshot_lock:
+        if force == False and snapshot_store != None and overlay_check_is_due() == False:
+            return  # other thread did it already
+        if base_tables_store == None:
+            # imported here as knowledge_pack is using this module
+            from wikibrain import knowledge_pack
+            base_tables_store, base_fingerprints_store = knowledge_pack.load_tables()
+        overlay_last_check = time.monotonic()
+        files_state = knowledge_overlay.overlay_files(overlay_location)
+        if force == False and snapshot_store != None and files_state == overlay_files_state:
+            return
+        try:
+            overlay = knowledge_overlay.read_overlay(files_state.keys())
+        except ValueError as e:
+            if snapshot_store == None:
+                raise
+            # may be partially written, will be retried on the next check
+            print("ignoring knowledge overlay, keeping previous snapshot:", e)
+            return
+        if overlay == {}:
+            new_snapshot = KnowledgeSnapshot(base_tables_store, fingerprints=base_fingerprints_store)
+        else:
+            new_snapshot = KnowledgeSnapshot(knowledge_overlay.apply_overlay(base_tables_store, overlay))
+        old_snapshot = snapshot_store
+        snapshot_store = new_snapshot
+        overlay_files_state = files_state
+    if old_snapshot == None or old_snapshot.fingerprint == new_snapshot.fingerprint:
+        return
+    changed = set()
+    for name, fingerprint in new_snapshot.fingerprints.items():
+        if old_snapshot.fingerprints.get(name) != fingerprint:
+            changed.add(name)
+    for callback in list(snapshot_change_listeners):
+        callback(frozenset(changed), new_snapshot)
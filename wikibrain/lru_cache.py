@@ -0,0 +1,98 @@
+import collections
+import threading
+
+
+class LruCache:
+    # bounded mapping, least recently used entries are evicted first
+    # safe to use from multiple threads
+    def __init__(self, max_size):
+        if max_size < 1:
+            raise ValueError("max_size must be positive, got " + str(max_size))
+        self.max_size = max_size
+        self.entries = collections.OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return self.entries[key]
+            self.misses += 1
+            return default
+
+    def put(self, key, value):
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def remove(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def items(self):
+        # copy of entries, least recently used first
+        with self.lock:
+            return list(self.entries.items())
+
+    def remove_matching(self, condition):
+        # removes entries where condition(key, value) is true, returns count of removed
+        with self.lock:
+            matching = [key for key, value in self.entries.items() if condition(key, value)]
+            for key in matching:
+                del self.entries[key]
+            return len(matching)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def resize(self, max_size):
+        if max_size < 1:
+            raise ValueError("max_size must be positive, got " + str(max_size))
+        with self.lock:
+            self.max_size = max_size
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def __len__(self):
+        return len(self.entries)
+
+    def statistics(self):
+        with self.lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "size": len(self.entries),
+                "max_size": self.max_size,
+            }
+
+    def reset_statistics(self):
+        with self.lock:
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+
+def module_functions(*caches):
+    # statistics(), clear() and set_max_size(max_size) of module keeping its results in caches
+    # statistics are of the first cache
+    def statistics():
+        return caches[0].statistics()
+
+    def clear():
+        for cache in caches:
+            cache.clear()
+
+    def set_max_size(max_size):
+        for cache in caches:
+            cache.resize(max_size)
+    return statistics, clear, set_max_size
@@ -0,0 +1,153 @@
+import json
+import os
+import threading
+import time
+from wikibrain import lru_cache
+from wikibrain import single_flight
+
+# "does not exist" answers: missing Wikidata entries, missing Wikipedia articles
+# and articles without Wikidata entry (also targets of redirects)
+#
+# broken links are common in OSM and the same missing entry is asked about many times
+# (by existence checks, by proposing replacement links...) - also with forced refresh
+# answers recorded here are reused, without asking wikimedia_connection again
+#
+# kept separately from cache of wikimedia_connection (what stores also these answers forever),
+# as things that do not exist may be created - so answers expire after ttl seconds
+# and then are checked again with forced refresh, see lookup
+# forced refresh requested by caller skips answers recorded here
+#
+# answers are kept in LruCache, so memory use is bounded also for runs with many broken links
+# (forgotten answer means only that lookup is made again)
+#
+# optionally saved to a file, so answers survive between runs, see save and load
+#
+# concurrent lookups of the same thing wait for a single one, see single_flight.py
+#
+# statistics()["saved_lookups"] is count of lookups that were skipped
+
+ENTITY = "entity"
+ARTICLE = "article"
+ARTICLE_ITEM = "article item"
+
+DEFAULT_TTL = 3 * 24 * 60 * 60
+DEFAULT_MAX_SIZE = 200000
+
+# states returned by state()
+MISSING = "missing"
+EXPIRED = "expired"
+UNKNOWN = "unknown"
+
+ttl = DEFAULT_TTL
+clock = time.time
+recorded_at = lru_cache.LruCache(DEFAULT_MAX_SIZE)
+lock = threading.Lock()
+counters = {"saved_lookups": 0, "recorded": 0, "expired": 0}
+lookups = single_flight.SingleFlight()
+
+
+def article_key(language_code, article_name):
+    return language_code + ":" + article_name
+
+
+def set_ttl(seconds):
+    global ttl
+    if seconds < 0:
+        raise ValueError("ttl must not be negative, got " + str(seconds))
+    ttl = seconds
+
+
+def set_clock(function):
+    # for tests, function returns time in seconds
+    global clock
+    clock = function
+
+
+def state(kind, key):
+    # EXPIRED is returned once, then answer is forgotten
+    now = clock()
+    with lock:
+        recorded = recorded_at.get((kind, key))
+        if recorded == None:
+            return UNKNOWN
+        if now - recorded > ttl:
+            recorded_at.remove((kind, key))
+            counters["expired"] += 1
+            return EXPIRED
+        counters["saved_lookups"] += 1
+        return MISSING
+
+
+def is_known_missing(kind, key):
+    return state(kind, key) == MISSING
+
+
+def lookup(kind, key, forced_refresh, function):
+    # returns function(forced_refresh), None means that thing is missing
+    # known missing things are not looked up, expired answers are checked again with forced refresh
+    # (without it wikimedia_connection would return answer from its cache)
+    if forced_refresh == False:
+        found = state(kind, key)
+        if found == MISSING:
+            return None
+        if found == EXPIRED:
+            forced_refresh = True
+    returned = lookups.do((kind, key, forced_refresh), lambda: function(forced_refresh))
+    if returned == None:
+        record_missing(kind, key)
+    else:
+        forget(kind, key)
+    return returned
+
+
+def record_missing(kind, key):
+    now = clock()
+    with lock:
+        recorded_at.put((kind, key), now)
+        counters["recorded"] += 1
+
+
+def forget(kind, key):
+    recorded_at.remove((kind, key))
+
+
+def statistics():
+    with lock:
+        returned = dict(counters)
+        returned["size"] = len(recorded_at)
+        return returned
+
+
+def reset_statistics():
+    with lock:
+        for name in counters:
+            counters[name] = 0
+
+
+def clear():
+    recorded_at.clear()
+
+
+def set_max_size(max_size):
+    recorded_at.resize(max_size)
+
+
+def save(filepath):
+    # expired answers are skipped
+    now = clock()
+    entries = [[kind, key, recorded] for (kind, key), recorded in recorded_at.items() if now - recorded <= ttl]
+    with open(filepath + ".tmp", 'w') as outfile:
+        json.dump(entries, outfile)
+    os.replace(filepath + ".tmp", filepath)
+
+
+def load(filepath):
+    # expired answers are skipped, missing file is not an error
+    if os.path.isfile(filepath) == False:
+        return
+    with open(filepath) as infile:
+        entries = json.load(infile)
+    now = clock()
+    for kind, key, recorded in entries:
+        if now - recorded <= ttl:
+            recorded_at.put((kind, key), recorded)
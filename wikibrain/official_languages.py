@@ -0,0 +1,92 @@
+import csv
+import os
+import threading
+
+# official_languages_from_wikidata.csv obtained from Wikidata
+# https://www.wikidata.org/w/index.php?title=Wikidata:Request_a_query&oldid=1776349815#Listing_countries_where_languages_have_status_of_an_official_language
+# to update data replace this file, no code changes are needed
+# generate_official_language_list.py in top level of repository may be used to review it
+OFFICIAL_LANGUAGES_CSV = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'official_languages_from_wikidata.csv')
+
+WIKIDATA_ENTITY_PREFIX = "http://www.wikidata.org/entity/"
+
+
+class OfficialLanguageTable:
+    # language code -> frozenset of wikidata ids of countries where it is official
+    # country wikidata id -> frozenset of language codes official there
+    # language code -> language name, for debug output
+    def __init__(self, rows):
+        countries_by_language = {}
+        languages_by_country = {}
+        language_names = {}
+        for row in rows:
+            language_code = row["language_code"]
+            country_id = row["country_id"]
+            if language_code not in countries_by_language:
+                countries_by_language[language_code] = []
+                language_names[language_code] = row["language_name"]
+            if country_id not in countries_by_language[language_code]:
+                countries_by_language[language_code].append(country_id)
+            if country_id not in languages_by_country:
+                languages_by_country[country_id] = []
+            if language_code not in languages_by_country[country_id]:
+                languages_by_country[country_id].append(language_code)
+        self.countries_by_language = {code: frozenset(ids) for code, ids in countries_by_language.items()}
+        self.languages_by_country = {country_id: frozenset(codes) for country_id, codes in languages_by_country.items()}
+        self.language_names = language_names
+
+    def countries_with_language(self, language_code):
+        # returns None for unknown language codes
+        return self.countries_by_language.get(language_code, None)
+
+    def languages_of_country(self, country_id):
+        return self.languages_by_country.get(country_id, frozenset())
+
+
+def get_language_code_from_row(row):
+    language_codes = []
+    if row[2] != "":
+        language_codes.append(row[2])
+    if row[3] != "":
+        language_codes.append(row[3])
+    if row[4] != "":
+        language_codes.append(row[4])
+    return language_codes[0]
+
+
+def rows_from_csv(filepath):
+    returned = []
+    with open(filepath, encoding='utf-8') as csvfile:
+        reader = csv.reader(csvfile)
+        headers = next(reader, None)
+        for row in reader:
+            language_name = row[1]
+            country_id = row[5].replace(WIKIDATA_ENTITY_PREFIX, "")
+            if country_id == "Q504081":  # Greek military junta of 1967–1974 (yes, Wikidata as source was a mistake)
+                continue
+            if "Sign Language" in language_name:
+                continue
+            returned.append({
+                "language_code": get_language_code_from_row(row),
+                "language_name": language_name,
+                "country_id": country_id,
+                "country_name": row[6],
+            })
+    return returned
+
+
+def load_table(filepath=OFFICIAL_LANGUAGES_CSV):
+    return OfficialLanguageTable(rows_from_csv(filepath))
+
+
+table_store = None
+table_lock = threading.Lock()
+
+
+def get_table():
+    global table_store
+    if table_store == None:
+        with table_lock:
+            if table_store == None:
+                table_store = load_table()
+    return table_store
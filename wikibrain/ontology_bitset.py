@@ -0,0 +1,165 @@
+import threading
+from wikibrain import knowledge_snapshot
+from wikibrain import lru_cache
+from wikibrain import ontology_data
+
+# bitset index of banned ancestors
+#
+# each key of invalid_types gets one bit, one more bit marks
+# ambiguous Wikidata items (such classes are never reported)
+#
+# mask of class is OR of its own bit and masks of its P279 parents
+# (skipping ignored entries, like wikidata_processing.get_recursive_all_subclass_of)
+# so it has bit set for every banned type present in the ontology closure of class
+#
+# masks are computed from masks of parents, so shared parts of ontology are processed once
+# cycles in P279 are handled by computing strongly connected components (Tarjan algorithm)
+# - all classes in a cycle have the same mask
+
+AMBIGUOUS_ITEM_MARKER = "Q122754124"
+DEFAULT_MAX_SIZE = 200000
+
+
+class BannedAncestorIndex:
+    def __init__(self, invalid_types, ignored_entries, max_size=DEFAULT_MAX_SIZE):
+        self.type_ids = tuple(sorted(invalid_types.keys()))
+        self.bit_of = {}
+        for position, type_id in enumerate(self.type_ids):
+            self.bit_of[type_id] = 1 << position
+        self.marker_bit = 1 << len(self.type_ids)
+        self.ignored_entries = ignored_entries
+        self.masks = lru_cache.LruCache(max_size)
+
+    def own_bits(self, class_id):
+        returned = self.bit_of.get(class_id, 0)
+        if class_id == AMBIGUOUS_ITEM_MARKER:
+            returned |= self.marker_bit
+        return returned
+
+    def parents(self, class_id):
+        # forbidden is only used for membership checks, so frozenset may be passed
+        return ontology_data.useful_direct_parents(class_id, self.ignored_entries)
+
+    def mask(self, class_id):
+        cached = self.masks.get(class_id)
+        if cached != None:
+            return cached
+        return self.compute_mask(class_id)
+
+    def compute_mask(self, class_id):
+        # iterative Tarjan algorithm, as ontology may be deeper than recursion limit
+        finished = {}
+        parents_of = {}
+        index_of = {}
+        lowlink = {}
+        stack = []
+        on_stack = set()
+        work = [[class_id, 0]]
+        while work != []:
+            frame = work[-1]
+            node = frame[0]
+            if node not in index_of:
+                index_of[node] = len(index_of)
+                lowlink[node] = index_of[node]
+                stack.append(node)
+                on_stack.add(node)
+                parents_of[node] = self.parents(node)
+            parents = parents_of[node]
+            descended = False
+            while frame[1] < len(parents):
+                parent = parents[frame[1]]
+                frame[1] += 1
+                if parent in finished or parent in on_stack:
+                    if parent in on_stack:
+                        lowlink[node] = min(lowlink[node], index_of[parent])
+                    continue
+                cached = self.masks.get(parent)
+                if cached != None:
+                    finished[parent] = cached
+                    continue
+                work.append([parent, 0])
+                descended = True
+                break
+            if descended:
+                continue
+            work.pop()
+            if work != []:
+                child = work[-1][0]
+                lowlink[child] = min(lowlink[child], lowlink[node])
+            if lowlink[node] == index_of[node]:
+                component = []
+                while True:
+                    member = stack.pop()
+                    on_stack.remove(member)
+                    component.append(member)
+                    if member == node:
+                        break
+                members = set(component)
+                mask = 0
+                for member in component:
+                    mask |= self.own_bits(member)
+                    for parent in parents_of[member]:
+                        if parent not in members:
+                            mask |= finished[parent]
+                for member in component:
+                    finished[member] = mask
+                    self.masks.put(member, mask)
+        return finished[class_id]
+
+    def masks_of(self, class_ids):
+        # returns list with mask of each class
+        # with ontology graph active (see ontology_data.py) masks are computed together
+        # by graph, otherwise class by class (shared parts of ontology are still processed once)
+        graph = ontology_data.active_graph
+        if graph != None:
+            return graph.banned_ancestor_masks(self, class_ids)
+        return [self.mask(class_id) for class_id in class_ids]
+
+    def type_ids_in_mask(self, mask):
+        returned = []
+        for position, type_id in enumerate(self.type_ids):
+            if mask & (1 << position):
+                returned.append(type_id)
+        return returned
+
+    def has_marker(self, mask):
+        return (mask & self.marker_bit) != 0
+
+
+index_store = None
+index_key = None
+index_lock = threading.Lock()
+
+
+def get_index():
+    # index is rebuilt when invalid types or ignored entries change
+    global index_store, index_key
+    snapshot = knowledge_snapshot.get_snapshot()
+    key = (snapshot.fingerprints["invalid_types"], snapshot.fingerprints["ignored_entries_in_wikidata_ontology"])
+    if index_key != key:
+        with index_lock:
+            if index_key != key:
+                index_store = BannedAncestorIndex(snapshot.invalid_types, snapshot.ignored_entries_in_wikidata_ontology)
+                index_key = key
+    return index_store
+
+
+def class_refreshed(class_id):
+    # masks of all subclasses of class_id may be outdated, and they are not tracked
+    # so everything is dropped - refreshing is rare
+    clear()
+
+
+def clear():
+    with index_lock:
+        if index_store != None:
+            index_store.masks.clear()
+
+
+def statistics():
+    if index_store == None:
+        return None
+    return index_store.masks.statistics()
+
+
+ontology_data.register_graph_change_listener(clear)
@@ -0,0 +1,198 @@
+from wikibrain import knowledge_snapshot
+from wikibrain import lru_cache
+from wikibrain import ontology_bitset
+from wikibrain import ontology_data
+from wikibrain import single_flight
+
+# process-wide cache of P279 (subclass of) closures
+#
+# many OSM objects share the same few hundred classes (church, school, shop...)
+# and walking Wikidata ontology for each of them again is wasteful
+#
+# key is (class id, fingerprint of ignored entries) as ignored entries change
+# what is reachable - see knowledge_snapshot.py
+#
+# entries are stored as tuples of (id, depth) in the order returned by
+# wikidata_processing.get_recursive_all_subclass_of_with_depth_data
+# (what is also the order of wikidata_processing.get_recursive_all_subclass_of)
+#
+# optionally closures are also saved in a persistent store (see ontology_store.py)
+# so they survive between runs, see set_persistent_store
+#
+# concurrent requests for the same closure (from threads validating different elements)
+# wait for a single computation, see single_flight.py
+
+DEFAULT_MAX_SIZE = 20000
+
+closure_cache = lru_cache.LruCache(DEFAULT_MAX_SIZE)
+# merged closures of several classes, see merged_closures
+merged_cache = lru_cache.LruCache(DEFAULT_MAX_SIZE)
+# statistics are of closure_cache
+statistics, clear, set_max_size = lru_cache.module_functions(closure_cache, merged_cache)
+computations = single_flight.SingleFlight()
+persistent_store = None
+class_refresh_listeners = []
+
+
+def set_persistent_store(store):
+    # store is ontology_store.ClosureStore or None to disable it
+    global persistent_store
+    persistent_store = store
+
+
+def closure_entries(class_id):
+    snapshot = knowledge_snapshot.get_snapshot()
+    key = (class_id, snapshot.fingerprints["ignored_entries_in_wikidata_ontology"])
+    cached = closure_cache.get(key)
+    if cached != None:
+        return cached
+    return computations.do(key, lambda: compute_closure_entries(key, snapshot))
+
+
+def compute_closure_entries(key, snapshot):
+    class_id = key[0]
+    store = persistent_store
+    if store != None:
+        stored = store.get(key[0], key[1])
+        if stored != None:
+            closure_cache.put(key, stored)
+            return stored
+    found = ontology_data.get_recursive_all_subclass_of_with_depth_data(class_id, snapshot.ignored_entries_in_wikidata_ontology_in_order)
+    entries = tuple((entry["id"], entry["depth"]) for entry in found)
+    closure_cache.put(key, entries)
+    if store != None:
+        store.put(key[0], key[1], entries)
+    return entries
+
+
+class MergedClosure:
+    # ancestors of several classes, each listed once, in order of the first appearance
+    # in closures joined one after another (see closure_entries)
+    #
+    # last_position is position of entry when entries are ordered by their last appearance
+    # in closures joined one after another (what is needed to get the same results
+    # as code that walked over joined closures)
+    # skipped is count of entries that were reached again, but not walked again
+    def __init__(self):
+        self.ids = []
+        self.last_position = {}
+        self.skipped = 0
+
+
+merge_statistics = {"merges": 0, "listed": 0, "skipped": 0}
+
+
+def record_merge(listed, skipped):
+    merge_statistics["merges"] += 1
+    merge_statistics["listed"] += listed
+    merge_statistics["skipped"] += skipped
+
+
+def merged_closures(class_ids):
+    snapshot = knowledge_snapshot.get_snapshot()
+    key = (tuple(class_ids), snapshot.fingerprints["ignored_entries_in_wikidata_ontology"])
+    cached = merged_cache.get(key)
+    if cached != None:
+        return cached
+    return computations.do(key, lambda: compute_merged_closures(key, snapshot))
+
+
+def compute_merged_closures(key, snapshot):
+    merged = walk_merged_closures(key[0], snapshot.ignored_entries_in_wikidata_ontology)
+    merged_cache.put(key, merged)
+    record_merge(len(merged.ids), merged.skipped)
+    return merged
+
+
+def walk_merged_closures(class_ids, ignored):
+    # single walk over ancestors of all classes, with processed entries shared between them
+    #
+    # for each class it is the walk of wikidata_processing.get_recursive_all_subclass_of
+    # with entries reached from earlier classes left out - as their ancestors were reached as well,
+    # remaining entries are listed in the same order as in closure of that class
+    # (like there, entries waiting to be processed are not skipped, so entry may be reached twice)
+    merged = MergedClosure()
+    parents = {}
+    processed = set()
+    for class_id in class_ids:
+        if class_id in processed:
+            merged.skipped += 1
+            continue
+        to_process = [class_id]
+        while to_process != []:
+            category_id = to_process.pop()
+            if category_id not in parents:
+                merged.ids.append(category_id)
+                parents[category_id] = ontology_data.useful_direct_parents(category_id, ignored)
+            processed.add(category_id)
+            new_ids = [parent_id for parent_id in parents[category_id] if parent_id not in processed]
+            merged.skipped += len(parents[category_id]) - len(new_ids)
+            to_process += new_ids
+
+    # the same walk, repeated over parents gathered above, starting from the last class
+    # lists each entry in the last closure where it appears
+    listed_in_closures = []
+    processed = set()
+    for class_id in reversed(class_ids):
+        if class_id in processed:
+            continue
+        listed = []
+        to_process = [class_id]
+        while to_process != []:
+            category_id = to_process.pop()
+            listed.append(category_id)
+            processed.add(category_id)
+            to_process += [parent_id for parent_id in parents[category_id] if parent_id not in processed]
+        listed_in_closures = listed + listed_in_closures
+    for position, wikidata_id in enumerate(listed_in_closures):
+        merged.last_position[wikidata_id] = position
+    return merged
+
+
+def class_refreshed(class_id):
+    # should be called when Wikidata data of class_id was refreshed or removed from cache
+    # drops closures of this class and all closures passing through it
+    closure_cache.remove_matching(lambda key, entries: any(entry[0] == class_id for entry in entries))
+    merged_cache.remove_matching(lambda key, merged: class_id in merged.last_position)
+    store = persistent_store
+    if store != None:
+        store.class_refreshed(class_id)
+    ontology_bitset.class_refreshed(class_id)
+    for listener in list(class_refresh_listeners):
+        listener(class_id)
+
+
+def register_class_refresh_listener(callback):
+    # callback(class_id) is called after closures using class_id were dropped
+    # for caches built on top of closures (see page_kind.py)
+    if callback not in class_refresh_listeners:
+        class_refresh_listeners.append(callback)
+
+
+def unregister_class_refresh_listener(callback):
+    if callback in class_refresh_listeners:
+        class_refresh_listeners.remove(callback)
+
+
+def get_recursive_all_subclass_of(class_id):
+    # equivalent to wikidata_processing.get_recursive_all_subclass_of
+    # with ignored entries from knowledge snapshot
+    return [entry[0] for entry in closure_entries(class_id)]
+
+
+def get_recursive_all_subclass_of_with_depth_data(class_id):
+    # equivalent to wikidata_processing.get_recursive_all_subclass_of_with_depth_data
+    # with ignored entries from knowledge snapshot
+    # new dictionaries are returned, so caller may modify them
+    return [{"id": entry[0], "depth": entry[1]} for entry in closure_entries(class_id)]
+
+
+def drop_closures_using_outdated_ignored_entries(changed_table_names, snapshot):
+    if "ignored_entries_in_wikidata_ontology" in changed_table_names:
+        current = snapshot.fingerprints["ignored_entries_in_wikidata_ontology"]
+        closure_cache.remove_matching(lambda key, value: key[1] != current)
+        merged_cache.remove_matching(lambda key, value: key[1] != current)
+
+
+knowledge_snapshot.register_snapshot_change_listener(drop_closures_using_outdated_ignored_entries)
+ontology_data.register_graph_change_listener(clear)
@@ -0,0 +1,54 @@
+from wikimedia_connection import wikidata_processing
+
+# source of P31 (instance of) and P279 (subclass of) data used by ontology checks
+#
+# by default Wikidata data is read via wikidata_processing, entity by entity
+# optionally graph loaded into memory can be used, see ontology_graph.py
+# (entries missing in graph are still read via wikidata_processing)
+#
+# caches derived from this data register listeners, so they are dropped when graph changes
+
+active_graph = None
+graph_change_listeners = []
+
+
+def set_active_graph(graph):
+    # graph is ontology_graph.OntologyGraph or None to read data via wikidata_processing
+    global active_graph
+    active_graph = graph
+    for listener in list(graph_change_listeners):
+        listener()
+
+
+def register_graph_change_listener(callback):
+    if callback not in graph_change_listeners:
+        graph_change_listeners.append(callback)
+
+
+def unregister_graph_change_listener(callback):
+    if callback in graph_change_listeners:
+        graph_change_listeners.remove(callback)
+
+
+def useful_direct_parents(class_id, forbidden):
+    # equivalent to wikidata_processing.get_useful_direct_parents
+    graph = active_graph
+    if graph != None:
+        return graph.useful_direct_parents(class_id, forbidden)
+    return wikidata_processing.get_useful_direct_parents(class_id, forbidden)
+
+
+def type_ids_of_entry(wikidata_id):
+    # equivalent to wikidata_processing.get_wikidata_type_ids_of_entry
+    graph = active_graph
+    if graph != None:
+        return graph.type_ids_of_entry(wikidata_id)
+    return wikidata_processing.get_wikidata_type_ids_of_entry(wikidata_id)
+
+
+def get_recursive_all_subclass_of_with_depth_data(class_id, ignored_entries_in_wikidata_ontology):
+    # equivalent to wikidata_processing.get_recursive_all_subclass_of_with_depth_data
+    graph = active_graph
+    if graph != None:
+        return graph.get_recursive_all_subclass_of_with_depth_data(class_id, ignored_entries_in_wikidata_ontology)
+    return wikidata_processing.get_recursive_all_subclass_of_with_depth_data(class_id, list(ignored_entries_in_wikidata_ontology), False, callback=None)
@@ -0,0 +1,268 @@
+import array
+import os
+import numpy
+from wikimedia_connection import wikidata_processing
+from wikibrain import ontology_bitset
+
+# P31 (instance of) and P279 (subclass of) edges of many Wikidata entries, held in NumPy arrays
+#
+# requires numpy, install wikibrain with graph extra: pip install wikibrain[graph]
+#
+# Q ids are stored as integers (Q42 -> 42) in sorted array, position in it is index of entry
+# edges are stored in compressed sparse row layout:
+#   targets of edges from entry with index i are
+#   subclass_of_targets[subclass_of_offsets[i]:subclass_of_offsets[i+1]]
+#   (the same for instance_of)
+# edges keep order of statements in Wikidata, as traversal order depends on it
+# deprecated statements and ones without value are skipped while building
+# (like in wikidata_processing.get_useful_direct_parents)
+#
+# has_data marks entries that were loaded - other ones appear only as targets of edges
+# for them data is read via wikidata_processing
+#
+# graph saved with save() is loaded with memory mapping, so worker processes
+# loading the same files share memory
+#
+# use with ontology_data.set_active_graph
+
+ARRAY_NAMES = ["ids", "has_data", "subclass_of_offsets", "subclass_of_targets", "instance_of_offsets", "instance_of_targets"]
+
+
+def id_to_number(wikidata_id):
+    if wikidata_id == None or wikidata_id[:1] != "Q" or wikidata_id[1:].isdigit() == False:
+        return None
+    return int(wikidata_id[1:])
+
+
+def useful_statement_targets(statements):
+    returned = []
+    for statement in statements:
+        if 'datavalue' not in statement['mainsnak']:
+            continue
+        if 'qualifiers' in statement and 'P2241' in statement['qualifiers']:
+            continue
+        if statement.get('rank') == "deprecated":
+            continue
+        returned.append(statement['mainsnak']['datavalue']['value']['id'])
+    return returned
+
+
+class OntologyGraph:
+    def __init__(self, ids, has_data, subclass_of_offsets, subclass_of_targets, instance_of_offsets, instance_of_targets):
+        self.ids = ids
+        self.has_data = has_data
+        self.subclass_of_offsets = subclass_of_offsets
+        self.subclass_of_targets = subclass_of_targets
+        self.instance_of_offsets = instance_of_offsets
+        self.instance_of_targets = instance_of_targets
+
+    def index_of(self, wikidata_id):
+        # returns None if entry has no data in graph
+        number = id_to_number(wikidata_id)
+        if number == None:
+            return None
+        index = int(numpy.searchsorted(self.ids, number))
+        if index >= len(self.ids) or self.ids[index] != number:
+            return None
+        if self.has_data[index] == 0:
+            return None
+        return index
+
+    def id_at(self, index):
+        return "Q" + str(int(self.ids[index]))
+
+    def targets(self, offsets, targets, index):
+        return [self.id_at(target) for target in targets[offsets[index]:offsets[index + 1]]]
+
+    def useful_direct_parents(self, class_id, forbidden):
+        # equivalent to wikidata_processing.get_useful_direct_parents
+        index = self.index_of(class_id)
+        if index == None:
+            return wikidata_processing.get_useful_direct_parents(class_id, forbidden)
+        return [parent_id for parent_id in self.targets(self.subclass_of_offsets, self.subclass_of_targets, index) if parent_id not in forbidden]
+
+    def type_ids_of_entry(self, wikidata_id):
+        # equivalent to wikidata_processing.get_wikidata_type_ids_of_entry
+        # (except that empty list rather than None is returned for entry without any types)
+        index = self.index_of(wikidata_id)
+        if index == None:
+            return wikidata_processing.get_wikidata_type_ids_of_entry(wikidata_id)
+        return self.targets(self.instance_of_offsets, self.instance_of_targets, index)
+
+    def get_recursive_all_subclass_of_with_depth_data(self, wikidata_id, ignored_entries_in_wikidata_ontology):
+        # equivalent to wikidata_processing.get_recursive_all_subclass_of_with_depth_data
+        # including order of returned entries
+        # note that entries waiting in to_process are not skipped, like in wikidata_processing
+        # so the same entry may be listed more than once
+        ignored = frozenset(ignored_entries_in_wikidata_ontology)
+        processed = set()
+        found = []
+        to_process = [{"id": wikidata_id, "depth": 0}]
+        while to_process != []:
+            process = to_process.pop()
+            found.append(process)
+            processed.add(process["id"])
+            for parent_id in self.useful_direct_parents(process["id"], ignored):
+                if parent_id not in processed:
+                    to_process.append({"id": parent_id, "depth": process["depth"] + 1})
+        return found
+
+    def get_recursive_all_subclass_of(self, wikidata_id, ignored_entries_in_wikidata_ontology):
+        # equivalent to wikidata_processing.get_recursive_all_subclass_of
+        return [entry["id"] for entry in self.get_recursive_all_subclass_of_with_depth_data(wikidata_id, ignored_entries_in_wikidata_ontology)]
+
+    def parents_of_nodes(self, nodes):
+        # P279 targets of all given node indexes, as one array
+        starts = self.subclass_of_offsets[nodes]
+        lengths = self.subclass_of_offsets[nodes + 1] - starts
+        total = int(lengths.sum())
+        if total == 0:
+            return numpy.zeros(0, dtype=numpy.int64)
+        row_offsets = numpy.cumsum(lengths) - lengths
+        positions = numpy.repeat(starts - row_offsets, lengths) + numpy.arange(total)
+        return self.subclass_of_targets[positions].astype(numpy.int64)
+
+    def node_indexes(self, wikidata_ids):
+        # indexes of all nodes of given entries, also ones appearing only as targets of edges
+        # entries not present in graph are skipped
+        numbers = numpy.array(sorted(set(number for number in map(id_to_number, wikidata_ids) if number != None)), dtype=numpy.int64)
+        indexes = numpy.searchsorted(self.ids, numbers)
+        present = indexes < len(self.ids)
+        indexes = indexes[present]
+        return indexes[self.ids[indexes] == numbers[present]].astype(numpy.int64)
+
+    def reachable_nodes(self, start_nodes, blocked_nodes):
+        # sorted node indexes reachable from start nodes via P279 edges
+        # edges leading to blocked nodes are not followed
+        reached = numpy.unique(start_nodes)
+        frontier = reached
+        while len(frontier) > 0:
+            parents = numpy.unique(self.parents_of_nodes(frontier))
+            parents = parents[numpy.isin(parents, blocked_nodes, invert=True)]
+            frontier = parents[numpy.isin(parents, reached, assume_unique=True, invert=True)]
+            reached = numpy.union1d(reached, frontier)
+        return reached
+
+    def banned_ancestor_masks(self, index, class_ids):
+        # returns list with mask (see ontology_bitset.BannedAncestorIndex) of each class
+        #
+        # subgraph reachable from all classes is found by expanding frontier of all of them at once
+        # then masks of all its nodes are computed together: mask of node is OR of its own bits
+        # and masks of parents, what is repeated until nothing changes (so cycles are handled)
+        # masks are stored as rows of 64-bit words, as there are more banned types than 64
+        returned = [None] * len(class_ids)
+        starts = []
+        for position, class_id in enumerate(class_ids):
+            node = self.index_of(class_id)
+            if node == None:
+                returned[position] = index.mask(class_id)
+            else:
+                starts.append((position, node))
+        if starts == []:
+            return returned
+        # ignored entries without data in graph are blocked too, otherwise their ancestors would be reached
+        blocked = self.node_indexes(index.ignored_entries)
+        nodes = self.reachable_nodes(numpy.array([node for position, node in starts], dtype=numpy.int64), blocked)
+
+        edge_sources = numpy.repeat(numpy.arange(len(nodes)), self.subclass_of_offsets[nodes + 1] - self.subclass_of_offsets[nodes])
+        edge_targets = self.parents_of_nodes(nodes)
+        kept = numpy.isin(edge_targets, blocked, invert=True)
+        edge_sources = edge_sources[kept]
+        edge_targets = numpy.searchsorted(nodes, edge_targets[kept])
+
+        word_count = (len(index.type_ids) + 1 + 63) // 64
+        own = numpy.zeros((len(nodes), word_count), dtype=numpy.uint64)
+        marked_ids = list(index.type_ids) + [ontology_bitset.AMBIGUOUS_ITEM_MARKER]
+        for wikidata_id in marked_ids:
+            node = self.index_of(wikidata_id)
+            if node == None:
+                continue
+            local = numpy.searchsorted(nodes, node)
+            if local < len(nodes) and nodes[local] == node:
+                own[local] |= mask_to_words(index.own_bits(wikidata_id), word_count)
+        for local in numpy.flatnonzero(self.has_data[nodes] == 0):
+            # data of such nodes is not in graph
+            own[local] = mask_to_words(index.mask(self.id_at(nodes[local])), word_count)
+
+        masks = own
+        while True:
+            combined = own.copy()
+            numpy.bitwise_or.at(combined, edge_sources, masks[edge_targets])
+            if numpy.array_equal(combined, masks):
+                break
+            masks = combined
+
+        for position, node in starts:
+            local = numpy.searchsorted(nodes, node)
+            returned[position] = words_to_mask(masks[local])
+            index.masks.put(class_ids[position], returned[position])
+        return returned
+
+    def memory_usage(self):
+        # in bytes
+        return sum(getattr(self, name).nbytes for name in ARRAY_NAMES)
+
+    def save(self, folder):
+        os.makedirs(folder, exist_ok=True)
+        for name in ARRAY_NAMES:
+            numpy.save(os.path.join(folder, name + ".npy"), getattr(self, name))
+
+
+def mask_to_words(mask, word_count):
+    return numpy.array([(mask >> (64 * word)) & 0xFFFFFFFFFFFFFFFF for word in range(word_count)], dtype=numpy.uint64)
+
+
+def words_to_mask(words):
+    returned = 0
+    for word, value in enumerate(words):
+        returned |= int(value) << (64 * word)
+    return returned
+
+
+def load_graph(folder):
+    # arrays are memory mapped read-only
+    arrays = [numpy.load(os.path.join(folder, name + ".npy"), mmap_mode='r') for name in ARRAY_NAMES]
+    return OntologyGraph(*arrays)
+
+
+def compressed_sparse_rows(sources, targets, node_count):
+    # sources and targets are arrays of indexes, edges with the same source keep their order
+    order = numpy.argsort(sources, kind='stable')
+    counts = numpy.bincount(sources, minlength=node_count)
+    offsets = numpy.zeros(node_count + 1, dtype=numpy.int64)
+    numpy.cumsum(counts, out=offsets[1:])
+    return offsets, targets[order].astype(numpy.int32)
+
+
+def build_graph(entities):
+    # entities in format used by Wikidata API and dumps, for example
+    # from wikidata_dump.entities_in_dump or wikidata_dump.DumpStore.all_entities
+    # entities that are not items (properties, lexemes) are skipped
+    loaded = array.array('q')
+    edges = {"P279": (array.array('q'), array.array('q')), "P31": (array.array('q'), array.array('q'))}
+    for entity in entities:
+        number = id_to_number(entity["id"])
+        if number == None:
+            continue
+        loaded.append(number)
+        claims = entity.get("claims", {})
+        for property_id, (sources, targets) in edges.items():
+            for target_id in useful_statement_targets(claims.get(property_id, [])):
+                target = id_to_number(target_id)
+                if target == None:
+                    continue
+                sources.append(number)
+                targets.append(target)
+    loaded = numpy.frombuffer(loaded, dtype=numpy.int64)
+    all_numbers = [loaded]
+    for sources, targets in edges.values():
+        all_numbers.append(numpy.frombuffer(targets, dtype=numpy.int64))
+    ids = numpy.unique(numpy.concatenate(all_numbers))
+    has_data = numpy.zeros(len(ids), dtype=numpy.uint8)
+    has_data[numpy.searchsorted(ids, loaded)] = 1
+    rows = {}
+    for property_id, (sources, targets) in edges.items():
+        source_indexes = numpy.searchsorted(ids, numpy.frombuffer(sources, dtype=numpy.int64))
+        target_indexes = numpy.searchsorted(ids, numpy.frombuffer(targets, dtype=numpy.int64))
+        rows[property_id] = compressed_sparse_rows(source_indexes, target_indexes, len(ids))
+    return OntologyGraph(ids, has_data, rows["P279"][0], rows["P279"][1], rows["P31"][0], rows["P31"][1])
@@ -0,0 +1,87 @@
+import os
+import sqlite3
+import threading
+from wikimedia_connection import wikimedia_connection
+
+# persistent store of P279 (subclass of) closures, see ontology_cache.py
+#
+# without it every new process walks Wikidata ontology again, reading
+# the same cache files of wikimedia_connection
+#
+# each closure is stored as rows (class_id, fingerprint, position, ancestor_id, depth)
+# where position keeps the order of entries - the first row is the class itself
+#
+# when data of some class is refreshed class_refreshed must be called
+# it drops all closures that pass through this class
+
+
+def default_location():
+    # next to cache of wikimedia_connection, as data is derived from it
+    return os.path.join(wikimedia_connection.cache_location(), "wikibrain_ontology_closures.sqlite")
+
+
+class ClosureStore:
+    def __init__(self, filepath):
+        self.filepath = filepath
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(filepath, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("""CREATE TABLE IF NOT EXISTS closures (
+            class_id TEXT NOT NULL,
+            fingerprint TEXT NOT NULL,
+            position INTEGER NOT NULL,
+            ancestor_id TEXT NOT NULL,
+            depth INTEGER NOT NULL,
+            PRIMARY KEY (class_id, fingerprint, position)
+        )""")
+        self.connection.execute("CREATE INDEX IF NOT EXISTS closures_by_ancestor ON closures (ancestor_id)")
+        self.connection.commit()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, class_id, fingerprint):
+        # returns tuple of (ancestor_id, depth) or None if closure is not stored
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT ancestor_id, depth FROM closures WHERE class_id = ? AND fingerprint = ? ORDER BY position",
+                (class_id, fingerprint)).fetchall()
+            if rows == []:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return tuple((row[0], row[1]) for row in rows)
+
+    def put(self, class_id, fingerprint, entries):
+        rows = [(class_id, fingerprint, position, entry[0], entry[1]) for position, entry in enumerate(entries)]
+        with self.lock:
+            with self.connection:
+                self.connection.execute("DELETE FROM closures WHERE class_id = ? AND fingerprint = ?", (class_id, fingerprint))
+                self.connection.executemany("INSERT INTO closures VALUES (?, ?, ?, ?, ?)", rows)
+
+    def class_refreshed(self, class_id):
+        # drops closures of this class and all closures passing through it
+        # returns count of dropped closures
+        with self.lock:
+            with self.connection:
+                affected = self.connection.execute(
+                    "SELECT DISTINCT class_id, fingerprint FROM closures WHERE ancestor_id = ?",
+                    (class_id,)).fetchall()
+                self.connection.executemany("DELETE FROM closures WHERE class_id = ? AND fingerprint = ?", affected)
+                return len(affected)
+
+    def drop_other_fingerprints(self, fingerprint):
+        # closures built with different ignored entries will not be used anymore
+        with self.lock:
+            with self.connection:
+                self.connection.execute("DELETE FROM closures WHERE fingerprint != ?", (fingerprint,))
+
+    def count(self):
+        with self.lock:
+            return self.connection.execute("SELECT COUNT(DISTINCT class_id || ' ' || fingerprint) FROM closures").fetchone()[0]
+
+    def statistics(self):
+        return {"hits": self.hits, "misses": self.misses, "closures": self.count()}
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
@@ -0,0 +1,48 @@
+import collections
+from wikibrain import knowledge_snapshot
+from wikibrain import ontology_data
+
+# lazy traversal of Wikidata ontology
+#
+# wikidata_processing.get_recursive_all_subclass_of loads the entire closure before
+# returning anything, what is wasteful for checks that need only the first decisive entry
+# here entries are yielded one by one, in breadth first order, so closer
+# (usually more specific) classes come first and later entities are loaded only when needed
+#
+# yields the same set of entries as WikimediaLinkIssueDetector.wikidata_entries_classifying_entry
+# but in different order and without duplicates
+
+
+def ancestors_breadth_first(start_ids, ignored_entries=None):
+    # yields (id, depth) for start ids (depth 0) and all their P279 ancestors
+    # ignored entries are not yielded and not followed (start ids are always yielded)
+    if ignored_entries == None:
+        ignored_entries = knowledge_snapshot.get_snapshot().ignored_entries_in_wikidata_ontology
+    seen = set()
+    queue = collections.deque()
+    for start_id in start_ids:
+        if start_id not in seen:
+            seen.add(start_id)
+            queue.append((start_id, 0))
+    while len(queue) > 0:
+        wikidata_id, depth = queue.popleft()
+        yield wikidata_id, depth
+        # forbidden is only used for membership checks, so frozenset may be passed
+        for parent_id in ontology_data.useful_direct_parents(wikidata_id, ignored_entries):
+            if parent_id not in seen:
+                seen.add(parent_id)
+                queue.append((parent_id, depth + 1))
+
+
+def classifying_entries_breadth_first(wikidata_id, ignored_entries=None):
+    # yields (id, depth) for wikidata_id, its P31 types (both with depth 0)
+    # and their P279 ancestors
+    if ignored_entries == None:
+        ignored_entries = knowledge_snapshot.get_snapshot().ignored_entries_in_wikidata_ontology
+    start_ids = [wikidata_id]
+    root_instance_ids = ontology_data.type_ids_of_entry(wikidata_id)
+    if root_instance_ids != None:
+        for root in root_instance_ids:
+            if root not in ignored_entries:
+                start_ids.append(root)
+    return ancestors_breadth_first(start_ids, ignored_entries)
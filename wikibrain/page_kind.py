@@ -0,0 +1,115 @@
+from wikibrain import knowledge_snapshot
+from wikibrain import lru_cache
+from wikibrain import ontology_cache
+from wikibrain import ontology_data
+
+# what kind of page is described by Wikidata entry
+# article / disambiguation / list / unknown
+#
+# checks for wikipedia-wikidata mismatches and for links to unusable pages
+# need this for the same entries again and again, so result is cached
+# key is (wikidata id, fingerprint of ignored entries), like in ontology_cache.py
+#
+# types are the same as listed by wikidata_processing.get_all_types_describing_wikidata_object
+# closures of types and of entry itself are taken from ontology_cache
+
+ARTICLE = "article"
+DISAMBIGUATION = "disambiguation"
+LIST = "list"
+UNKNOWN = "unknown"
+
+DISAMBIGUATION_TYPE_ID = 'Q4167410'
+LIST_TYPE_ID = 'Q13406463'
+
+DEFAULT_MAX_SIZE = 50000
+
+
+class PageKind:
+    # kind is based on whichever of disambiguation/list type was reached first
+    # (entry may be both, what is a Wikidata error)
+    # unknown means that entry has no types and is not a subclass of anything
+    def __init__(self, kind, is_disambiguation, is_list):
+        self.kind = kind
+        self.is_disambiguation = is_disambiguation
+        self.is_list = is_list
+
+    def __repr__(self):
+        return "PageKind(" + self.kind + ")"
+
+
+kind_cache = lru_cache.LruCache(DEFAULT_MAX_SIZE)
+statistics, clear, set_max_size = lru_cache.module_functions(kind_cache)
+
+
+def roots(wikidata_id, snapshot):
+    # types ("is instance of") that are not ignored, followed by entry itself
+    # in the same order as in wikidata_processing.get_all_types_describing_wikidata_object
+    returned = []
+    type_ids = ontology_data.type_ids_of_entry(wikidata_id)
+    if type_ids != None:
+        for type_id in type_ids:
+            if type_id in snapshot.ignored_entries_in_wikidata_ontology:
+                continue
+            if type_id not in returned:
+                returned.append(type_id)
+    returned.append(wikidata_id)
+    return returned
+
+
+def classify_uncached(wikidata_id, snapshot):
+    first_found = None
+    is_disambiguation = False
+    is_list = False
+    described = False
+    for root in roots(wikidata_id, snapshot):
+        for type_id, depth in ontology_cache.closure_entries(root):
+            if type_id != wikidata_id:
+                described = True
+            if type_id == DISAMBIGUATION_TYPE_ID:
+                is_disambiguation = True
+                if first_found == None:
+                    first_found = DISAMBIGUATION
+            elif type_id == LIST_TYPE_ID:
+                is_list = True
+                if first_found == None:
+                    first_found = LIST
+        if is_disambiguation and is_list:
+            break
+    if first_found != None:
+        return PageKind(first_found, is_disambiguation, is_list)
+    if described:
+        return PageKind(ARTICLE, False, False)
+    return PageKind(UNKNOWN, False, False)
+
+
+def classify(wikidata_id):
+    # returns PageKind
+    snapshot = knowledge_snapshot.get_snapshot()
+    key = (wikidata_id, snapshot.fingerprints["ignored_entries_in_wikidata_ontology"])
+    cached = kind_cache.get(key)
+    if cached != None:
+        return cached
+    returned = classify_uncached(wikidata_id, snapshot)
+    kind_cache.put(key, returned)
+    return returned
+
+
+def is_disambiguation(wikidata_id):
+    return classify(wikidata_id).is_disambiguation
+
+
+def class_refreshed(class_id):
+    # kind of any entry with class_id among its types may be outdated
+    # types are not kept here, so everything is dropped - refreshing is rare
+    clear()
+
+
+def drop_kinds_using_outdated_ignored_entries(changed_table_names, snapshot):
+    if "ignored_entries_in_wikidata_ontology" in changed_table_names:
+        current = snapshot.fingerprints["ignored_entries_in_wikidata_ontology"]
+        kind_cache.remove_matching(lambda key, value: key[1] != current)
+
+
+ontology_cache.register_class_refresh_listener(class_refreshed)
+ontology_data.register_graph_change_listener(clear)
+knowledge_snapshot.register_snapshot_change_listener(drop_kinds_using_outdated_ignored_entries)
@@ -0,0 +1,377 @@
+import json
+import re
+import urllib.parse
+from wikimedia_connection import wikimedia_connection
+from wikibrain import knowledge_snapshot
+from wikibrain import wikipedia_knowledge
+
+# fetches Wikidata data needed to validate many OSM elements in few requests
+# and stores it in cache of wikimedia_connection, in the same place where
+# wikimedia_connection.get_data_from_wikidata_by_id and
+# wikimedia_connection.get_wikidata_object_id_from_article look for it
+#
+# detector itself is not changed - it finds data already in cache
+#
+# collected are
+# - ids from wikidata tags and from secondary ones (brand:wikidata, subject:wikidata, species:wikidata...)
+# - entries linked by wikipedia tags (wikipedia, brand:wikipedia, old style wikipedia:pl...)
+# - optionally their types and P279 (subclass of) ancestors, level by level
+#
+# Wikidata API accepts up to 50 ids or titles in one request
+# if request for a group fails it is split in halves, so a single broken id
+# does not prevent fetching other ones (it is left for the usual fetching)
+#
+# transport is pluggable, see WikidataApiTransport and InMemoryTransport (used in tests)
+
+BATCH_SIZE = 50
+WIKIDATA_ID_PATTERN = re.compile(r"^Q[1-9][0-9]*$")
+
+
+class WikidataApiTransport:
+    # returns parsed response of wbgetentities or None on failure
+    def get_entities(self, wikidata_ids):
+        return self.query("action=wbgetentities&ids=" + urllib.parse.quote("|".join(wikidata_ids)) + "&format=json")
+
+    def get_entities_by_titles(self, site, titles):
+        return self.query("action=wbgetentities&sites=" + urllib.parse.quote(site) + "&titles=" + urllib.parse.quote("|".join(titles)) + "&format=json")
+
+    def query(self, query):
+        result = wikimedia_connection.download("https://www.wikidata.org/w/api.php?" + query)
+        if result.code != 200:
+            return None
+        try:
+            return json.loads(result.content.decode())
+        except ValueError:
+            return None
+
+
+class InMemoryTransport:
+    # answers like Wikidata API from given entities, without network access
+    # requests including any of broken_ids fail, like requests with malformed ids
+    def __init__(self, entities, broken_ids=None):
+        self.entities = {}
+        for data in entities:
+            self.entities[data["id"]] = data
+        if broken_ids == None:
+            broken_ids = []
+        self.broken_ids = broken_ids
+        self.requests = []
+
+    def get_entities(self, wikidata_ids):
+        self.requests.append(list(wikidata_ids))
+        returned = {}
+        for wikidata_id in wikidata_ids:
+            if wikidata_id in self.broken_ids:
+                return {"error": {"code": "no-such-entity", "info": "Could not find an entity with the ID \"" + wikidata_id + "\"."}}
+            if wikidata_id in self.entities:
+                returned[wikidata_id] = self.entities[wikidata_id]
+            else:
+                returned[wikidata_id] = {"id": wikidata_id, "missing": ""}
+        return {"entities": returned, "success": 1}
+
+    def get_entities_by_titles(self, site, titles):
+        self.requests.append([site] + list(titles))
+        returned = {}
+        for title in titles:
+            found = None
+            for data in self.entities.values():
+                if data.get("sitelinks", {}).get(site, {}).get("title") == normalized_title(title):
+                    found = data
+            if found == None:
+                missing_id = str(-len(returned) - 1)
+                returned[missing_id] = {"site": site, "title": normalized_title(title), "missing": ""}
+            else:
+                returned[found["id"]] = found
+        return {"entities": returned, "success": 1}
+
+
+def normalized_title(title):
+    # as returned by Wikipedia, what is used to match responses to requested titles
+    title = title.replace("_", " ").strip()
+    return title[:1].upper() + title[1:]
+
+
+def site_of_language_code(language_code):
+    # see wikimedia_connection.download_data_from_wikidata
+    if language_code in ["be-tarask", "be-x-old"]:
+        return "be_x_oldwiki"
+    return language_code + "wiki"
+
+
+def wikidata_ids_in_tags(tags):
+    returned = []
+    for key, value in tags.items():
+        if key != "wikidata" and key.endswith(":wikidata") == False:
+            continue
+        for part in value.split(";"):
+            part = part.strip()
+            if WIKIDATA_ID_PATTERN.match(part) != None and part not in returned:
+                returned.append(part)
+    return returned
+
+
+def wikipedia_links_in_tags(tags):
+    # returns list of (language code, article name)
+    registry = wikipedia_knowledge.language_registry()
+    returned = []
+    for key, value in tags.items():
+        if key == "wikipedia" or key.endswith(":wikipedia"):
+            if ":" not in value:
+                continue
+            link = (wikimedia_connection.get_language_code_from_link(value), wikimedia_connection.get_article_name_from_link(value))
+        elif key.startswith("wikipedia:") and registry.is_known_language_code(key[len("wikipedia:"):]):
+            link = (key[len("wikipedia:"):], value)
+        else:
+            continue
+        if link[0] == None or link[1] == None or link[1].strip() == "":
+            continue
+        if registry.is_known_language_code(link[0]) == False:
+            continue
+        if link not in returned:
+            returned.append(link)
+    return returned
+
+
+def references_in_tags(list_of_tags):
+    # returns (links, wikidata ids) from all tags, each listed once
+    # links are (language code, article name)
+    links = []
+    wikidata_ids = []
+    listed = set()
+    for tags in list_of_tags:
+        for link in wikipedia_links_in_tags(tags):
+            if link not in listed:
+                listed.add(link)
+                links.append(link)
+        for wikidata_id in wikidata_ids_in_tags(tags):
+            if wikidata_id not in listed:
+                listed.add(wikidata_id)
+                wikidata_ids.append(wikidata_id)
+    return links, wikidata_ids
+
+
+def ontology_targets(data):
+    # P31 (instance of) and P279 (subclass of) targets of entity
+    returned = []
+    for property_id in ["P31", "P279"]:
+        for claim in data.get("claims", {}).get(property_id, []):
+            try:
+                returned.append(claim["mainsnak"]["datavalue"]["value"]["id"])
+            except (KeyError, TypeError):
+                continue
+    return returned
+
+
+def is_successful_response(response):
+    return response != None and "error" not in response and "entities" in response
+
+
+def entity_in_response(wikidata_id, response):
+    # entity may be listed under id of redirect target
+    entities = response["entities"]
+    if wikidata_id in entities:
+        return entities[wikidata_id]
+    for data in entities.values():
+        if data.get("redirects", {}).get("from") == wikidata_id:
+            return data
+    return None
+
+
+def is_entity_cached(wikidata_id):
+    return wikimedia_connection.it_is_necessary_to_reload_wikidata_by_id_files(wikidata_id) == False
+
+
+def is_article_cached(language_code, article_name):
+    return wikimedia_connection.it_is_necessary_to_reload_wikidata_files(language_code, article_name) == False
+
+
+def write_entity_to_cache(wikidata_id, data):
+    wikimedia_connection.ensure_that_cache_folder_exists(wikimedia_connection.wikidata_language_placeholder())
+    if "missing" in data:
+        content = {"error": {"code": "no-such-entity", "info": "Could not find an entity with the ID \"" + wikidata_id + "\"."}}
+    else:
+        content = {"entities": {wikidata_id: data}, "success": 1}
+    wikimedia_connection.write_to_text_file(wikimedia_connection.get_filename_with_wikidata_entity_by_id(wikidata_id), json.dumps(content))
+    wikimedia_connection.write_to_text_file(wikimedia_connection.get_filename_with_wikidata_by_id_response_code(wikidata_id), "200")
+
+
+def write_article_to_cache(language_code, article_name, entity_key, data):
+    wikimedia_connection.ensure_that_cache_folder_exists(language_code)
+    if "missing" in data:
+        # in response for a single title missing entry is always listed as -1
+        entity_key = "-1"
+    content = {"entities": {entity_key: data}, "success": 1}
+    wikimedia_connection.write_to_text_file(wikimedia_connection.get_filename_with_wikidata_entity(language_code, article_name), json.dumps(content))
+    wikimedia_connection.write_to_text_file(wikimedia_connection.get_filename_with_wikidata_response_code(language_code, article_name), "200")
+
+
+def write_article_response_to_cache(language_code, article_name, response):
+    # whole response for a single title, like written by wikimedia_connection.download_data_from_wikidata
+    wikimedia_connection.ensure_that_cache_folder_exists(language_code)
+    wikimedia_connection.write_to_text_file(wikimedia_connection.get_filename_with_wikidata_entity(language_code, article_name), json.dumps(response))
+    wikimedia_connection.write_to_text_file(wikimedia_connection.get_filename_with_wikidata_response_code(language_code, article_name), "200")
+
+
+class Prefetcher:
+    def __init__(self, transport=None, batch_size=BATCH_SIZE, show_progress=False):
+        if transport == None:
+            transport = WikidataApiTransport()
+        self.transport = transport
+        self.batch_size = batch_size
+        self.show_progress = show_progress
+        self.statistics = {"requests": 0, "failed_requests": 0, "fetched": 0, "already_cached": 0, "not_fetched": 0}
+
+    def report_progress(self, stage):
+        if self.show_progress:
+            print(stage + ":", self.statistics["fetched"], "fetched,", self.statistics["already_cached"], "already cached,", self.statistics["requests"], "requests,", self.statistics["failed_requests"], "failed")
+
+    def in_groups(self, entries):
+        for start in range(0, len(entries), self.batch_size):
+            yield entries[start:start + self.batch_size]
+
+    def request_groups(self, groups, request):
+        # returns list of (entries, response) for requests that succeeded
+        # groups are requested one by one, see fetch_engine.ConcurrentPrefetcher for concurrent variant
+        returned = []
+        for group in groups:
+            returned += self.request_with_bisection(group, request)
+        return returned
+
+    def request_with_bisection(self, entries, request):
+        # returns list of (entries, response) for requests that succeeded
+        self.statistics["requests"] += 1
+        response = request(entries)
+        if is_successful_response(response):
+            return [(entries, response)]
+        self.statistics["failed_requests"] += 1
+        if len(entries) == 1:
+            self.statistics["not_fetched"] += 1
+            return []
+        middle = len(entries) // 2
+        return self.request_with_bisection(entries[:middle], request) + self.request_with_bisection(entries[middle:], request)
+
+    def fetch_entities(self, wikidata_ids):
+        # returns {id: P31 and P279 targets} for fetched entities
+        # (only they are kept as whole entries of many elements would take a lot of memory)
+        fetched = {}
+        missing_in_cache = []
+        listed = set()
+        for wikidata_id in wikidata_ids:
+            if is_entity_cached(wikidata_id):
+                self.statistics["already_cached"] += 1
+            elif wikidata_id not in listed:
+                listed.add(wikidata_id)
+                missing_in_cache.append(wikidata_id)
+        for requested, response in self.request_groups(list(self.in_groups(missing_in_cache)), self.transport.get_entities):
+            for wikidata_id in requested:
+                data = self.entity_in_response(wikidata_id, response)
+                if data == None:
+                    self.statistics["not_fetched"] += 1
+                    continue
+                write_entity_to_cache(wikidata_id, data)
+                self.statistics["fetched"] += 1
+                if "missing" not in data:
+                    fetched[wikidata_id] = ontology_targets(data)
+        return fetched
+
+    def entity_in_response(self, wikidata_id, response):
+        return entity_in_response(wikidata_id, response)
+
+    def fetch_articles(self, links):
+        # links is list of (language code, article name)
+        # returns {id: P31 and P279 targets} for entries linked by fetched articles
+        fetched = {}
+        by_site = {}
+        for language_code, article_name in links:
+            if is_article_cached(language_code, article_name):
+                self.statistics["already_cached"] += 1
+                continue
+            by_site.setdefault(site_of_language_code(language_code), []).append((language_code, article_name))
+        for site, site_links in by_site.items():
+            request = lambda entries, site=site: self.transport.get_entities_by_titles(site, [entry[1] for entry in entries])
+            for requested, response in self.request_groups(list(self.in_groups(site_links)), request):
+                for language_code, article_name in requested:
+                    matched = self.article_in_response(site, article_name, response)
+                    if matched == None:
+                        self.statistics["not_fetched"] += 1
+                        continue
+                    entity_key, data = matched
+                    write_article_to_cache(language_code, article_name, entity_key, data)
+                    self.statistics["fetched"] += 1
+                    if "missing" not in data:
+                        fetched[entity_key] = ontology_targets(data)
+                        if is_entity_cached(entity_key) == False:
+                            write_entity_to_cache(entity_key, data)
+        return fetched
+
+    def article_in_response(self, site, article_name, response):
+        # returns (key of entity in response, entity data) or None if it cannot be matched
+        title = normalized_title(article_name)
+        for entity_key, data in response["entities"].items():
+            if "missing" in data:
+                if data.get("title") == title:
+                    return entity_key, data
+            elif data.get("sitelinks", {}).get(site, {}).get("title") == title:
+                return entity_key, data
+        return None
+
+    def ontology_targets_of_entity(self, wikidata_id, fetched):
+        # for entity fetched now or already present in cache, None otherwise
+        if wikidata_id in fetched:
+            return fetched[wikidata_id]
+        if is_entity_cached(wikidata_id) == False:
+            return None
+        response = wikimedia_connection.get_data_from_wikidata_by_id(wikidata_id)
+        if response == None:
+            return None
+        return ontology_targets(list(response["entities"].values())[0])
+
+    def fetch_ontology(self, start_ids, fetched, max_levels):
+        # fetches types and P279 ancestors of entities, level by level
+        ignored = knowledge_snapshot.get_snapshot().ignored_entries_in_wikidata_ontology
+        known = set(start_ids)
+        current = start_ids
+        level = 0
+        while current != [] and (max_levels == None or level < max_levels):
+            needed = []
+            for wikidata_id in current:
+                targets = self.ontology_targets_of_entity(wikidata_id, fetched)
+                if targets == None:
+                    continue
+                for target in targets:
+                    if target in known or target in ignored:
+                        continue
+                    known.add(target)
+                    needed.append(target)
+            fetched.update(self.fetch_entities(needed))
+            current = needed
+            level += 1
+            self.report_progress("ontology level " + str(level))
+
+    def prefetch_for_elements(self, list_of_tags, follow_ontology=True, max_ontology_levels=None):
+        # list_of_tags is list of OSM tag dictionaries
+        links, wikidata_ids = references_in_tags(list_of_tags)
+        return self.prefetch_for_references(links, wikidata_ids, follow_ontology, max_ontology_levels)
+
+    def prefetch_for_references(self, links, wikidata_ids, follow_ontology=True, max_ontology_levels=None):
+        # links is list of (language code, article name)
+        wikidata_ids = list(wikidata_ids)
+        listed = set(wikidata_ids)
+        fetched = self.fetch_articles(links)
+        self.report_progress("articles")
+        for language_code, article_name in links:
+            if is_article_cached(language_code, article_name):
+                wikidata_id = wikimedia_connection.get_wikidata_object_id_from_article(language_code, article_name)
+                if wikidata_id != None and WIKIDATA_ID_PATTERN.match(wikidata_id) != None and wikidata_id not in listed:
+                    listed.add(wikidata_id)
+                    wikidata_ids.append(wikidata_id)
+        fetched.update(self.fetch_entities(wikidata_ids))
+        self.report_progress("entries")
+        if follow_ontology:
+            self.fetch_ontology(wikidata_ids, fetched, max_ontology_levels)
+        return self.statistics
+
+
+def prefetch_for_elements(list_of_tags, transport=None, follow_ontology=True, max_ontology_levels=None, show_progress=False):
+    # returns statistics - count of requests, fetched entries...
+    return Prefetcher(transport, show_progress=show_progress).prefetch_for_elements(list_of_tags, follow_ontology, max_ontology_levels)
@@ -0,0 +1,65 @@
+import threading
+
+# coalesces concurrent calls for the same key
+#
+# when many threads ask for the same thing at the same moment (for example entry of a big brand,
+# linked by brand:wikidata from thousands of shops) only the first one runs function
+# other ones wait for it and get the same result (or the same exception)
+#
+# nothing is remembered after the call finishes, caching is done elsewhere (see lru_cache.py)
+# function must not call do() with the same key, as it would wait for itself
+
+
+class Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.in_flight = {}
+        self.executed = 0
+        self.coalesced = 0
+
+    def do(self, key, function):
+        # returns function(), or result of the same call already running in other thread
+        with self.lock:
+            call = self.in_flight.get(key)
+            leading = call == None
+            if leading:
+                call = Call()
+                self.in_flight[key] = call
+                self.executed += 1
+            else:
+                self.coalesced += 1
+        if leading == False:
+            call.done.wait()
+            if call.error != None:
+                raise call.error
+            return call.result
+        try:
+            call.result = function()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self.lock:
+                del self.in_flight[key]
+            call.done.set()
+        return call.result
+
+    def statistics(self):
+        with self.lock:
+            return {
+                "executed": self.executed,
+                "coalesced": self.coalesced,
+                "in_flight": len(self.in_flight),
+            }
+
+    def reset_statistics(self):
+        with self.lock:
+            self.executed = 0
+            self.coalesced = 0
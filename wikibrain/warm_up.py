@@ -0,0 +1,94 @@
+from wikimedia_connection import wikimedia_connection
+from wikibrain import fetch_engine
+from wikibrain import prefetch
+
+# fills cache of wikimedia_connection with everything needed to validate elements from .osm file
+# so validation itself is not waiting for network
+#
+# fetched are
+# - entries from wikidata and secondary wikidata tags
+# - Wikidata entries of articles from wikipedia tags (and entries linked this way)
+# - types and P279 (subclass of) ancestors of all these entries
+# - Wikipedia pages of articles without Wikidata entry (needed to check whether they exist)
+#
+# requests are made concurrently, see fetch_engine.py
+
+PROGRESS_EVERY_ELEMENTS = 100000
+
+
+def is_reference_key(key):
+    # wikipedia, wikidata, brand:wikidata, wikipedia:pl...
+    for part in key.split(":"):
+        if part in ["wikipedia", "wikidata"]:
+            return True
+    return False
+
+
+def tags_with_references_in_osm_file(filepath, show_progress=False):
+    # returns list of tag dictionaries limited to wikipedia and wikidata tags, each one listed once
+    # osm_iterator is imported where used - it is not needed by other users of this library
+    from osm_iterator import osm_iterator
+    returned = []
+    listed = set()
+    counter = {"elements": 0}
+
+    def collect(element):
+        counter["elements"] += 1
+        if show_progress and counter["elements"] % PROGRESS_EVERY_ELEMENTS == 0:
+            print(counter["elements"], "elements processed,", len(returned), "distinct tag sets with references")
+        tags = {}
+        for key, value in element.get_tag_dictionary().items():
+            if is_reference_key(key):
+                tags[key] = value
+        if tags == {}:
+            return
+        identifier = tuple(sorted(tags.items()))
+        if identifier not in listed:
+            listed.add(identifier)
+            returned.append(tags)
+    osm_iterator.Data(filepath).iterate_over_data(collect)
+    return returned
+
+
+def articles_needing_page(links):
+    # Wikipedia page is downloaded by detector to check whether article exists,
+    # if article has no Wikidata entry
+    returned = []
+    for language_code, article_name in links:
+        if prefetch.is_article_cached(language_code, article_name) == False:
+            continue
+        if wikimedia_connection.get_wikidata_object_id_from_article(language_code, article_name) != None:
+            continue
+        if wikimedia_connection.it_is_necessary_to_reload_wikipedia_files(language_code, article_name) == False:
+            continue
+        returned.append((language_code, article_name))
+    return returned
+
+
+def fetch_pages(facade, links):
+    engine = facade.engine
+    coroutines = []
+    for language_code, article_name in links:
+        url = engine.wikipedia_api_url_format.format(language_code=language_code)
+        coroutines.append(engine.call_with_limits(url, wikimedia_connection.download_data_from_wikipedia, language_code, article_name))
+    facade.gather(coroutines)
+
+
+def warm_up_for_tags(list_of_tags, engine=None, show_progress=False):
+    # returns statistics
+    facade = fetch_engine.SyncFetchEngine(engine)
+    try:
+        statistics = facade.prefetch_for_elements(list_of_tags, show_progress=show_progress)
+        links, wikidata_ids = prefetch.references_in_tags(list_of_tags)
+        needing_page = articles_needing_page(links)
+        fetch_pages(facade, needing_page)
+        statistics["pages"] = len(needing_page)
+        if show_progress:
+            print("pages:", len(needing_page), "fetched")
+        return statistics
+    finally:
+        facade.close()
+
+
+def warm_up_for_osm_file(filepath, engine=None, show_progress=False):
+    return warm_up_for_tags(tags_with_references_in_osm_file(filepath, show_progress), engine, show_progress)
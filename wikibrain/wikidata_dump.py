@@ -0,0 +1,215 @@
+import bz2
+import gzip
+import json
+import sqlite3
+import threading
+from wikibrain import connection_patches
+from wikibrain import ontology_bitset
+from wikibrain import ontology_cache
+from wikibrain import page_kind
+from wikibrain import interwiki_links
+from wikibrain import entity_view
+from wikibrain import negative_cache
+
+# local store of Wikidata data needed by validator, built from Wikidata JSON dump
+# see https://www.wikidata.org/wiki/Wikidata:Database_download
+#
+# dump is a JSON array with one entity per line, compressed with gzip or bzip2
+# importing it keeps only claims listed in KEPT_PROPERTIES and sitelinks
+# (qualifiers are kept, references are dropped)
+#
+# with backend installed (see install_backend) Wikidata data is read from store
+# rather than from Wikidata API, so validation does not need network access
+# for Wikidata - note that checks using Wikipedia pages still need them
+#
+# use import_wikidata_dump.py in top level of repository to build store
+
+KEPT_PROPERTIES = [
+    'P31',  # instance of
+    'P279',  # subclass of
+    'P17',  # country
+    'P576',  # dissolved, abolished or demolished
+    'P159',  # headquarters location
+    'P625',  # coordinate location
+    'P105',  # taxon rank
+    'P2046',  # area
+    'P247',  # COSPAR ID
+    'P4046',  # SIMBAD ID
+]
+
+
+def open_dump(filepath):
+    if filepath.endswith(".gz"):
+        return gzip.open(filepath, 'rt', encoding='utf-8')
+    if filepath.endswith(".bz2"):
+        return bz2.open(filepath, 'rt', encoding='utf-8')
+    return open(filepath, encoding='utf-8')
+
+
+def entities_in_dump(filepath):
+    # yields entities one by one, without loading entire dump into memory
+    with open_dump(filepath) as infile:
+        for line in infile:
+            line = line.strip()
+            if line in ["[", "]", ""]:
+                continue
+            if line.endswith(","):
+                line = line[:-1]
+            yield json.loads(line)
+
+
+def compact_claim(claim):
+    returned = {"mainsnak": claim["mainsnak"], "rank": claim.get("rank", "normal")}
+    if "qualifiers" in claim:
+        returned["qualifiers"] = claim["qualifiers"]
+    return returned
+
+
+def compact_entity(data):
+    # returns entity in the same format as in Wikidata API response, limited to used data
+    claims = {}
+    for property_id in KEPT_PROPERTIES:
+        if property_id in data.get("claims", {}):
+            claims[property_id] = [compact_claim(claim) for claim in data["claims"][property_id]]
+    sitelinks = {}
+    for site, sitelink in data.get("sitelinks", {}).items():
+        sitelinks[site] = {"site": site, "title": sitelink["title"]}
+    return {"type": data.get("type"), "id": data["id"], "claims": claims, "sitelinks": sitelinks}
+
+
+class DumpStore:
+    def __init__(self, filepath):
+        self.filepath = filepath
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(filepath, check_same_thread=False)
+        self.connection.execute("""CREATE TABLE IF NOT EXISTS entities (
+            id TEXT PRIMARY KEY NOT NULL,
+            data TEXT NOT NULL
+        )""")
+        self.connection.execute("""CREATE TABLE IF NOT EXISTS sitelinks (
+            site TEXT NOT NULL,
+            title TEXT NOT NULL,
+            id TEXT NOT NULL,
+            PRIMARY KEY (site, title)
+        )""")
+        self.connection.commit()
+
+    def put_entities(self, entities):
+        # entities should be already compacted, see compact_entity
+        entity_rows = []
+        sitelink_rows = []
+        for entity in entities:
+            entity_rows.append((entity["id"], json.dumps(entity, separators=(',', ':'))))
+            for site, sitelink in entity["sitelinks"].items():
+                sitelink_rows.append((site, sitelink["title"], entity["id"]))
+        with self.lock:
+            with self.connection:
+                self.connection.executemany("INSERT OR REPLACE INTO entities VALUES (?, ?)", entity_rows)
+                self.connection.executemany("INSERT OR REPLACE INTO sitelinks VALUES (?, ?, ?)", sitelink_rows)
+
+    def get_entity(self, wikidata_id):
+        # returns compacted entity or None if it is not present in dump
+        with self.lock:
+            row = self.connection.execute("SELECT data FROM entities WHERE id = ?", (wikidata_id,)).fetchone()
+        if row == None:
+            return None
+        return json.loads(row[0])
+
+    def wikidata_id_of_article(self, language_code, article_name):
+        # redirects are not present in dump, so only exact titles are found
+        title = article_name.replace("_", " ")
+        with self.lock:
+            row = self.connection.execute("SELECT id FROM sitelinks WHERE site = ? AND title = ?", (language_code + "wiki", title)).fetchone()
+        if row == None:
+            return None
+        return row[0]
+
+    def all_entities(self, batch_size=10000):
+        # yields compacted entities, for example for ontology_graph.build_graph
+        # read in batches, so entire store is not loaded into memory
+        last_id = ""
+        while True:
+            with self.lock:
+                rows = self.connection.execute("SELECT id, data FROM entities WHERE id > ? ORDER BY id LIMIT ?", (last_id, batch_size)).fetchall()
+            if rows == []:
+                return
+            for row in rows:
+                yield json.loads(row[1])
+            last_id = rows[-1][0]
+
+    def count(self):
+        with self.lock:
+            return self.connection.execute("SELECT COUNT(*) FROM entities").fetchone()[0]
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
+
+
+def import_dump(dump_filepath, store_filepath, batch_size=10000, show_progress=False):
+    # returns count of imported entities
+    store = DumpStore(store_filepath)
+    imported = 0
+    batch = []
+    try:
+        for data in entities_in_dump(dump_filepath):
+            batch.append(compact_entity(data))
+            if len(batch) >= batch_size:
+                store.put_entities(batch)
+                imported += len(batch)
+                batch = []
+                if show_progress:
+                    print(imported, "entities imported")
+        store.put_entities(batch)
+        imported += len(batch)
+    finally:
+        store.close()
+    return imported
+
+
+class DumpBackend:
+    # answers the same questions as wikimedia_connection, using DumpStore
+    def __init__(self, store):
+        self.store = store
+
+    def get_data_from_wikidata_by_id(self, wikidata_id, forced_refresh=False):
+        if wikidata_id == None:
+            raise Exception("null pointer")
+        entity = self.store.get_entity(wikidata_id)
+        if entity == None:
+            # like for Wikidata API reporting no-such-entity
+            return None
+        return {"entities": {wikidata_id: entity}}
+
+    def get_wikidata_object_id_from_article(self, language_code, article_name, forced_refresh=False):
+        return self.store.wikidata_id_of_article(language_code, article_name)
+
+
+REPLACED_FUNCTIONS = ["get_data_from_wikidata_by_id", "get_wikidata_object_id_from_article"]
+LAYER = "wikidata_dump"
+
+
+def install_backend(backend):
+    # makes wikimedia_connection (and wikidata_processing using it) answer from backend
+    # WikimediaLinkIssueDetector does not need any changes then
+    # caches derived from Wikidata data are dropped, as they may be based on other data
+    # (persistent closure store of ontology_cache is not touched - disable it or use a separate one)
+    # see connection_patches.py for combining with other replacements of wikimedia_connection functions
+    connection_patches.install(LAYER, {name: getattr(backend, name) for name in REPLACED_FUNCTIONS})
+    drop_derived_caches()
+
+
+def uninstall_backend():
+    if connection_patches.is_installed(LAYER) == False:
+        return
+    connection_patches.uninstall(LAYER)
+    drop_derived_caches()
+
+
+def drop_derived_caches():
+    ontology_cache.clear()
+    ontology_bitset.clear()
+    page_kind.clear()
+    interwiki_links.clear()
+    entity_view.clear()
+    negative_cache.clear()
@@ -1,11 +1,19 @@
 import wikimedia_connection
 from wikimedia_connection import wikimedia_connection
 from wikimedia_connection import wikidata_processing
-import geopy.distance
 import re
-import yaml
 from wikibrain import wikipedia_knowledge
-from wikibrain import wikidata_knowledge
+from wikibrain import knowledge_snapshot
+from wikibrain import official_languages
+from wikibrain import ontology_cache
+from wikibrain import ontology_bitset
+from wikibrain import ontology_data
+from wikibrain import ontology_traversal
+from wikibrain import page_kind
+from wikibrain import interwiki_links
+from wikibrain import entity_view
+from wikibrain import negative_cache
+from wikibrain import cache_only
 
 
 class ErrorReport:
@@ -45,12 +53,31 @@ class ErrorReport:
         }
 
     def yaml_output(self, filepath):
+        # yaml and geopy are imported where used - they are slow to import
+        # and not needed by many short-lived users of this library
+        import yaml
         with open(filepath, 'a') as outfile:
             yaml.dump([self.data()], outfile, default_flow_style=False)
 
 
+# returned in cache-only mode when check needs data missing in cache, see cache_only.py
+UNDETERMINED_ERROR_ID = "undetermined - data missing in cache"
+
+# entries skipped by check whether type is unlinkable as primary
+ENTRIES_SKIPPED_IN_UNLINKABLE_TYPE_CHECK = [
+    # https://en.wikipedia.org/wiki/Edith_Macefield
+    # this pretends to be about human while it is about building
+    # see https://osmus.slack.com/archives/C1FKE1NCA/p1668339647063239
+    # see https://www.openstreetmap.org/way/217502987
+    # for search: [biography][person]
+    'Q5338613',
+    # event entry about hoax/delusion that is actually strongly about location
+    'Q5371519',
+]
+
+
 class WikimediaLinkIssueDetector:
-    def __init__(self, forced_refresh=False, expected_language_code=None, languages_ordered_by_preference=None, additional_debug=False, allow_requesting_edits_outside_osm=False, allow_false_positives=False):
+    def __init__(self, forced_refresh=False, expected_language_code=None, languages_ordered_by_preference=None, additional_debug=False, allow_requesting_edits_outside_osm=False, allow_false_positives=False, stop_ontology_walk_early=False):
         if languages_ordered_by_preference == None:
             languages_ordered_by_preference = []
         self.forced_refresh = forced_refresh
@@ -59,6 +86,20 @@ class WikimediaLinkIssueDetector:
         self.additional_debug = additional_debug
         self.allow_requesting_edits_outside_osm = allow_requesting_edits_outside_osm
         self.allow_false_positives = allow_false_positives
+        # stop_ontology_walk_early=True makes unlinkable type check stop at the first specific reason
+        # found in breadth first walk, without loading rest of ontology
+        # it may report a different (closer) reason than full walk and it will miss
+        # ambiguous item markers deeper than that reason
+        self.stop_ontology_walk_early = stop_ontology_walk_early
+        self.language_registry = wikipedia_knowledge.language_registry()
+        self.interwiki_language_codes = frozenset(wikimedia_connection.interwiki_language_codes())
+        # preferred languages first, then all other by importance - without duplicates
+        self.interwiki_lookup_order = []
+        for language_code in (self.languages_ordered_by_preference + list(self.language_registry.ordered)):
+            if language_code != None and language_code not in self.interwiki_lookup_order:
+                self.interwiki_lookup_order.append(language_code)
+        self.interwiki_rank = interwiki_links.lookup_rank(self.interwiki_lookup_order)
+        self.interwiki_preference_key = tuple(self.languages_ordered_by_preference)
 
     @staticmethod
     def workarounds_for_wikidata_bugs_breakage_and_mistakes():
@@ -257,9 +298,17 @@ class WikimediaLinkIssueDetector:
 
     @staticmethod
     def ignored_entries_in_wikidata_ontology():
-        too_abstract_or_wikidata_bugs = WikimediaLinkIssueDetector.ignored_entries_in_wikidata_ontology_without_skipping_known_bugs()
-        too_abstract_or_wikidata_bugs += WikimediaLinkIssueDetector.workarounds_for_wikidata_bugs_breakage_and_mistakes()
-        return too_abstract_or_wikidata_bugs
+        # list is returned as wikidata_processing functions require it
+        # use is_ignored_in_wikidata_ontology for membership checks
+        return list(knowledge_snapshot.get_snapshot().ignored_entries_in_wikidata_ontology_in_order)
+
+    @staticmethod
+    def is_ignored_in_wikidata_ontology(wikidata_id):
+        return wikidata_id in knowledge_snapshot.get_snapshot().ignored_entries_in_wikidata_ontology
+
+    @staticmethod
+    def knowledge():
+        return knowledge_snapshot.get_snapshot()
 
     def get_problem_for_given_element(self, element):
         tags = element.get_tag_dictionary()
@@ -273,6 +322,21 @@ class WikimediaLinkIssueDetector:
         return self.get_the_most_important_problem_generic(tags, location, object_type, object_description)
 
     def get_the_most_important_problem_generic(self, tags, location, object_type, object_description):
+        # in cache-only mode (see cache_only.py) data missing in cache makes check undetermined
+        try:
+            return self.get_the_most_important_problem_generic_with_all_data(tags, location, object_type, object_description)
+        except cache_only.NotInCache as e:
+            return self.report_undetermined_check(e.key, tags)
+
+    def report_undetermined_check(self, missing_key, tags):
+        return ErrorReport(
+            error_id=UNDETERMINED_ERROR_ID,
+            error_message="data missing in cache: " + " ".join(missing_key),
+            prerequisite={'wikidata': tags.get('wikidata'), 'wikipedia': tags.get('wikipedia')},
+            extra_data={"missing_key": list(missing_key)},
+        )
+
+    def get_the_most_important_problem_generic_with_all_data(self, tags, location, object_type, object_description):
         if self.object_should_be_deleted_not_repaired(object_type, tags):
             return None
 
@@ -300,7 +364,7 @@ class WikimediaLinkIssueDetector:
     def use_special_properties_allowing_to_ignore_wikipedia_tags(self, tags):
         if tags.get("wikidata") != None:
             if tags.get("teryt:simc") != None:
-                wikidata_simc_object = wikimedia_connection.get_property_from_wikidata(tags.get("wikidata"), 'P4046')
+                wikidata_simc_object = entity_view.view_of(tags.get("wikidata")).property('P4046')
                 if wikidata_simc_object == None:
                     return None
                 wikidata_simc = wikidata_simc_object[0]['mainsnak']['datavalue']['value']
@@ -315,7 +379,6 @@ class WikimediaLinkIssueDetector:
                         prerequisite={'wikidata': tags.get("wikidata"), "teryt:simc": tags.get("teryt:simc")},
                     )
                 wikipedia_expected = self.get_best_interwiki_link_by_id(tags.get("wikidata"))
-                all_languages = wikipedia_knowledge.WikipediaKnowledge.all_wikipedia_language_codes_order_by_importance()
                 if tags.get("wikipedia") != wikipedia_expected:
                     if wikipedia_expected != None:
                         message = "new wikipedia tag " + wikipedia_expected + " proposed based on matching teryt:simc codes in wikidata (" + tags.get("wikidata") + ") and in osm element, where teryt:simc=" + tags.get("teryt:simc") + " is declared"
@@ -457,7 +520,7 @@ class WikimediaLinkIssueDetector:
 
         # IDEA links from buildings to parish are wrong - but from religious admin are OK https://www.wikidata.org/wiki/Q11808149
 
-        if effective_wikidata_id in wikidata_knowledge.skipped_cases():
+        if effective_wikidata_id in self.knowledge().skipped_cases:
             return None  # manually excluded
 
         something_reportable = self.get_problem_based_on_wikidata_blacklist(effective_wikidata_id, tags.get('wikidata'), effective_wikipedia)
@@ -541,7 +604,7 @@ class WikimediaLinkIssueDetector:
             wikidata_id = present_wikidata_id
 
         try:
-            prefix = wikidata_knowledge.blacklist_of_unlinkable_entries()[wikidata_id]['prefix']
+            prefix = self.knowledge().blacklist_of_unlinkable_entries[wikidata_id]['prefix']
         except KeyError:
             return None
 
@@ -561,7 +624,7 @@ class WikimediaLinkIssueDetector:
             return None
         if present_wikidata_id == None:
             raise Exception("check_is_wikidata_page_existing null pointer exception on " + key)
-        wikidata = wikimedia_connection.get_data_from_wikidata_by_id(present_wikidata_id)
+        wikidata = entity_view.wikidata_response(present_wikidata_id)
         if wikidata != None:
             return None
         error_id_description = "wikidata tag links to 404"
@@ -587,13 +650,13 @@ class WikimediaLinkIssueDetector:
             return self.malformed_link_error("wikipedia", key, link, "expected forma will be like en:Idaho - with language code, colon and article name")
         else:
             language_code = wikimedia_connection.get_language_code_from_link(link)
-            if language_code in wikipedia_knowledge.WikipediaKnowledge.wikipedia_language_code_redirects():
+            if self.language_registry.is_redirecting_language_code(language_code):
                 return ErrorReport(
                     error_id="wikipedia tag using redirecting language code",
                     error_message="language code (" + language_code + ") in wikipedia tag (" + link + ") points to redirecting language code, see https://en.wikipedia.org/wiki/List_of_Wikipedias#Redirects",
                     prerequisite={'wikipedia': link},
                 )
-            if language_code not in wikimedia_connection.interwiki_language_codes():
+            if language_code not in self.interwiki_language_codes:
                 return ErrorReport(
                     error_id="malformed wikipedia tag - nonexisting language code",
                     error_message="language code (" + language_code + ") in wikipedia tag (" + link + ") points to nonexisting Wikipedia",
@@ -680,23 +743,29 @@ class WikimediaLinkIssueDetector:
             return None
 
     def check_is_wikipedia_page_existing(self, language_code, article_name):
-        page_according_to_wikidata = wikimedia_connection.get_interwiki_article_name(language_code, article_name, language_code, self.forced_refresh)
-        if page_according_to_wikidata != None:
-            # assume that wikidata is correct to save downloading page
+        def existing(forced_refresh):
+            # None if page is missing
+            page_according_to_wikidata = wikimedia_connection.get_interwiki_article_name(language_code, article_name, language_code, forced_refresh)
+            if page_according_to_wikidata != None:
+                # assume that wikidata is correct to save downloading page
+                return True
+            if wikimedia_connection.get_wikipedia_page(language_code, article_name, forced_refresh) != None:
+                return True
             return None
-        page = wikimedia_connection.get_wikipedia_page(language_code, article_name, self.forced_refresh)
-        if page == None:
-            wikidata_id = wikimedia_connection.get_wikidata_object_id_from_article(language_code, article_name)
-            return self.report_failed_wikipedia_page_link(language_code, article_name, wikidata_id)
+        if negative_cache.lookup(negative_cache.ARTICLE, negative_cache.article_key(language_code, article_name), self.forced_refresh, existing) != None:
+            return None
+        wikidata_id = self.get_wikidata_id_of_article(language_code, article_name)
+        return self.report_failed_wikipedia_page_link(language_code, article_name, wikidata_id)
+
+    def get_wikidata_id_of_article(self, language_code, article_name, forced_refresh=False):
+        # wikimedia_connection.get_wikidata_object_id_from_article
+        # articles recently found to have no Wikidata entry are not requested again, see negative_cache.py
+        key = negative_cache.article_key(language_code, article_name)
+        return negative_cache.lookup(negative_cache.ARTICLE_ITEM, key, forced_refresh, lambda forced_refresh: wikimedia_connection.get_wikidata_object_id_from_article(language_code, article_name, forced_refresh))
 
     def get_best_interwiki_link_by_id(self, wikidata_id):
-        all_languages = wikipedia_knowledge.WikipediaKnowledge.all_wikipedia_language_codes_order_by_importance()
-        for potential_language_code in (self.languages_ordered_by_preference + all_languages):
-            if potential_language_code != None:
-                potential_article_name = wikimedia_connection.get_interwiki_article_name_by_id(wikidata_id, potential_language_code, self.forced_refresh)
-                if potential_article_name != None:
-                    return potential_language_code + ':' + potential_article_name
-        return None
+        # first language in interwiki_lookup_order with an article
+        return interwiki_links.best_link(wikidata_id, self.interwiki_rank, self.interwiki_preference_key, self.forced_refresh)
 
     def report_failed_wikipedia_page_link(self, language_code, article_name, wikidata_id):
         error_general_intructions = ""
@@ -721,8 +790,7 @@ class WikimediaLinkIssueDetector:
     def check_is_object_is_existing(self, present_wikidata_id):
         if present_wikidata_id == None:
             return None
-        no_longer_existing = wikimedia_connection.get_property_from_wikidata(present_wikidata_id, 'P576')
-        if no_longer_existing != None:
+        if entity_view.view_of(present_wikidata_id).has_property('P576'):
             error_general_intructions = "Wikidata claims that this object no longer exists. Historical, no longer existing object should not be mapped in OSM (except temporary marking to avoid remapping them from aerial imagery or similar sources) - so it means that either Wikidata is mistaken or has only partial data - for example it is fine to link ruins of a church to its wikipedia entry ( see https://www.wikidata.org/w/index.php?title=Wikidata:Project_chat&oldid=1361617968#Tagging_ruins/remains_left_after_object ) or wikipedia/wikidata tag is wrong or OSM has an outdated object that should be removed." + " " + self.wikidata_data_quality_warning()
             message = ""
             return ErrorReport(
@@ -736,17 +804,9 @@ class WikimediaLinkIssueDetector:
     def get_dissolved_brands(present_wikidata_ids: list):
         dissolved_brands = []
         for present_wikidata_id in present_wikidata_ids:
-            no_longer_existing = wikimedia_connection.get_property_from_wikidata(present_wikidata_id, 'P576')
-            if no_longer_existing is None:
-                continue
-
-            for existence_blockade in no_longer_existing:
-                try:
-                    excluding = existence_blockade['qualifiers']['P1011']
-                    continue
-                except KeyError:
-                    # P1011 is missing, therefore it is not marked as a statement partially excluded
-                    dissolved_brands.append(present_wikidata_id)
+            # statements with P1011 (excluding) are marked as partially excluded
+            for existence_blockade in entity_view.view_of(present_wikidata_id).statements_without_qualifier('P576', 'P1011'):
+                dissolved_brands.append(present_wikidata_id)
         return dissolved_brands
 
     def check_is_object_brand_is_existing(self, tags):
@@ -793,7 +853,7 @@ class WikimediaLinkIssueDetector:
             )
 
     def tag_from_wikidata(self, present_wikidata_id, wikidata_property):
-        from_wikidata = wikimedia_connection.get_property_from_wikidata(present_wikidata_id, wikidata_property)
+        from_wikidata = entity_view.view_of(present_wikidata_id).property(wikidata_property)
         if from_wikidata == None:
             return None
         returned = wikidata_processing.decapsulate_wikidata_value(from_wikidata)
@@ -849,10 +909,7 @@ class WikimediaLinkIssueDetector:
         return None
 
     def check_is_it_valid_key_for_old_style_wikipedia_tag(self, key):
-        for lang in wikipedia_knowledge.WikipediaKnowledge.all_wikipedia_language_codes_order_by_importance():
-            if "wikipedia:" + lang == key:
-                return True
-        return False
+        return self.language_registry.is_old_style_wikipedia_key(key)
 
     def normalized_id_with_conflicts_list(self, links, wikidata_id):
         normalized_link_form = wikidata_id  # may be None
@@ -878,7 +935,7 @@ class WikimediaLinkIssueDetector:
                     title_after_possible_redirects = self.get_article_name_after_redirect(language_code, article_name)
                     is_article_redirected = (article_name != title_after_possible_redirects and article_name.find("#") == -1)
                     if is_article_redirected:
-                        id_from_link = wikimedia_connection.get_wikidata_object_id_from_article(language_code, title_after_possible_redirects, self.forced_refresh)
+                        id_from_link = self.get_wikidata_id_of_article(language_code, title_after_possible_redirects, self.forced_refresh)
                 except wikimedia_connection.TitleViolatesKnownLimits:
                     pass # redirected link is invalied and not reported as noexsiting - typically due to "feature" of special handling invalid ling with lang: prefixes
                          # for example asking about en:name article on Polish-language will return info whethere "name" article exists on enwiki!
@@ -983,7 +1040,7 @@ class WikimediaLinkIssueDetector:
                     language_code = wikimedia_connection.get_text_before_first_colon(article_name)
                     article_name = wikimedia_connection.get_text_after_first_colon(article_name)
 
-            wikidata_id = wikimedia_connection.get_wikidata_object_id_from_article(language_code, article_name)
+            wikidata_id = self.get_wikidata_id_of_article(language_code, article_name)
             if wikidata_id == None:
                 links.append(article_link_from_old_style_tag)
                 continue
@@ -997,7 +1054,7 @@ class WikimediaLinkIssueDetector:
         return list(set(links))
 
     def get_wikidata_id_after_redirect(self, wikidata_id, forced_refresh=False):
-        wikidata_data = wikimedia_connection.get_data_from_wikidata_by_id(wikidata_id, forced_refresh)
+        wikidata_data = entity_view.wikidata_response(wikidata_id, forced_refresh)
         try:
             return wikidata_data['entities'][wikidata_id]['id']
         except (TypeError, KeyError) as e:
@@ -1042,7 +1099,7 @@ class WikimediaLinkIssueDetector:
         if article_name.find("#") != -1:
             article_name_with_section_stripped = re.match('([^#]*)#(.*)', article_name).group(1)
 
-        wikidata_id_from_article = wikimedia_connection.get_wikidata_object_id_from_article(language_code, article_name_with_section_stripped, self.forced_refresh)
+        wikidata_id_from_article = self.get_wikidata_id_of_article(language_code, article_name_with_section_stripped, self.forced_refresh)
         if present_wikidata_id == wikidata_id_from_article:
             return None
 
@@ -1071,7 +1128,7 @@ class WikimediaLinkIssueDetector:
 
         is_article_redirected = (article_name != title_after_possible_redirects and article_name.find("#") == -1)
         if is_article_redirected:
-            wikidata_id_from_redirect = wikimedia_connection.get_wikidata_object_id_from_article(language_code, title_after_possible_redirects, self.forced_refresh)
+            wikidata_id_from_redirect = self.get_wikidata_id_of_article(language_code, title_after_possible_redirects, self.forced_refresh)
             if present_wikidata_id == wikidata_id_from_redirect:
                 common_message = base_message + ", because " + wikipedia_key + " tag points to a redirect that should be followed"
                 message = self.compare_wikidata_ids(present_wikidata_id, wikidata_id_from_article)
@@ -1100,7 +1157,7 @@ class WikimediaLinkIssueDetector:
             link = language_code + ":" + article_name
             language_code_redirected = wikimedia_connection.get_language_code_from_link(link)
             article_name_redirected = wikimedia_connection.get_article_name_from_link(link)
-            wikidata_of_redirected = wikimedia_connection.get_wikidata_object_id_from_article(language_code_redirected, article_name_redirected, self.forced_refresh)
+            wikidata_of_redirected = self.get_wikidata_id_of_article(language_code_redirected, article_name_redirected, self.forced_refresh)
             if self.is_first_wikidata_disambig_while_second_points_to_something_not_disambig(wikidata_of_redirected, present_wikidata_id):
                 new_wikipedia = self.get_best_interwiki_link_by_id(present_wikidata_id)
                 message = "article claims to redirect to disambig, " + wikidata_key + " does not. " + wikidata_key + " tag is likely to be correct, " + wikipedia_key + " tag almost certainly is not"
@@ -1132,12 +1189,9 @@ class WikimediaLinkIssueDetector:
             return False
         if first == None:
             return False
-        for type_id in wikidata_processing.get_all_types_describing_wikidata_object(second, self.ignored_entries_in_wikidata_ontology()):
-            if type_id == self.disambig_type_id():
-                return False
-        for type_id in wikidata_processing.get_all_types_describing_wikidata_object(first, self.ignored_entries_in_wikidata_ontology()):
-            if type_id == self.disambig_type_id():
-                return True
+        if page_kind.is_disambiguation(second):
+            return False
+        return page_kind.is_disambiguation(first)
 
     def compare_wikidata_ids(self, id1, id2):
         if id1 == None:
@@ -1186,7 +1240,7 @@ class WikimediaLinkIssueDetector:
 
         # https://en.wikipedia.org/wiki/Wikipedia:Naming_conventions_(technical_restrictions)#Colons
         if language_code != None:
-            if language_code in wikipedia_knowledge.WikipediaKnowledge.all_wikipedia_language_codes_order_by_importance():
+            if self.language_registry.is_known_language_code(language_code):
                 return True
         if "?" in link:
             return True
@@ -1198,9 +1252,9 @@ class WikimediaLinkIssueDetector:
         #         broken language code "pl|"
         if language_code is None:
             return True
-        if language_code in wikipedia_knowledge.WikipediaKnowledge.all_wikipedia_language_codes_order_by_importance():
+        if self.language_registry.is_known_language_code(language_code):
             return False
-        if language_code in wikipedia_knowledge.WikipediaKnowledge.wikipedia_language_code_redirects():
+        if self.language_registry.is_redirecting_language_code(language_code):
             return False
         if len(language_code) > 3:
             return True
@@ -1369,10 +1423,11 @@ class WikimediaLinkIssueDetector:
         # coords_given are (latititude, longitude) tuple
         if wikidata_id == None:
             return None
-        location_from_wikidata = wikimedia_connection.get_location_from_wikidata(wikidata_id)
+        location_from_wikidata = entity_view.view_of(wikidata_id).location()
         # recommended by https://stackoverflow.com/a/43211266/4130619
         # documentation on https://github.com/geopy/geopy#measuring-distance
         # geopy.distance.distance((latititude, longitude), (latititude, longitude))
+        import geopy.distance
         return geopy.distance.distance(coords_given, location_from_wikidata).km
 
     def get_distance_description_between_location_and_wikidata_id(self, location, wikidata_id):
@@ -1419,10 +1474,11 @@ class WikimediaLinkIssueDetector:
             return property_error
 
     def get_error_report_if_property_indicates_that_it_is_unlinkable_as_primary(self, wikidata_id, tag_summary, show_debug=False):
-        if wikimedia_connection.get_property_from_wikidata(wikidata_id, 'P247') != None:
+        entity = entity_view.view_of(wikidata_id)
+        if entity.has_property('P247'):
             return self.get_should_use_subject_error('a spacecraft', 'name:', wikidata_id, tag_summary)
         # https://www.wikidata.org/wiki/Property:P279 - subclass of
-        subclass_of = wikimedia_connection.get_property_from_wikidata(wikidata_id, 'P279')
+        subclass_of = entity.property('P279')
         if subclass_of != None:
             if show_debug:
                 for entry in subclass_of:
@@ -1431,73 +1487,189 @@ class WikimediaLinkIssueDetector:
             return self.get_should_use_subject_error('an uncoordinable generic object', 'name:', wikidata_id, tag_summary)
 
     def wikidata_entries_classifying_entry(self, effective_wikidata_id):
-        returned = []
-
         # instances of subclasses - also of indirect subclasses
-        parent_categories = wikidata_processing.get_recursive_all_subclass_of(effective_wikidata_id, self.ignored_entries_in_wikidata_ontology(), False, callback=None)
-        for base_type_id in (parent_categories):
-            returned.append(base_type_id)
-            # TODO is this used: get_all_types_describing_wikidata_object
-
-        # subclasses, of "is instance of"
-        root_instance_ids = wikidata_processing.get_wikidata_type_ids_of_entry(effective_wikidata_id)
+        # and subclasses, of "is instance of"
+        # each entry is listed once
+        return self.wikidata_entries_classifying_entry_merged(effective_wikidata_id).ids
+
+    def wikidata_entries_classifying_entry_merged(self, effective_wikidata_id):
+        # see ontology_cache.MergedClosure
+        return ontology_cache.merged_closures(self.classifying_roots(effective_wikidata_id))
+
+    def classifying_roots(self, effective_wikidata_id):
+        # entry itself and its types ("is instance of") that are not ignored
+        returned = [effective_wikidata_id]
+        root_instance_ids = ontology_data.type_ids_of_entry(effective_wikidata_id)
         if root_instance_ids == None:
             root_instance_ids = []
         for root in root_instance_ids:
-            if root in self.ignored_entries_in_wikidata_ontology():
+            if self.is_ignored_in_wikidata_ontology(root):
                 continue
-            parent_categories = wikidata_processing.get_recursive_all_subclass_of(root, self.ignored_entries_in_wikidata_ontology(), False, callback=None)
-            for base_type_id in (parent_categories):
-                returned.append(base_type_id)
-
+            returned.append(root)
         return returned
 
     def wikidata_entries_classifying_entry_with_depth_data(self, effective_wikidata_id):
         returned = []
 
-        parent_categories_entries = wikidata_processing.get_recursive_all_subclass_of_with_depth_data(effective_wikidata_id, self.ignored_entries_in_wikidata_ontology(), False, callback=None)
+        parent_categories_entries = ontology_cache.get_recursive_all_subclass_of_with_depth_data(effective_wikidata_id)
         for base_type_id_entry in parent_categories_entries:
             returned.append(base_type_id_entry)
             base_type_id = base_type_id_entry["id"]
             base_type_id_depth = base_type_id_entry["depth"]
-            instance_ids = wikidata_processing.get_wikidata_type_ids_of_entry(base_type_id)
+            instance_ids = ontology_data.type_ids_of_entry(base_type_id)
             if instance_ids != None:
                 for instance_id in instance_ids:
-                    if instance_id not in self.ignored_entries_in_wikidata_ontology():
+                    if not self.is_ignored_in_wikidata_ontology(instance_id):
                         returned.append({"id": instance_id, "depth": base_type_id_depth + 1})
 
-        root_instance_ids = wikidata_processing.get_wikidata_type_ids_of_entry(effective_wikidata_id)
-        if root_instance_ids == None:
-            root_instance_ids = []
-        for root in root_instance_ids:
-            if root in self.ignored_entries_in_wikidata_ontology():
-                continue
-            parent_categories_entries = wikidata_processing.get_recursive_all_subclass_of_with_depth_data(root, self.ignored_entries_in_wikidata_ontology(), False, callback=None)
+        for root in self.classifying_roots(effective_wikidata_id)[1:]:
+            parent_categories_entries = ontology_cache.get_recursive_all_subclass_of_with_depth_data(root)
             for base_type_id_entry in (parent_categories_entries + [{"id": root, "depth": 0}]):
                 returned.append(base_type_id_entry)
         return returned
 
     def get_error_report_if_type_unlinkable_as_primary(self, effective_wikidata_id, tags, debug=False):
-        # https://en.wikipedia.org/wiki/Edith_Macefield
-        # this pretends to be about human while it is about building
-        # see https://osmus.slack.com/archives/C1FKE1NCA/p1668339647063239
-        # see https://www.openstreetmap.org/way/217502987
-        # for search: [biography][person]
-        if effective_wikidata_id == 'Q5338613':
+        if effective_wikidata_id in ENTRIES_SKIPPED_IN_UNLINKABLE_TYPE_CHECK:
             if debug:
-                print("skipped Q5338613")
+                print("skipped", effective_wikidata_id)
             return None
-        # event entry about hoax/delusion that is actually strongly about location
-        if effective_wikidata_id == 'Q5371519':
-            if debug:
-                print("skipped Q5371519")
-            return None
-        if effective_wikidata_id in self.ignored_entries_in_wikidata_ontology():
+        if self.is_ignored_in_wikidata_ontology(effective_wikidata_id):
             if debug:
                 print(effective_wikidata_id, "is in self.ignored_entries_in_wikidata_ontology()")
             return None
-        remembered_potential_failure = None
-        for type_id in self.wikidata_entries_classifying_entry(effective_wikidata_id):
+        if self.stop_ontology_walk_early:
+            # bitset requires complete closures, what early stop is supposed to avoid
+            return self.get_error_report_if_type_unlinkable_as_primary_with_early_stop(effective_wikidata_id, tags, debug)
+        if debug == False:
+            return self.get_error_report_if_type_unlinkable_as_primary_from_mask(effective_wikidata_id, tags, self.banned_ancestor_mask(effective_wikidata_id))
+        return self.get_error_report_if_type_unlinkable_as_primary_by_walking_ontology(effective_wikidata_id, tags, debug)
+
+    def get_error_reports_if_type_unlinkable_as_primary(self, entries):
+        # entries is list of (effective_wikidata_id, tags)
+        # returns list with get_error_report_if_type_unlinkable_as_primary result for each entry
+        #
+        # banned ancestors of all entries are found together, see ontology_bitset.BannedAncestorIndex.masks_of
+        returned = [None] * len(entries)
+        pending = []
+        for position, (effective_wikidata_id, tags) in enumerate(entries):
+            if self.stop_ontology_walk_early or effective_wikidata_id in ENTRIES_SKIPPED_IN_UNLINKABLE_TYPE_CHECK or self.is_ignored_in_wikidata_ontology(effective_wikidata_id):
+                returned[position] = self.get_error_report_if_type_unlinkable_as_primary(effective_wikidata_id, tags)
+            else:
+                pending.append(position)
+        roots_of_entries = {}
+        all_roots = []
+        for position in pending:
+            roots = self.classifying_roots(entries[position][0])
+            roots_of_entries[position] = roots
+            all_roots += roots
+        unique_roots = list(dict.fromkeys(all_roots))
+        mask_of_root = dict(zip(unique_roots, ontology_bitset.get_index().masks_of(unique_roots)))
+        for position in pending:
+            mask = 0
+            for root in roots_of_entries[position]:
+                mask |= mask_of_root[root]
+            effective_wikidata_id, tags = entries[position]
+            returned[position] = self.get_error_report_if_type_unlinkable_as_primary_from_mask(effective_wikidata_id, tags, mask)
+        return returned
+
+    def get_error_report_if_type_unlinkable_as_primary_from_mask(self, effective_wikidata_id, tags, mask):
+        # in most cases bitset of banned ancestors is enough to decide, see ontology_bitset.py
+        # walking ontology is needed only when order of entries decides which reason is reported
+        index = ontology_bitset.get_index()
+        if mask == 0 or index.has_marker(mask):
+            return None
+        determined, reason = self.select_reason_from_banned_types(index.type_ids_in_mask(mask), tags)
+        if determined:
+            return self.report_unlinkable_type(reason, effective_wikidata_id, tags)
+        return self.get_error_report_if_type_unlinkable_as_primary_by_walking_ontology(effective_wikidata_id, tags)
+
+    def banned_ancestor_mask(self, effective_wikidata_id):
+        # covers the same entries as wikidata_entries_classifying_entry
+        index = ontology_bitset.get_index()
+        mask = 0
+        for root in self.classifying_roots(effective_wikidata_id):
+            mask |= index.mask(root)
+        return mask
+
+    def select_reason_from_banned_types(self, type_ids, tags):
+        # returns (True, reason) if reason (or lack of it) does not depend on order of ontology walk
+        # returns (False, None) otherwise
+        #
+        # walk reports the last specific reason, or the first extremely broad one if there is no specific one
+        specific = {}
+        broad = {}
+        for type_id in type_ids:
+            potential_failure = self.get_reason_why_type_makes_object_invalid_primary_link(type_id)
+            if self.is_potential_failure_excused_by_tags(potential_failure, tags):
+                continue
+            reported_as = (potential_failure['what'], potential_failure['replacement'])
+            if potential_failure.get('extremely_broad_and_unspecific') == True:
+                broad[reported_as] = potential_failure
+            else:
+                specific[reported_as] = potential_failure
+        if len(specific) == 1:
+            return True, list(specific.values())[0]
+        if len(specific) > 1:
+            return False, None
+        if len(broad) == 0:
+            return True, None
+        if len(broad) == 1:
+            return True, list(broad.values())[0]
+        return False, None
+
+    def is_potential_failure_excused_by_tags(self, potential_failure, tags):
+        if potential_failure['what'] == "a human" and tags.get('boundary') == 'aboriginal_lands':
+            return True # cases like https://www.openstreetmap.org/way/758139284 where Wikipedia article bundles ethicity group and reservation land in one article
+            # TODO
+            # ideally can be fixed, see https://www.wikidata.org/w/index.php?title=User:Mateusz_Konieczny/failing_testcases/Archive_1&oldid=1808808796#Tulalip_Tribes_of_Washington_(Q1516298)_is_human,_according_to_Wikidata_ontology
+            # bother with it after USA report page is empty and Wikidata Ontology has run out of things to fix
+            # AKA never
+
+        if potential_failure['what'] == "a bicycle sharing system" and tags.get('type') == 'network':
+            return True # for relations like https://www.openstreetmap.org/relation/6409389 it seems fine
+                        # though not sure is relation itself is fine
+                        # but lets skip and focus on blatantly bad things
+        return False
+
+    def report_unlinkable_type(self, potential_failure, effective_wikidata_id, tags):
+        if potential_failure == None:
+            return None
+        tag_summary = self.get_should_use_subject_error_tag_summary(tags)
+        return self.get_should_use_subject_error(potential_failure['what'], potential_failure['replacement'], effective_wikidata_id, tag_summary)
+
+    def get_error_report_if_type_unlinkable_as_primary_with_early_stop(self, effective_wikidata_id, tags, debug=False):
+        # breadth first, so ambiguous item markers among entry itself and its direct types
+        # are always found before any reason from their ancestors
+        first_broad_failure = None
+        for type_id, depth in ontology_traversal.classifying_entries_breadth_first(effective_wikidata_id):
+            if debug:
+                print("   " * depth + type_id)
+            if type_id == ontology_bitset.AMBIGUOUS_ITEM_MARKER:
+                return None
+            potential_failure = self.get_reason_why_type_makes_object_invalid_primary_link(type_id)
+            if potential_failure == None:
+                continue
+            if self.is_potential_failure_excused_by_tags(potential_failure, tags):
+                continue
+            if potential_failure.get('extremely_broad_and_unspecific') == True:
+                if first_broad_failure == None:
+                    first_broad_failure = potential_failure
+                continue
+            return self.report_unlinkable_type(potential_failure, effective_wikidata_id, tags)
+        return self.report_unlinkable_type(first_broad_failure, effective_wikidata_id, tags)
+
+    def get_error_report_if_type_unlinkable_as_primary_by_walking_ontology(self, effective_wikidata_id, tags, debug=False):
+        merged = self.wikidata_entries_classifying_entry_merged(effective_wikidata_id)
+        if debug:
+            print(merged.skipped, "repeated entries skipped")
+        # entries are listed once, reported is
+        # - specific reason with the last appearance in closures joined one after another
+        # - if there is no specific one: extremely broad reason with the first appearance
+        # prefer to not report general one (there could be a more specific one reason in a different branch)
+        specific_failure = None
+        specific_failure_position = None
+        broad_failure = None
+        for type_id in merged.ids:
             if debug:
                 print(type_id)
             if type_id in [
@@ -1509,34 +1681,28 @@ class WikimediaLinkIssueDetector:
                 print(potential_failure, "potential failure")
                 print()
             if potential_failure != None:
-                if potential_failure['what'] == "a human" and tags.get('boundary') == 'aboriginal_lands':
-                    continue # cases like https://www.openstreetmap.org/way/758139284 where Wikipedia article bundles ethicity group and reservation land in one article
-                    # TODO
-                    # ideally can be fixed, see https://www.wikidata.org/w/index.php?title=User:Mateusz_Konieczny/failing_testcases/Archive_1&oldid=1808808796#Tulalip_Tribes_of_Washington_(Q1516298)_is_human,_according_to_Wikidata_ontology
-                    # bother with it after USA report page is empty and Wikidata Ontology has run out of things to fix
-                    # AKA never
-
-                if potential_failure['what'] == "a bicycle sharing system" and tags.get('type') == 'network':
-                    continue # for relations like https://www.openstreetmap.org/relation/6409389 it seems fine
-                             # though not sure is relation itself is fine
-                             # but lets skip and focus on blatantly bad things
-
-                # prefer to not report general one (there could be a more specific one reason in a different branch)
-                if 'extremely_broad_and_unspecific' in potential_failure:
-                    if potential_failure['extremely_broad_and_unspecific'] == True:
-                        if remembered_potential_failure != None:
-                            continue
-                remembered_potential_failure = potential_failure
-        if remembered_potential_failure != None:
-            tag_summary = self.get_should_use_subject_error_tag_summary(tags)
-            return self.get_should_use_subject_error(remembered_potential_failure['what'], remembered_potential_failure['replacement'], effective_wikidata_id, tag_summary)
-        return None
+                if self.is_potential_failure_excused_by_tags(potential_failure, tags):
+                    continue
+                if potential_failure.get('extremely_broad_and_unspecific') == True:
+                    if broad_failure == None:
+                        broad_failure = potential_failure
+                    continue
+                if specific_failure_position == None or merged.last_position[type_id] > specific_failure_position:
+                    specific_failure = potential_failure
+                    specific_failure_position = merged.last_position[type_id]
+        if specific_failure != None:
+            return self.report_unlinkable_type(specific_failure, effective_wikidata_id, tags)
+        return self.report_unlinkable_type(broad_failure, effective_wikidata_id, tags)
 
     def get_reason_why_type_makes_object_invalid_primary_link(self, type_id):
         # TODO - also generate_webpage file must be updated
         return self.invalid_types().get(type_id, None)
 
     def invalid_types(self):
+        return self.knowledge().invalid_types
+
+    @staticmethod
+    def hardcoded_invalid_types():
         taxon = {'what': 'an animal or plant (and not an individual one)', 'replacement': 'taxon:'}
         weapon = {'what': 'a weapon model or class', 'replacement': 'model:'}
         vehicle = {'what': 'a vehicle model or class', 'replacement': 'model:'}
@@ -1737,26 +1903,26 @@ class WikimediaLinkIssueDetector:
     def get_error_report_if_wikipedia_target_is_of_unusable_type(self, location, wikidata_id):
         # target_location is (latititude, longitude) tuple
         # wikidata id is string with, well, wikidata id (such as "Q42")
-        for type_id in wikidata_processing.get_all_types_describing_wikidata_object(wikidata_id, self.ignored_entries_in_wikidata_ontology()):
-            if type_id == self.disambig_type_id():
-                # TODO note that pageprops may be a better source that should be used
-                # it does not require wikidata entry
-                # wikidata entry may be wrong
-                # https://pl.wikipedia.org/w/api.php?action=query&format=json&prop=pageprops&redirects=&titles=Java%20(ujednoznacznienie)
-                disambig_list = self.get_list_of_disambig_fixes(location, wikidata_id)
-                error_message = "link leads to a disambig page - not a proper wikipedia link (according to Wikidata - if target is not a disambig check Wikidata entry whether it is correct)\n\n" + disambig_list
-                return ErrorReport(
-                    error_id="link to a disambiguation page",
-                    error_message=error_message,
-                    prerequisite={'wikidata': wikidata_id},
-                )
-            if type_id == 'Q13406463':
-                error_message = "article linked in wikipedia tag is a list, so it is very unlikely to be correct"
-                return ErrorReport(
-                    error_id="link to a list",
-                    error_message=error_message,
-                    prerequisite={'wikidata': wikidata_id},
-                )
+        kind = page_kind.classify(wikidata_id).kind
+        if kind == page_kind.DISAMBIGUATION:
+            # TODO note that pageprops may be a better source that should be used
+            # it does not require wikidata entry
+            # wikidata entry may be wrong
+            # https://pl.wikipedia.org/w/api.php?action=query&format=json&prop=pageprops&redirects=&titles=Java%20(ujednoznacznienie)
+            disambig_list = self.get_list_of_disambig_fixes(location, wikidata_id)
+            error_message = "link leads to a disambig page - not a proper wikipedia link (according to Wikidata - if target is not a disambig check Wikidata entry whether it is correct)\n\n" + disambig_list
+            return ErrorReport(
+                error_id="link to a disambiguation page",
+                error_message=error_message,
+                prerequisite={'wikidata': wikidata_id},
+            )
+        if kind == page_kind.LIST:
+            error_message = "article linked in wikipedia tag is a list, so it is very unlikely to be correct"
+            return ErrorReport(
+                error_id="link to a list",
+                error_message=error_message,
+                prerequisite={'wikidata': wikidata_id},
+            )
 
     def get_problem_based_on_wikidata_and_osm_element(self, object_description, location, effective_wikidata_id, tags):
         # object_description is
@@ -1792,7 +1958,7 @@ class WikimediaLinkIssueDetector:
         if ";" in wikidata:
             # TODO maybe something can/should be done here?
             return None
-        data = wikimedia_connection.get_property_from_wikidata(wikidata, 'P105')
+        data = entity_view.view_of(wikidata).property('P105')
         if data == None:
             return ErrorReport(
                 error_id=prefix.replace(":", "") + " secondary tag links something that is not " + prefix.replace(":", "") + " according to wikidata (checking P105)",
@@ -1819,7 +1985,8 @@ class WikimediaLinkIssueDetector:
         if ";" in wikidata:
             # TODO maybe something can/should be done here?
             return None
-        for type_id in self.wikidata_entries_classifying_entry(wikidata):
+        # lazy, as walk may end as soon as expected entry is found
+        for type_id, depth in ontology_traversal.classifying_entries_breadth_first(wikidata):
             if type_id == expected_wikidata:
                 return None
         message = prefix.replace(":", "") + " secondary tag links something that is not " + prefix.replace(":", "") + " according to wikidata (checking regular ontology)"
@@ -1872,7 +2039,7 @@ class WikimediaLinkIssueDetector:
             pass
         try:
             id_of_location = headquarters['mainsnak']['datavalue']['value']['id']
-            return wikimedia_connection.get_location_from_wikidata(id_of_location)
+            return entity_view.view_of(id_of_location).location()
         except KeyError:
             pass
         return (None, None)
@@ -1880,12 +2047,13 @@ class WikimediaLinkIssueDetector:
     def headquaters_location_indicate_invalid_connection(self, location, wikidata_id, tag_summary):
         if location == (None, None):
             return None
-        headquarters_location_data = wikimedia_connection.get_property_from_wikidata(wikidata_id, 'P159')
-        area_of_object = wikimedia_connection.get_property_from_wikidata(wikidata_id, 'P2046')
-        if area_of_object != None:
+        entity = entity_view.view_of(wikidata_id)
+        headquarters_location_data = entity.property('P159')
+        if entity.has_property('P2046'):
             return None  # for example administrative boundaries such as https://www.wikidata.org/wiki/Q1364786
         if headquarters_location_data == None:
             return None
+        import geopy.distance
         for option in headquarters_location_data:
             location_from_wikidata = self.get_location_of_this_headquaters(option)
             if location_from_wikidata != (None, None):
@@ -1897,7 +2065,7 @@ class WikimediaLinkIssueDetector:
     def output_debug_about_wikidata_item(self, wikidata_id):
         print("**********************")
         print("starting output_debug_about_wikidata_item")
-        print(wikidata_processing.get_wikidata_type_ids_of_entry(wikidata_id))
+        print(ontology_data.type_ids_of_entry(wikidata_id))
         print(wikidata_processing.get_all_types_describing_wikidata_object(wikidata_id, self.ignored_entries_in_wikidata_ontology()))
         self.show_in_stdout_and_in_log_file_unexpected_wikidata_structure(wikidata_id, show_only_banned=False)
 
@@ -1908,46 +2076,79 @@ class WikimediaLinkIssueDetector:
         return ""
 
     def show_in_stdout_and_in_log_file_unexpected_wikidata_structure(self, type_id, show_only_banned):
-        structure = self.get_list_describing_unexpected_wikidata_structure(type_id, show_only_banned)
-        to_show_in_log_file = ""
-        for entry in structure:
-            to_show_in_log_file += ":"*entry["depth"] + "{{Q|" + entry["category_id"] + "}}" + "\n"
+        to_show_in_log_file = []
+        to_write = []
+        for entry in self.unexpected_wikidata_structure(type_id, show_only_banned):
+            to_show_in_log_file.append(":"*entry["depth"] + "{{Q|" + entry["category_id"] + "}}" + "\n")
             if entry.get("ban_reason") != None:
                 header = "== {{Q|" + type_id + "}} classified as " + entry["ban_reason"]['what'] + " ==\n"
-                with open("wikidata_report.txt", "a") as myfile:
-                    myfile.write(header + to_show_in_log_file + "\n\n")
+                to_write.append(header + "".join(to_show_in_log_file) + "\n\n")
             print(":"*entry["depth"] + wikidata_processing.wikidata_description(entry["category_id"]) + entry["note"])
+        if to_write != []:
+            # opened once, rather than for each banned entry
+            with open("wikidata_report.txt", "a") as myfile:
+                myfile.write("".join(to_write))
 
     def get_list_describing_unexpected_wikidata_structure(self, type_id, show_only_banned):
+        return list(self.unexpected_wikidata_structure(type_id, show_only_banned))
+
+    def unexpected_wikidata_structure(self, type_id, show_only_banned):
+        # yields entries {"depth": ..., "category_id": ..., "note": ...}
+        # with show_only_banned only branches leading to banned entries are listed
+        # (see new_banned_entry_in_this_branch), also with "ban_reason"
         callback = self.callback_reporting_banned_categories
 
         # is get_recursive_all_subclass_of_with_depth_data needed anywhere?
         found = self.wikidata_entries_classifying_entry_with_depth_data(type_id)
 
-        entries_to_show = []
         if show_only_banned:
-            for index, entry in enumerate(found):
-                category_id = entry["id"]
-                depth = entry["depth"]
-                if self.new_banned_entry_in_this_branch(found, index):
-                    note = self.callback_reporting_banned_categories(category_id)
-                    ban_reason = self.get_reason_why_type_makes_object_invalid_primary_link(category_id)
-                    entries_to_show.append({"depth": depth, "category_id": category_id, "note": note, "ban_reason": ban_reason})
+            for entry in self.new_banned_entries_in_branches(found):
+                entry["note"] = self.callback_reporting_banned_categories(entry["category_id"])
+                yield entry
         else:
-            for index, entry in enumerate(found):
+            for entry in found:
                 category_id = entry["id"]
                 depth = entry["depth"]
                 note = self.callback_reporting_banned_categories(category_id)
-                entries_to_show.append({"depth": depth, "category_id": category_id, "note": note})
+                yield {"depth": depth, "category_id": category_id, "note": note}
             # print entire inheritance set
             show_debug = True
             parent_categories = wikidata_processing.get_recursive_all_subclass_of(type_id, self.ignored_entries_in_wikidata_ontology(), show_debug, callback)
             #for parent_category in parent_categories:
             #    print("if type_id == '" + parent_category + "':")
             #    print(wikidata_processing.wikidata_description(parent_category))
-        return entries_to_show
+
+    def new_banned_entries_in_branches(self, data):
+        # yields {"depth": ..., "category_id": ..., "ban_reason": ...} for entries
+        # where new_banned_entry_in_this_branch is true, in the same order, in a single pass
+        #
+        # data is in depth first pre-order, so stack holds the current entry and its parents
+        # entry is listed once banned entry is reached in its branch
+        # (entry itself or one of its subclasses), unless any of its parents is banned
+        # - in such case branch was already reported
+        #
+        # the first entry is never treated as banned parent, like in new_banned_entry_in_this_branch
+        stack = []
+        for position, entry in enumerate(data):
+            while stack != [] and stack[-1]["depth"] >= entry["depth"]:
+                stack.pop()
+            below_banned = False
+            if stack != []:
+                parent = stack[-1]
+                below_banned = parent["below_banned"] or (parent["ban_reason"] != None and parent["position"] != 0)
+            ban_reason = self.get_reason_why_type_makes_object_invalid_primary_link(entry["id"])
+            stack.append({"position": position, "depth": entry["depth"], "id": entry["id"], "ban_reason": ban_reason, "below_banned": below_banned, "listed": False})
+            if ban_reason == None:
+                continue
+            for frame in stack:
+                if frame["below_banned"]:
+                    break
+                if frame["listed"] == False:
+                    frame["listed"] = True
+                    yield {"depth": frame["depth"], "category_id": frame["id"], "ban_reason": frame["ban_reason"]}
 
     def new_banned_entry_in_this_branch(self, data, checked_position):
+        # checks single entry, scanning data - see new_banned_entries_in_branches for checking all of them
         index = checked_position - 1
         relevant_level = data[checked_position]["depth"] - 1
         # higher depth is not relevant as it is some other branch with a sgared parent
@@ -1976,681 +2177,14 @@ class WikimediaLinkIssueDetector:
                 return False
 
     def wikidata_ids_of_countries_with_language(self, language_code):
-        # data from Wikidata generated using generate_official_language_list.py in top level of repository
-        if language_code == "jiv":  # Shuar
-            return ["Q736"]  # Ecuador
-
-        if language_code == "gcl":  # Grenadian Creole English
-            return ["Q769"]  # Grenada
-
-        if language_code == "es":  # Spanish
-            return [
-                "Q298",  # Chile
-                "Q414",  # Argentina
-                "Q419",  # Peru
-                "Q717",  # Venezuela
-                "Q733",  # Paraguay
-                "Q736",  # Ecuador
-                "Q739",  # Colombia
-                "Q750",  # Bolivia
-                "Q774",  # Guatemala
-                "Q783",  # Honduras
-                "Q786",  # Dominican Republic
-                "Q792",  # El Salvador
-                "Q983",  # Equatorial Guinea
-                "Q29",  # Spain
-                "Q77",  # Uruguay
-                "Q96",  # Mexico
-                "Q241",  # Cuba
-                "Q800",  # Costa Rica
-                "Q804",  # Panama
-                "Q811",  # Nicaragua
-            ]
-
-        if language_code == "hi":  # Hindi
-            return ["Q668"]  # India
-
-        if language_code == "en":  # English
-            return [
-                "Q258",  # South Africa
-                "Q334",  # Singapore
-                "Q408",  # Australia
-                "Q664",  # New Zealand
-                "Q668",  # India
-                "Q672",  # Tuvalu
-                "Q678",  # Tonga
-                "Q683",  # Samoa
-                "Q685",  # Solomon Islands
-                "Q686",  # Vanuatu
-                "Q691",  # Papua New Guinea
-                "Q695",  # Palau
-                "Q697",  # Nauru
-                "Q702",  # Federated States of Micronesia
-                "Q709",  # Marshall Islands
-                "Q710",  # Kiribati
-                "Q712",  # Fiji
-                "Q734",  # Guyana
-                "Q754",  # Trinidad and Tobago
-                "Q757",  # Saint Vincent and the Grenadines
-                "Q760",  # Saint Lucia
-                "Q763",  # Saint Kitts and Nevis
-                "Q766",  # Jamaica
-                "Q769",  # Grenada
-                "Q778",  # The Bahamas
-                "Q781",  # Antigua and Barbuda
-                "Q784",  # Dominica
-                "Q986",  # Eritrea
-                "Q1005",  # The Gambia
-                "Q1009",  # Cameroon
-                "Q1013",  # Lesotho
-                "Q1014",  # Liberia
-                "Q1020",  # Malawi
-                "Q1027",  # Mauritius
-                "Q1030",  # Namibia
-                "Q1033",  # Nigeria
-                "Q1036",  # Uganda
-                "Q1037",  # Rwanda
-                "Q1042",  # Seychelles
-                "Q1044",  # Sierra Leone
-                "Q1049",  # Sudan
-                "Q1050",  # Eswatini
-                "Q16",  # Canada
-                "Q27",  # Republic of Ireland
-                "Q30",  # United States of America
-                "Q114",  # Kenya
-                "Q117",  # Ghana
-                "Q145",  # United Kingdom
-                "Q233",  # Malta
-                "Q242",  # Belize
-                "Q244",  # Barbados
-                "Q967",  # Burundi
-                "Q921",  # Brunei
-                "Q924",  # Tanzania
-                "Q928",  # Philippines
-                "Q953",  # Zambia
-                "Q954",  # Zimbabwe
-                "Q958",  # South Sudan
-                "Q963",  # Botswana
-            ]
-
-        if language_code == "ay":  # Aymara
-            return [
-                "Q419",  # Peru
-                "Q750",  # Bolivia
-            ]
-
-        if language_code == "pt":  # Portuguese
-            return [
-                "Q574",  # East Timor
-                "Q983",  # Equatorial Guinea
-                "Q1007",  # Guinea-Bissau
-                "Q1011",  # Cape Verde
-                "Q1029",  # Mozambique
-                "Q1039",  # São Tomé and Príncipe
-                "Q45",  # Portugal
-                "Q155",  # Brazil
-                "Q916",  # Angola
-                "Q824489",  # Estado Novo
-            ]
-
-        if language_code == "qu":  # Quechua
-            return [
-                "Q419",  # Peru
-                "Q750",  # Bolivia
-            ]
-
-        if language_code == "ja":  # Japanese
-            return [
-                "Q695",  # Palau
-                "Q17",  # Japan
-            ]
-
-        if language_code == "ta":  # Tamil
-            return [
-                "Q334",  # Singapore
-                "Q854",  # Sri Lanka
-            ]
-
-        if language_code == "nl":  # Dutch
-            return [
-                "Q730",  # Suriname
-                "Q29999",  # Kingdom of the Netherlands
-                "Q31",  # Belgium
-            ]
-
-        if language_code == "hy":  # Armenian
-            return ["Q399"]  # Armenia
-
-        if language_code == "fa":  # Persian
-            return ["Q794"]  # Iran
-
-        if language_code == "ko":  # Korean
-            return [
-                "Q423",  # North Korea
-                "Q884",  # South Korea
-            ]
-
-        if language_code == "km":  # Khmer
-            return ["Q424"]  # Cambodia
-
-        if language_code == "ms":  # Malay
-            return [
-                "Q334",  # Singapore
-                "Q833",  # Malaysia
-                "Q921",  # Brunei
-            ]
-
-        if language_code == "mn":  # Mongolian
-            return ["Q711"]  # Mongolia
-
-        if language_code == "uz":  # Uzbek
-            return [
-                "Q265",  # Uzbekistan
-                "Q889",  # Afghanistan
-            ]
-
-        if language_code == "sr":  # Serbian
-            return [
-                "Q403",  # Serbia
-                "Q225",  # Bosnia and Herzegovina
-            ]
-
-        if language_code == "zu":  # Zulu
-            return ["Q258"]  # South Africa
-
-        if language_code == "xh":  # Xhosa
-            return [
-                "Q258",  # South Africa
-                "Q954",  # Zimbabwe
-            ]
-
-        if language_code == "na":  # Nauruan
-            return ["Q697"]  # Nauru
-
-        if language_code == "ar":  # Arabic
-            return [
-                "Q262",  # Algeria
-                "Q398",  # Bahrain
-                "Q657",  # Chad
-                "Q977",  # Djibouti
-                "Q986",  # Eritrea
-                "Q1016",  # Libya
-                "Q1025",  # Mauritania
-                "Q1028",  # Morocco
-                "Q1045",  # Somalia
-                "Q1049",  # Sudan
-                "Q79",  # Egypt
-                "Q970",  # Comoros
-                "Q796",  # Iraq
-                "Q805",  # Yemen
-                "Q810",  # Jordan
-                "Q817",  # Kuwait
-                "Q822",  # Lebanon
-                "Q842",  # Oman
-                "Q846",  # Qatar
-                "Q851",  # Saudi Arabia
-                "Q858",  # Syria
-                "Q878",  # United Arab Emirates
-                "Q889",  # Afghanistan
-                "Q948",  # Tunisia
-                "Q958",  # South Sudan
-            ]
-
-        if language_code == "af":  # Afrikaans
-            return ["Q258"]  # South Africa
-
-        if language_code == "gil":  # Gilbertese
-            return ["Q710"]  # Kiribati
-
-        if language_code == "ve":  # Venda
-            return [
-                "Q258",  # South Africa
-                "Q954",  # Zimbabwe
-            ]
-
-        if language_code == "fr":  # French
-            return [
-                "Q657",  # Chad
-                "Q686",  # Vanuatu
-                "Q790",  # Haiti
-                "Q971",  # Republic of the Congo
-                "Q974",  # Democratic Republic of the Congo
-                "Q977",  # Djibouti
-                "Q983",  # Equatorial Guinea
-                "Q1000",  # Gabon
-                "Q1006",  # Guinea
-                "Q1008",  # Ivory Coast
-                "Q1009",  # Cameroon
-                "Q1019",  # Madagascar
-                "Q1027",  # Mauritius
-                "Q1032",  # Niger
-                "Q1037",  # Rwanda
-                "Q1041",  # Senegal
-                "Q1042",  # Seychelles
-                "Q16",  # Canada
-                "Q31",  # Belgium
-                "Q32",  # Luxembourg
-                "Q39",  # Switzerland
-                "Q142",  # France
-                "Q235",  # Monaco
-                "Q965",  # Burkina Faso
-                "Q967",  # Burundi
-                "Q970",  # Comoros
-                "Q912",  # Mali
-                "Q929",  # Central African Republic
-                "Q945",  # Togo
-                "Q962",  # Benin
-            ]
-
-        if language_code == "de":  # German
-            return [
-                "Q347",  # Liechtenstein
-                "Q31",  # Belgium
-                "Q32",  # Luxembourg
-                "Q39",  # Switzerland
-                "Q40",  # Austria
-                "Q183",  # Germany
-            ]
-
-        if language_code == "fj":  # Fijian
-            return ["Q712"]  # Fiji
-
-        if language_code == "ht":  # Haitian Creole
-            return ["Q790"]  # Haiti
-
-        if language_code == "ho":  # Hiri Motu
-            return ["Q691"]  # Papua New Guinea
-
-        if language_code == "pau":  # Palauan
-            return ["Q695"]  # Palau
-
-        if language_code == "nso":  # Northern Sotho
-            return ["Q258"]  # South Africa
-
-        if language_code == "sm":  # Samoan
-            return ["Q683"]  # Samoa
-
-        if language_code == "ss":  # Swazi
-            return [
-                "Q258",  # South Africa
-                "Q1050",  # Eswatini
-            ]
-
-        if language_code == "tvl":  # Tuvaluan
-            return ["Q672"]  # Tuvalu
-
-        if language_code == "to":  # Tongan
-            return ["Q678"]  # Tonga
-
-        if language_code == "tet":  # Tetum
-            return ["Q574"]  # East Timor
-
-        if language_code == "tn":  # Tswana
-            return [
-                "Q258",  # South Africa
-                "Q954",  # Zimbabwe
-            ]
-
-        if language_code == "tpi":  # Tok Pisin
-            return ["Q691"]  # Papua New Guinea
-
-        if language_code == "ts":  # Tsonga
-            return [
-                "Q258",  # South Africa
-                "Q954",  # Zimbabwe
-            ]
-
-        if language_code == "st":  # Sesotho
-            return [
-                "Q258",  # South Africa
-                "Q1013",  # Lesotho
-                "Q954",  # Zimbabwe
-            ]
-
-        if language_code == "bi":  # Bislama
-            return ["Q686"]  # Vanuatu
-
-        if language_code == "gn":  # Guarani
-            return [
-                "Q733",  # Paraguay
-                "Q750",  # Bolivia
-            ]
-
-        if language_code == "mh":  # Marshallese
-            return ["Q709"]  # Marshall Islands
-
-        if language_code == "mi":  # Māori
-            return ["Q664"]  # New Zealand
-
-        if language_code == "nr":  # Southern Ndebele
-            return ["Q258"]  # South Africa
-
-        if language_code == "hif":  # Fiji Hindi
-            return ["Q712"]  # Fiji
-
-        if language_code == "zgh":  # Standard Moroccan Berber
-            return ["Q1028"]  # Morocco
-
-        if language_code == "sw":  # Swahili
-            return [
-                "Q1036",  # Uganda
-                "Q1037",  # Rwanda
-                "Q114",  # Kenya
-                "Q924",  # Tanzania
-            ]
-
-        if language_code == "mg":  # Malagasy
-            return ["Q1019"]  # Madagascar
-
-        if language_code == "so":  # Somali
-            return ["Q1045"]  # Somalia
-
-        if language_code == "ny":  # Chewa
-            return [
-                "Q1020",  # Malawi
-                "Q954",  # Zimbabwe
-            ]
-
-        if language_code == "rw":  # Kinyarwanda
-            return ["Q1037"]  # Rwanda
-
-        if language_code == "crs":  # Seychellois Creole
-            return ["Q1042"]  # Seychelles
-
-        if language_code == "ti":  # Tigrinya
-            return ["Q986"]  # Eritrea
-
-        if language_code == "wo":  # Wolof
-            return ["Q1041"]  # Senegal
-
-        if language_code == "pbp":  # Badyara
-            return ["Q1041"]  # Senegal
-
-        if language_code == "kri":  # Krio
-            return ["Q1044"]  # Sierra Leone
-
-        if language_code == "kea":  # Cape Verdean Creole
-            return ["Q1011"]  # Cape Verde
-
-        if language_code == "bjs":  # Bajan Creole
-            return ["Q244"]  # Barbados
-
-        if language_code == "tr":  # Turkish
-            return [
-                "Q43",  # Turkey
-                "Q229",  # Cyprus
-            ]
-
-        if language_code == "is":  # Icelandic
-            return ["Q189"]  # Iceland
-
-        if language_code == "it":  # Italian
-            return [
-                "Q38",  # Italy
-                "Q39",  # Switzerland
-                "Q238",  # San Marino
-            ]
-
-        if language_code == "pl":  # Polish
-            return ["Q36"]  # Poland
-
-        if language_code == "fi":  # Finnish
-            return ["Q33"]  # Finland
-
-        if language_code == "ab":  # Abkhaz
-            return ["Q230"]  # Georgia
-
-        if language_code == "hr":  # Croatian
-            return [
-                "Q224",  # Croatia
-                "Q225",  # Bosnia and Herzegovina
-            ]
-
-        if language_code == "ca":  # Catalan
-            return ["Q228"]  # Andorra
-
-        if language_code == "ru":  # Russian
-            return [
-                "Q159",  # Russia
-                "Q184",  # Belarus
-                "Q232",  # Kazakhstan
-                "Q813",  # Kyrgyzstan
-                "Q863",  # Tajikistan
-            ]
-
-        if language_code == "zh":  # Chinese
-            return [
-                "Q148",  # People's Republic of China
-                "Q865",  # Taiwan
-            ]
-
-        if language_code == "ro":  # Romanian
-            return [
-                "Q217",  # Moldova
-                "Q218",  # Romania
-            ]
-
-        if language_code == "bg":  # Bulgarian
-            return ["Q219"]  # Bulgaria
-
-        if language_code == "ka":  # Georgian
-            return ["Q230"]  # Georgia
-
-        if language_code == "sq":  # Albanian
-            return [
-                "Q221",  # North Macedonia
-                "Q222",  # Albania
-            ]
-
-        if language_code == "uk":  # Ukrainian
-            return ["Q212"]  # Ukraine
-
-        if language_code == "cnr":  # Montenegrin
-            return ["Q236"]  # Montenegro
-
-        if language_code == "sv":  # Swedish
-            return [
-                "Q33",  # Finland
-                "Q34",  # Sweden
-            ]
-
-        if language_code == "da":  # Danish
-            return [
-                "Q35",  # Denmark
-                "Q756617",  # Kingdom of Denmark
-            ]
-
-        if language_code == "no":  # Norwegian
-            return ["Q20"]  # Norway
-
-        if language_code == "lb":  # Luxembourgish
-            return ["Q32"]  # Luxembourg
-
-        if language_code == "sk":  # Slovak
-            return ["Q214"]  # Slovakia
-
-        if language_code == "cs":  # Czech
-            return ["Q213"]  # Czech Republic
-
-        if language_code == "sl":  # Slovene
-            return ["Q215"]  # Slovenia
-
-        if language_code == "hu":  # Hungarian
-            return ["Q28"]  # Hungary
-
-        if language_code == "et":  # Estonian
-            return ["Q191"]  # Estonia
-
-        if language_code == "lv":  # Latvian
-            return ["Q211"]  # Latvia
-
-        if language_code == "lt":  # Lithuanian
-            return ["Q37"]  # Lithuania
-
-        if language_code == "be":  # Belarusian
-            return ["Q184"]  # Belarus
-
-        if language_code == "el":  # Greek
-            return [
-                "Q41",  # Greece
-                "Q229",  # Cyprus
-                "Q229",  # Cyprus
-            ]
-
-        if language_code == "ga":  # Irish
-            return ["Q27"]  # Republic of Ireland
-
-        if language_code == "mt":  # Maltese
-            return ["Q233"]  # Malta
-
-        if language_code == "id":  # Indonesian
-            return ["Q252"]  # Indonesia
-
-        if language_code == "kk":  # Kazakh
-            return ["Q232"]  # Kazakhstan
-
-        if language_code == "az":  # Azerbaijani
-            return ["Q227"]  # Azerbaijan
-
-        if language_code == "mk":  # Macedonian
-            return ["Q221"]  # North Macedonia
-
-        if language_code == "bs":  # Bosnian
-            return ["Q225"]  # Bosnia and Herzegovina
-
-        if language_code == "rm":  # Romansh
-            return ["Q39"]  # Switzerland
-
-        if language_code == "nah":  # Nahuatl
-            return ["Q96"]  # Mexico
-
-        if language_code == "mwl":  # Mirandese
-            return ["Q45"]  # Portugal
-
-        if language_code == "yua":  # Yucatec Maya
-            return ["Q96"]  # Mexico
-
-        if language_code == "nb":  # Bokmål
-            return ["Q20"]  # Norway
-
-        if language_code == "nn":  # Nynorsk
-            return ["Q20"]  # Norway
-
-        if language_code == "am":  # Amharic
-            return ["Q115"]  # Ethiopia
-
-        if language_code == "jv":  # Javanese
-            return ["Q252"]  # Indonesia
-
-        if language_code == "rn":  # Kirundi
-            return ["Q967"]  # Burundi
-
-        if language_code == "smi":  # Sámi
-            return ["Q20"]  # Norway
-
-        if language_code == "prs":  # Dari
-            return ["Q889"]  # Afghanistan
-
-        if language_code == "pwn":  # Paiwan
-            return ["Q865"]  # Taiwan
-
-        if language_code == "nmq":  # Nambya
-            return ["Q954"]  # Zimbabwe
-
-        if language_code == "bwg":  # Barwe
-            return ["Q954"]  # Zimbabwe
-
-        if language_code == "ur":  # Urdu
-            return ["Q843"]  # Pakistan
-
-        if language_code == "vi":  # Vietnamese
-            return ["Q881"]  # Vietnam
-
-        if language_code == "lo":  # Lao
-            return ["Q819"]  # Laos
-
-        if language_code == "th":  # Thai
-            return ["Q869"]  # Thailand
-
-        if language_code == "my":  # Burmese
-            return ["Q836"]  # Myanmar
-
-        if language_code == "ky":  # Kyrgyz
-            return ["Q813"]  # Kyrgyzstan
-
-        if language_code == "tg":  # Tajik
-            return ["Q863"]  # Tajikistan
-
-        if language_code == "tk":  # Turkmen
-            return [
-                "Q874",  # Turkmenistan
-                "Q889",  # Afghanistan
-            ]
-
-        if language_code == "he":  # Hebrew
-            return ["Q801"]  # Israel
-
-        if language_code == "bn":  # Bengali
-            return ["Q902"]  # Bangladesh
-
-        if language_code == "si":  # Sinhala
-            return ["Q854"]  # Sri Lanka
-
-        if language_code == "ndc":  # Ndau
-            return ["Q954"]  # Zimbabwe
-
-        if language_code == "fo":  # Faroese
-            return ["Q756617"]  # Kingdom of Denmark
-
-        if language_code == "kl":  # Greenlandic
-            return ["Q756617"]  # Kingdom of Denmark
-
-        if language_code == "dv":  # Maldivian
-            return ["Q826"]  # Maldives
-
-        if language_code == "bal":  # Balochi
-            return ["Q889"]  # Afghanistan
-
-        if language_code == "dz":  # Dzongkha
-            return ["Q917"]  # Bhutan
-
-        if language_code == "fil":  # Filipino
-            return ["Q928"]  # Philippines
-
-        if language_code == "khi":  # Khoisan
-            return ["Q954"]  # Zimbabwe
-
-        if language_code == "kck":  # Kalanga
-            return ["Q954"]  # Zimbabwe
-
-        if language_code == "ne":  # Nepali
-            return ["Q837"]  # Nepal
-
-        if language_code == "sg":  # Sango
-            return ["Q929"]  # Central African Republic
-
-        if language_code == "sn":  # Shona
-            return ["Q954"]  # Zimbabwe
-
-        if language_code == "toi":  # Tonga
-            return ["Q954"]  # Zimbabwe
-
-        if language_code == "ami":  # Amis language
-            return ["Q865"]  # Taiwan
-
-        if language_code == "nd":  # Northern Ndebele
-            return ["Q954"]  # Zimbabwe
-
-        if language_code == "ku":  # Kurdish
-            return ["Q796"]  # Iraq
-
-        if language_code == "map":  # Austronesian
-            return ["Q865"]  # Taiwan
-
-        if language_code == "ps":  # Pashto
-            return ["Q889"]  # Afghanistan
+        # data from Wikidata, see official_languages.py
+        returned = official_languages.get_table().countries_with_language(language_code)
+        assert returned != None, "language code <" + language_code + "> without hardcoded list of matching countries"
+        return returned
 
-        assert False, "language code <" + language_code + "> without hardcoded list of matching countries"
+    def official_language_codes_of_country(self, country_wikidata_id):
+        # reverse of wikidata_ids_of_countries_with_language
+        return official_languages.get_table().languages_of_country(country_wikidata_id)
 
     # unknown data, known to be completely inside -> not allowed, returns None
     # known to be outside or on border -> allowed, returns reason
@@ -2670,7 +2204,7 @@ class WikimediaLinkIssueDetector:
         for country_id in countries:
             if country_id in country_ids_where_expected_language_will_be_enforced:
                 continue
-            country_name = wikidata_processing.get_wikidata_label(country_id, 'en')
+            country_name = entity_view.view_of(country_id).label('en')
             if country_name == None:
                 return "it is at least partially in country without known name on Wikidata (country_id=" + country_id + ")"
             if country_id == 'Q7318':  # Nazi Germany. Wikidata is being silly again
@@ -2682,22 +2216,17 @@ class WikimediaLinkIssueDetector:
         return None
 
     def get_country_location_from_wikidata_id(self, object_wikidata_id):
-        countries = wikimedia_connection.get_property_from_wikidata(object_wikidata_id, 'P17')
-        if countries == None:
+        entity = entity_view.view_of(object_wikidata_id)
+        if entity.has_property('P17') == False:
             return None
         returned = []
-        for country in countries:
-            country_id = country['mainsnak']['datavalue']['value']['id']
-            # we need to check whether locations still belongs to a given country
-            # it is necessary to avoid gems like
-            # "Płock is allowed to have foreign wikipedia link, because it is at least partially in Nazi Germany"
-            # P582 indicates the time an item ceases to exist or a statement stops being valid
-            # so statements qualified by P582 refer to the past
-            try:
-                country['qualifiers']['P582']
-            except KeyError:
-                # P582 is missing, therefore it is not marked as a statement applying only to the past
-                returned.append(country_id)
+        # we need to check whether locations still belongs to a given country
+        # it is necessary to avoid gems like
+        # "Płock is allowed to have foreign wikipedia link, because it is at least partially in Nazi Germany"
+        # P582 indicates the time an item ceases to exist or a statement stops being valid
+        # so statements qualified by P582 refer to the past
+        for country in entity.statements_without_qualifier('P17', 'P582'):
+            returned.append(country['mainsnak']['datavalue']['value']['id'])
         return returned
 
     def element_can_be_reduced_to_position_at_single_location(self, element):
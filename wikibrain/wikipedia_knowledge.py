@@ -44,3 +44,45 @@ class WikipediaKnowledge:
                 # degraded due to major low-quality bot spam
                 'ceb', 'sv', 'war'
                 ]
+
+
+class LanguageRegistry:
+    # WikipediaKnowledge functions return new lists on each call
+    # what is wasteful when checking every single tag - this class provides
+    # precomputed data with O(1) lookups
+    def __init__(self, language_codes_order_by_importance, redirecting_language_codes):
+        self.ordered = tuple(language_codes_order_by_importance)
+        self.language_codes = frozenset(self.ordered)
+        self.rank = {}
+        for index, language_code in enumerate(self.ordered):
+            if language_code not in self.rank:
+                self.rank[language_code] = index
+        self.redirecting_language_codes = frozenset(redirecting_language_codes)
+        self.old_style_wikipedia_keys = frozenset("wikipedia:" + language_code for language_code in self.ordered)
+
+    def is_known_language_code(self, language_code):
+        return language_code in self.language_codes
+
+    def is_redirecting_language_code(self, language_code):
+        return language_code in self.redirecting_language_codes
+
+    def is_old_style_wikipedia_key(self, key):
+        return key in self.old_style_wikipedia_keys
+
+    def rank_of(self, language_code):
+        # lower is more important, None for unknown codes
+        return self.rank.get(language_code, None)
+
+
+language_registry_store = None
+
+
+def language_registry():
+    # building it twice in case of a race is harmless, so no lock here
+    global language_registry_store
+    if language_registry_store == None:
+        language_registry_store = LanguageRegistry(
+            WikipediaKnowledge.all_wikipedia_language_codes_order_by_importance(),
+            WikipediaKnowledge.wikipedia_language_code_redirects(),
+        )
+    return language_registry_store
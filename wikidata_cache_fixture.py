@@ -0,0 +1,139 @@
+import http.server
+import json
+import tempfile
+import threading
+import time
+import urllib.parse
+from wikimedia_connection import wikimedia_connection
+from wikibrain import fetch_engine
+from wikibrain import negative_cache
+from wikibrain import prefetch
+
+# helpers for tests that need Wikidata data without network access
+# entries are written into wikimedia_connection cache in the same format
+# as it is using for downloaded data
+
+
+def use_temporary_cache():
+    # returns TemporaryDirectory, caller is responsible for cleanup()
+    # answers about missing entries are about the old cache, so they are dropped
+    folder = tempfile.TemporaryDirectory()
+    wikimedia_connection.set_cache_location(folder.name)
+    negative_cache.clear()
+    return folder
+
+
+def claim(property_id, value_id, rank="normal"):
+    return {
+        "mainsnak": {"snaktype": "value", "property": property_id, "datavalue": {"value": {"entity-type": "item", "id": value_id}, "type": "wikibase-entityid"}},
+        "type": "statement",
+        "rank": rank,
+    }
+
+
+def entity(wikidata_id, instance_of=None, subclass_of=None, claims=None, sitelinks=None, labels=None):
+    if claims == None:
+        claims = {}
+    else:
+        claims = dict(claims)
+    if instance_of != None:
+        claims["P31"] = [claim("P31", value_id) for value_id in instance_of]
+    if subclass_of != None:
+        claims["P279"] = [claim("P279", value_id) for value_id in subclass_of]
+    if sitelinks == None:
+        sitelinks = {}
+    if labels == None:
+        labels = {}
+    return {
+        "type": "item",
+        "id": wikidata_id,
+        "labels": {language: {"language": language, "value": value} for language, value in labels.items()},
+        "claims": claims,
+        "sitelinks": {site: {"site": site, "title": title} for site, title in sitelinks.items()},
+    }
+
+
+def seed_entity(data):
+    wikidata_id = data["id"]
+    wikimedia_connection.ensure_that_cache_folder_exists(wikimedia_connection.wikidata_language_placeholder())
+    response_filename = wikimedia_connection.get_filename_with_wikidata_entity_by_id(wikidata_id)
+    code_filename = wikimedia_connection.get_filename_with_wikidata_by_id_response_code(wikidata_id)
+    wikimedia_connection.write_to_text_file(response_filename, json.dumps({"entities": {wikidata_id: data}}))
+    wikimedia_connection.write_to_text_file(code_filename, "200")
+
+
+def seed_entities(entries):
+    for data in entries:
+        seed_entity(data)
+
+
+class FakeApiServer:
+    # local server answering like Wikidata API (/wikidata) and Wikipedia API (/<language code>/api.php)
+    # responses are delayed, so requests overlap
+    def __init__(self, entities, redirects=None, links=None, delay=0.05):
+        self.transport = prefetch.InMemoryTransport(entities)
+        self.redirects = redirects or {}
+        self.links = links or {}
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.running = 0
+        self.max_running = 0
+        self.paths = []
+        server = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                server.started(self.path)
+                try:
+                    time.sleep(server.delay)
+                    content = json.dumps(server.response(self.path)).encode()
+                    self.send_response(200)
+                    self.end_headers()
+                    self.wfile.write(content)
+                finally:
+                    server.finished()
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        self.url = "http://127.0.0.1:" + str(self.httpd.server_address[1])
+
+    def started(self, path):
+        with self.lock:
+            self.paths.append(path)
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+
+    def finished(self):
+        with self.lock:
+            self.running -= 1
+
+    def response(self, path):
+        split = urllib.parse.urlsplit(path)
+        query = dict(urllib.parse.parse_qsl(split.query))
+        if split.path == "/wikidata":
+            if "ids" in query:
+                return self.transport.get_entities(query["ids"].split("|"))
+            # like Wikidata API, redirects of Wikipedia articles are followed
+            return self.transport.get_entities_by_titles(query["sites"], [self.redirects.get(title, title) for title in query["titles"].split("|")])
+        title = query["titles"]
+        response = {"query": {}}
+        if title in self.redirects:
+            response["query"]["redirects"] = [{"from": title, "to": self.redirects[title]}]
+            title = self.redirects[title]
+        page = {"ns": 0, "title": title}
+        if query.get("prop") == "links":
+            page["links"] = [{"ns": 0, "title": link} for link in self.links.get(title, [])]
+        response["query"]["pages"] = {"1": page}
+        return response
+
+    def engine(self, concurrency=8, per_host_limit=4, batch_size=50):
+        return fetch_engine.FetchEngine(concurrency=concurrency, per_host_limit=per_host_limit, batch_size=batch_size,
+                                        wikidata_api_url=self.url + "/wikidata", wikipedia_api_url_format=self.url + "/{language_code}/api.php")
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()